@@ -56,6 +56,23 @@ def create_app():
     # Importer les modèles (important pour que SQLAlchemy les enregistre)
     from . import models
 
+    # Latences HTTP, requêtes en cours et pool de connexions, exposés sur /metrics
+    from .utils.metriques_http import installer_metriques
+    installer_metriques(app)
+
+    # Profilage à la demande (session écrite par /api/admin/profilage, relue par chaque worker)
+    from .utils.profilage import installer_profilage
+    installer_profilage(app)
+
+    # Nombre de requêtes SQL, temps en base et N+1 probables par requête HTTP
+    from .utils.instrumentation_sql import installer_instrumentation_sql
+    installer_instrumentation_sql(app)
+
+    # Résumés des notes par étudiant / matière tenus à jour à chaque flush de Resultat
+    from .services.resume_notes import suivre_resumes_notes, resumes_notes_cli
+    suivre_resumes_notes()
+    app.cli.add_command(resumes_notes_cli)
+
     # Importer et enregistrer les routes
     from .routes.auth import auth_bp
     app.register_blueprint(auth_bp, url_prefix="/auth")
@@ -87,4 +104,11 @@ def create_app():
     from .routes.mentions import mentions_bp
     app.register_blueprint(mentions_bp, url_prefix="/api/admin")
 
+    from .routes.profilage import profilage_bp
+    app.register_blueprint(profilage_bp, url_prefix="/api/admin")
+
+    # Choix du modèle de génération selon la mémoire et le device du nœud (aucun modèle chargé ici)
+    from .services.selection_modele import preflight_modeles
+    preflight_modeles(app)
+
     return app
@@ -5,5 +5,7 @@ from .document import Document
 from .qcm import QCM, Question # OptionReponse a été supprimé, on utilise maintenant Question avec format CSV
 from .reponse_composee import ReponseComposee
 from .resultat import Resultat
+from .resume_notes import ResumeNotes
+from .statistiques_qcm import StatistiquesQCM
 from .niveau_parcours import Niveau, Parcours, Mention
 from .matiere import Matiere, MatiereEnseignantNiveauParcours
\ No newline at end of file
@@ -9,6 +9,7 @@ class Matiere(db.Model):
     code = db.Column(db.String(10), nullable=False, unique=True)  # "MATH", "INFO"
     description = db.Column(db.Text)
     credits = db.Column(db.Integer, default=3)  # Nombre de crédits
+    langue_cible = db.Column(db.String(5), nullable=True)  # "fr", "en" : langue des questions générées (HF_LANGUE_CIBLE si vide)
     est_actif = db.Column(db.Boolean, default=True)
     date_creation = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
 
@@ -25,6 +26,7 @@ class Matiere(db.Model):
             'code': self.code,
             'description': self.description,
             'credits': self.credits,
+            'langue_cible': self.langue_cible,
             'est_actif': self.est_actif,
             'date_creation': self.date_creation.isoformat() if self.date_creation else None,
             'assignations_count': len(self.assignations) if self.assignations else 0
@@ -41,6 +43,10 @@ class Matiere(db.Model):
 # Table de liaison avancée entre Matiere, Enseignant, Niveau et Parcours
 class MatiereEnseignantNiveauParcours(db.Model):
     __tablename__ = 'matiere_enseignant_niveau_parcours'
+    __table_args__ = (
+        # Assignations actives d'un enseignant
+        db.Index('ix_matiere_enseignant_niveau_parcours_enseignant_actif', 'enseignant_id', 'est_actif'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     matiere_id = db.Column(db.Integer, db.ForeignKey('matieres.id'), nullable=False)
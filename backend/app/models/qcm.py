@@ -14,6 +14,10 @@ class Difficulte(Enum):
 
 class QCM(db.Model):
     __tablename__ = 'qcms'
+    __table_args__ = (
+        # QCM disponibles pour un étudiant (publiés, ciblage par niveau / parcours)
+        db.Index('ix_qcms_publie_cible_niveau_parcours', 'est_publie', 'est_cible', 'niveau_id', 'parcours_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     titre = db.Column(db.String(255), nullable=False)
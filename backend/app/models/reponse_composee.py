@@ -1,8 +1,16 @@
 from ..extensions import db
 from datetime import datetime, timezone
+import ast
+import json
 
 class ReponseComposee(db.Model):
     __tablename__ = 'reponses_composees'
+    __table_args__ = (
+        # Une seule soumission par étudiant et par QCM
+        db.UniqueConstraint('etudiant_id', 'qcm_id', name='uq_reponses_composees_etudiant_qcm'),
+        # Soumissions à corriger d'un QCM
+        db.Index('ix_reponses_composees_qcm_id_statut', 'qcm_id', 'statut'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     contenu = db.Column(db.Text, nullable=False)
@@ -30,6 +38,52 @@ class ReponseComposee(db.Model):
     def valider(self):
         return bool(self.contenu)
 
+    def get_reponses(self):
+        """Réponses brutes de l'étudiant {question_id: "questionid_option"}"""
+        return ReponseComposee.lire_reponses(self.contenu)
+
+    def get_options_choisies(self):
+        """Option choisie (1-4) par question : {question_id (int): option (int)}"""
+        return ReponseComposee.lire_options_choisies(self.contenu)
+
+    @staticmethod
+    def lire_reponses(contenu):
+        """
+        Décode un contenu de réponse : JSON, ou format str(dict) des anciennes
+        soumissions (lu avec ast.literal_eval, jamais avec eval).
+        """
+        if not contenu:
+            return {}
+        try:
+            reponses = json.loads(contenu)
+        except ValueError:
+            try:
+                # str(dict) de chaînes simples : "{'12': '12_3'}" se lit en JSON une fois les guillemets remplacés
+                reponses = json.loads(contenu.replace("'", '"'))
+            except ValueError:
+                try:
+                    reponses = ast.literal_eval(contenu)
+                except (ValueError, SyntaxError):
+                    return {}
+        if not isinstance(reponses, dict):
+            return {}
+        return {str(cle): valeur for cle, valeur in reponses.items()}
+
+    @staticmethod
+    def lire_options_choisies(contenu):
+        """Options choisies d'un contenu de réponse (voir get_options_choisies)"""
+        options = {}
+        for cle, valeur in ReponseComposee.lire_reponses(contenu).items():
+            # Format "question_id_option_index" (ex: "1_2" pour question 1, option 2)
+            morceaux = str(valeur).split("_")
+            if len(morceaux) != 2 or morceaux[0] != cle:
+                continue
+            try:
+                options[int(cle)] = int(morceaux[1])
+            except ValueError:
+                continue
+        return options
+
     def sauvegarder(self):
         db.session.add(self)
         db.session.commit()
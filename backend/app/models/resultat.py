@@ -3,6 +3,10 @@ from datetime import datetime, timezone
 
 class Resultat(db.Model):
     __tablename__ = 'resultats'
+    __table_args__ = (
+        # Un seul résultat par étudiant et par QCM (sert aussi d'index pour les recherches par étudiant)
+        db.UniqueConstraint('etudiant_id', 'qcm_id', name='uq_resultats_etudiant_qcm'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     note = db.Column(db.Float, nullable=False)  # Note sur 20
@@ -15,7 +19,7 @@ class Resultat(db.Model):
 
     # Clés étrangères
     etudiant_id = db.Column(db.Integer, db.ForeignKey("etudiant.id"), nullable=False)
-    qcm_id = db.Column(db.Integer, db.ForeignKey("qcms.id"), nullable=False)
+    qcm_id = db.Column(db.Integer, db.ForeignKey("qcms.id"), nullable=False, index=True)
     evaluation_id = db.Column(db.Integer, db.ForeignKey("evaluations.id"), nullable=True)
 
     # Relations
@@ -35,7 +39,8 @@ class Resultat(db.Model):
             self.note = 0
         db.session.commit()
 
-    def generer_feedback(self):
+    def definir_feedback(self):
+        """Définit le feedback selon le pourcentage, sans commit (correction validée en une fois)"""
         if self.pourcentage >= 90:
             self.feedback = "Excellent travail ! Vous maîtrisez parfaitement le sujet."
         elif self.pourcentage >= 80:
@@ -46,6 +51,9 @@ class Resultat(db.Model):
             self.feedback = "Passable. Il serait bon de réviser certains points."
         else:
             self.feedback = "Il faut revoir les concepts de base. N'hésitez pas à demander de l'aide."
+
+    def generer_feedback(self):
+        self.definir_feedback()
         db.session.commit()
 
     def generer_rapport(self):
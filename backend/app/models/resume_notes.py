@@ -0,0 +1,39 @@
+from ..extensions import db
+from datetime import datetime, timezone
+
+class ResumeNotes(db.Model):
+    """
+    Résumé des notes d'un étudiant dans une matière (une ligne par couple étudiant / matière).
+    Tenu à jour dans la même transaction que les Resultat (voir services/resume_notes.py).
+    """
+    __tablename__ = 'resumes_notes'
+    __table_args__ = (
+        db.UniqueConstraint('etudiant_id', 'matiere_id', name='uq_resumes_notes_etudiant_matiere'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    nombre = db.Column(db.Integer, nullable=False, default=0)  # Nombre de résultats
+    somme = db.Column(db.Float, nullable=False, default=0)  # Somme des notes sur 20
+    moyenne = db.Column(db.Float, nullable=False, default=0)  # Moyenne sur 20
+    derniere_date = db.Column(db.DateTime)  # Date de correction la plus récente
+    date_maj = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    # Clés étrangères
+    etudiant_id = db.Column(db.Integer, db.ForeignKey('etudiant.id'), nullable=False, index=True)
+    matiere_id = db.Column(db.Integer, db.ForeignKey('matieres.id'), nullable=False)
+
+    # Relations
+    matiere = db.relationship('Matiere', lazy=True)
+
+    def __repr__(self):
+        return f'<ResumeNotes etudiant={self.etudiant_id} matiere={self.matiere_id}: {self.moyenne}/20>'
+
+    def to_dict(self):
+        return {
+            'etudiant_id': self.etudiant_id,
+            'matiere_id': self.matiere_id,
+            'matiere': self.matiere.nom if self.matiere else None,
+            'nombre': self.nombre,
+            'moyenne': round(self.moyenne, 2),
+            'derniere_date': self.derniere_date.isoformat() if self.derniere_date else None
+        }
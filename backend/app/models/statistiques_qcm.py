@@ -0,0 +1,60 @@
+from ..extensions import db
+from datetime import datetime, timezone
+import json
+
+# Histogramme des notes sur 20 : 10 tranches de 2 points (la note 20 compte dans la dernière)
+LARGEUR_TRANCHE = 2
+NOMBRE_TRANCHES = 10
+
+class StatistiquesQCM(db.Model):
+    """
+    Distribution des notes d'un QCM calculée à la correction (voir services/classement_qcm.py).
+    Les notes triées permettent de situer un étudiant (rang, percentile) sans relire resultats.
+    """
+    __tablename__ = 'statistiques_qcm'
+
+    id = db.Column(db.Integer, primary_key=True)
+    nombre = db.Column(db.Integer, nullable=False, default=0)  # Nombre de résultats
+    moyenne = db.Column(db.Float, nullable=False, default=0)  # Sur 20
+    mediane = db.Column(db.Float, nullable=False, default=0)
+    ecart_type = db.Column(db.Float, nullable=False, default=0)
+    note_min = db.Column(db.Float, nullable=False, default=0)
+    note_max = db.Column(db.Float, nullable=False, default=0)
+    notes_triees = db.Column(db.Text, nullable=False, default='[]')  # JSON : notes par ordre croissant
+    histogramme = db.Column(db.Text, nullable=False, default='[]')  # JSON : nombre de notes par tranche
+    date_calcul = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    # Clé étrangère
+    qcm_id = db.Column(db.Integer, db.ForeignKey('qcms.id'), nullable=False, unique=True)
+
+    # Supprimée avec son QCM quand celui-ci l'est par l'ORM (ex: suppression d'un document)
+    qcm = db.relationship('QCM', backref=db.backref('statistiques', uselist=False, lazy=True, cascade='all, delete-orphan'))
+
+    def __repr__(self):
+        return f'<StatistiquesQCM qcm={self.qcm_id}: {self.nombre} notes>'
+
+    def get_notes_triees(self):
+        return json.loads(self.notes_triees or '[]')
+
+    def get_histogramme(self):
+        return json.loads(self.histogramme or '[]')
+
+    def to_dict(self):
+        return {
+            'qcm_id': self.qcm_id,
+            'nombre': self.nombre,
+            'moyenne': round(self.moyenne, 2),
+            'mediane': round(self.mediane, 2),
+            'ecart_type': round(self.ecart_type, 2),
+            'note_min': self.note_min,
+            'note_max': self.note_max,
+            'histogramme': [
+                {
+                    'min': i * LARGEUR_TRANCHE,
+                    'max': (i + 1) * LARGEUR_TRANCHE,
+                    'nombre': nombre
+                }
+                for i, nombre in enumerate(self.get_histogramme())
+            ],
+            'date_calcul': self.date_calcul.isoformat() if self.date_calcul else None
+        }
@@ -24,6 +24,10 @@ class Utilisateur(db.Model):
 
 class Etudiant(db.Model):
     __tablename__ = "etudiant"
+    __table_args__ = (
+        # Listes d'étudiants d'une promotion (année, actifs, niveau, parcours)
+        db.Index('ix_etudiant_annee_actif_niveau_parcours', 'annee_universitaire', 'est_actif', 'niveau_id', 'parcours_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     utilisateur_id = db.Column(db.Integer, db.ForeignKey("utilisateur.id"), unique=True, nullable=False)
     matriculeId = db.Column(db.String(50), nullable=False)
@@ -4,9 +4,7 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from ..models.document import Document
 from ..models.user import Utilisateur
 from ..extensions import db
-from ..services.hugging_face_service import HuggingFaceService
-import PyPDF2
-import docx
+from ..services.ia import obtenir_service_ia
 import io
 from werkzeug.utils import secure_filename
 
@@ -22,6 +20,7 @@ def allowed_file(filename):
 # EXTRACTION DE TEXTE DES FICHIERS
 def extraire_texte_pdf(file_content):
     """Extraire le texte d'un fichier PDF"""
+    import PyPDF2
     try:
         pdf_file = io.BytesIO(file_content)
         pdf_reader = PyPDF2.PdfReader(pdf_file)
@@ -34,6 +33,7 @@ def extraire_texte_pdf(file_content):
 
 def extraire_texte_docx(file_content):
     """Extraire le texte d'un fichier DOCX"""
+    import docx
     try:
         doc_file = io.BytesIO(file_content)
         doc = docx.Document(doc_file)
@@ -102,65 +102,108 @@ def upload_document():
 
 @document_bp.route('/<int:document_id>/generer-quiz', methods=['POST'])
 @jwt_required()
-def generer_quiz_depuis_document():
-    """Générer un quiz à partir d'un document avec Hugging Face"""
+def generer_quiz_depuis_document(document_id):
+    """Générer un quiz (QCM, Vrai/Faux, questions ouvertes) à partir d'un document avec Hugging Face"""
+    from ..models.qcm import QCM, Question, TypeExercice, Difficulte
     try:
         current_user_id = get_jwt_identity()
-        document_id = request.view_args['document_id']
 
         data = request.get_json() or {}
-        nombre_qcm = data.get('nombre_qcm', 50)
-        nombre_vrai_faux = data.get('nombre_vrai_faux', 30)
-        nombre_ouvertes = data.get('nombre_ouvertes', 20)
+        nombres = {
+            'qcm': int(data.get('nombre_qcm', 50)),
+            'vrai_faux': int(data.get('nombre_vrai_faux', 30)),
+            'ouverte': int(data.get('nombre_ouvertes', 20))
+        }
+        difficulte = data.get('difficulte', 'Moyen')
+        if difficulte not in [d.value for d in Difficulte]:
+            return jsonify({'error': f'Difficulté invalide: {difficulte}'}), 400
 
         document = Document.query.filter_by(id=document_id, enseignant_id=current_user_id).first()
         if not document:
             return jsonify({'error': 'Document non trouvé ou accès refusé'}), 404
 
-        hf_service = HuggingFaceService()
-        questions_qcm = hf_service.generer_questions_qcm(document.contenu, nombre_qcm)
-        questions_vf = hf_service.generer_questions_vrai_faux(document.contenu, nombre_vrai_faux)
-        questions_ouvertes = hf_service.generer_questions_ouvertes(document.contenu, nombre_ouvertes)
-
-        questions_sauvegardees = []
-
-        # Sauvegarde des questions
-        for question_data in questions_qcm + questions_vf + questions_ouvertes:
-            from ..models.qcm import QCM, OptionReponse
+        # Un seul passage sur le document : chaque chunk sert aux trois types de questions
+        try:
+            hf_service = obtenir_service_ia(profil=data.get('profil'), langue=data.get('langue'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        result = hf_service.generer_questions_multi_types(
+            document.contenu,
+            nombres,
+            difficulte=difficulte,
+            document_id=document.id
+        )
+        if not result.get('success'):
+            return jsonify({'error': f"Erreur lors de la génération: {result.get('error', 'inconnue')}"}), 500
+
+        # Un QCM par type d'exercice, rattaché au document
+        types_exercice = {
+            'qcm': TypeExercice.QCM,
+            'vrai_faux': TypeExercice.VRAI_FAUX,
+            'ouverte': TypeExercice.QUESTION_OUVERTE
+        }
+        qcms_crees = []
+        for type_question, questions_data in result['questions'].items():
+            if not questions_data:
+                continue
+
+            type_exercice = types_exercice[type_question]
             qcm = QCM(
-                titre=f"Question {len(questions_sauvegardees) + 1}",
-                contenu=question_data['question'],
-                type_exercice=question_data['type'],
-                difficulte=question_data['difficulte'],
-                reponse_attendue=str(question_data['reponse_correcte']),
-                document_id=document_id
+                titre=f"{document.titre} - {type_exercice.value}"[:255],
+                type_exercice=type_exercice,
+                difficulte=Difficulte(difficulte),
+                document_id=document.id
             )
-            qcm.publier()
-
-            if question_data['options']:
-                for option_data in question_data['options']:
-                    option = OptionReponse(
-                        texte=option_data['texte'],
-                        est_correcte=option_data['est_correcte'],
-                        qcm_id=qcm.id
+            db.session.add(qcm)
+            db.session.flush()
+
+            for question_data in questions_data:
+                if type_question == 'qcm':
+                    question = Question(
+                        question=question_data['texte'],
+                        qcm_id=qcm.id,
+                        reponse1=question_data['reponse1'],
+                        reponse2=question_data['reponse2'],
+                        reponse3=question_data['reponse3'],
+                        reponse4=question_data['reponse4'],
+                        bonne_reponse=question_data['bonne_reponse']
+                    )
+                elif type_question == 'vrai_faux':
+                    question = Question(
+                        question=question_data['texte'],
+                        qcm_id=qcm.id,
+                        reponse1='Vrai',
+                        reponse2='Faux',
+                        bonne_reponse=1 if question_data['reponse_correcte'] == 'Vrai' else 2
                     )
-                    db.session.add(option)
-                db.session.commit()
+                else:
+                    # Question ouverte : la réponse attendue sert de corrigé type
+                    question = Question(
+                        question=question_data['texte'],
+                        qcm_id=qcm.id,
+                        reponse1=question_data['reponse_attendue']
+                    )
+                db.session.add(question)
+
+            qcms_crees.append(qcm)
 
-            questions_sauvegardees.append(qcm.to_dict())
+        db.session.commit()
 
+        total_questions = sum(len(q) for q in result['questions'].values())
         return jsonify({
-            'message': f'{len(questions_sauvegardees)} questions générées avec succès',
-            'total_questions': len(questions_sauvegardees),
+            'message': f'{total_questions} questions générées avec succès',
+            'total_questions': total_questions,
             'breakdown': {
-                'qcm': len(questions_qcm),
-                'vrai_faux': len(questions_vf),
-                'ouvertes': len(questions_ouvertes)
+                'qcm': len(result['questions']['qcm']),
+                'vrai_faux': len(result['questions']['vrai_faux']),
+                'ouvertes': len(result['questions']['ouverte'])
             },
+            'qcms': [qcm.to_dict() for qcm in qcms_crees],
             'document_id': document_id
         }), 201
 
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': f'Erreur lors de la génération: {str(e)}'}), 500
 
 
@@ -207,6 +250,8 @@ def supprimer_document():
             return jsonify({'error': 'Document non trouvé'}), 404
 
         document.supprimer()
+        from ..services.document_index_service import DocumentIndexService
+        DocumentIndexService(None).supprimer_index(document_id)
         return jsonify({'message': 'Document supprimé avec succès'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1,8 +1,9 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy.orm import joinedload
 from ..models.user import Enseignant, Utilisateur, Admin, Etudiant
 from ..models.matiere import MatiereEnseignantNiveauParcours
-from ..models.resultat import Resultat
+from ..models.resume_notes import ResumeNotes
 from ..extensions import db, bcrypt
 
 enseignants_bp = Blueprint('enseignants', __name__)
@@ -231,8 +232,13 @@ def get_etudiants_enseignant():
         etudiants_data = []
         
         for assignation in assignations:
-            # Construire la requête pour les étudiants
-            query = Etudiant.query.filter_by(est_actif=True)
+            # Construire la requête pour les étudiants (relations de to_dict chargées avec eux)
+            query = Etudiant.query.options(
+                joinedload(Etudiant.utilisateur),
+                joinedload(Etudiant.niveau_obj),
+                joinedload(Etudiant.parcours_obj),
+                joinedload(Etudiant.mention_obj)
+            ).filter_by(est_actif=True)
             
             # Filtrer par année universitaire
             query = query.filter_by(annee_universitaire=annee_universitaire)
@@ -254,6 +260,15 @@ def get_etudiants_enseignant():
             
             etudiants = query.all()
             
+            # Résumé des notes de ces étudiants dans la matière : une seule requête par assignation
+            resumes = {
+                resume.etudiant_id: resume
+                for resume in ResumeNotes.query.filter(
+                    ResumeNotes.matiere_id == assignation.matiere.id,
+                    ResumeNotes.etudiant_id.in_([e.id for e in etudiants])
+                )
+            } if etudiants else {}
+            
             for etudiant in etudiants:
                 # Éviter les doublons
                 if not any(e['id'] == etudiant.id for e in etudiants_data):
@@ -265,23 +280,15 @@ def get_etudiants_enseignant():
                         'nom': assignation.matiere.nom
                     }
                     
-                    # Récupérer les notes de l'étudiant pour cette matière
-                    from ..models.qcm import QCM
-                    
-                    # Récupérer tous les résultats de l'étudiant pour les QCM de cette matière
-                    resultats = db.session.query(Resultat).join(QCM).filter(
-                        Resultat.etudiant_id == etudiant.id,
-                        QCM.matiere_id == assignation.matiere.id
-                    ).all()
-                    
+                    # Note de l'étudiant dans cette matière : moyenne de ses résultats
+                    resume = resumes.get(etudiant.id)
                     notes_data = []
-                    for resultat in resultats:
+                    if resume:
                         notes_data.append({
                             'matiere': assignation.matiere.nom,
-                            'note': resultat.note,
-                            'qcm_titre': resultat.qcm.titre if resultat.qcm else 'QCM supprimé',
-                            'date_correction': resultat.date_correction.isoformat(),
-                            'pourcentage': resultat.pourcentage
+                            'note': round(resume.moyenne, 2),
+                            'nombre': resume.nombre,
+                            'date_correction': resume.derniere_date.isoformat() if resume.derniere_date else None
                         })
                     
                     etudiant_dict['notes'] = notes_data
@@ -4,6 +4,7 @@ from ..extensions import db
 from ..models.matiere import Matiere, MatiereEnseignantNiveauParcours
 from ..models.user import Admin, Enseignant
 from ..models.niveau_parcours import Niveau, Parcours
+from ..services.detection_langue import normaliser_langue
 
 matieres_bp = Blueprint('matieres', __name__)
 
@@ -80,12 +81,18 @@ def create_matiere():
         if existing_code:
             return jsonify({"error": "Une matière avec ce code existe déjà"}), 400
 
+        try:
+            langue_cible = normaliser_langue(data.get('langue_cible'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
         # Créer la matière
         matiere = Matiere(
             nom=data['nom'],
             code=data['code'],
             description=data.get('description', ''),
             credits=data.get('credits', 3),
+            langue_cible=langue_cible,
             est_actif=data.get('est_actif', True)
         )
 
@@ -138,6 +145,12 @@ def update_matiere(matiere_id):
         if 'credits' in data:
             matiere.credits = data['credits']
 
+        if 'langue_cible' in data:
+            try:
+                matiere.langue_cible = normaliser_langue(data['langue_cible'])
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
 
         if 'est_actif' in data:
             matiere.est_actif = data['est_actif']
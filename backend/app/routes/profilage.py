@@ -0,0 +1,104 @@
+from flask import Blueprint, request, jsonify, current_app, send_from_directory
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from ..models.user import Utilisateur
+
+profilage_bp = Blueprint('profilage', __name__)
+
+
+def _est_admin():
+    current_user = Utilisateur.query.get(get_jwt_identity())
+    return current_user is not None and current_user.role == 'admin'
+
+
+@profilage_bp.route('/profilage', methods=['GET'])
+@jwt_required()
+def get_profilage():
+    """Session de profilage en cours et sessions enregistrées (admin seulement)"""
+    from ..utils.profilage import lire_session, requetes_profilees, FICHIER_SESSION
+    import os
+
+    if not _est_admin():
+        return jsonify({'error': 'Accès non autorisé'}), 403
+
+    dossier = current_app.config['PROFILAGE_DOSSIER']
+    session = lire_session(dossier)
+    if session:
+        session['requetes_profilees'] = requetes_profilees(dossier, session)
+
+    sessions = []
+    if os.path.isdir(dossier):
+        for nom in sorted(os.listdir(dossier), reverse=True):
+            repertoire = os.path.join(dossier, nom)
+            if nom == FICHIER_SESSION or not os.path.isdir(repertoire):
+                continue
+            sessions.append({
+                'id': nom,
+                'fichiers': sorted(f for f in os.listdir(repertoire) if not f.startswith('place-'))
+            })
+
+    return jsonify({'session': session, 'sessions': sessions}), 200
+
+
+@profilage_bp.route('/profilage', methods=['POST'])
+@jwt_required()
+def demarrer_profilage():
+    """
+    Démarre une session de profilage sur tous les workers, sans redémarrage (admin seulement).
+
+    Corps JSON : route (endpoint, règle ou préfixe de chemin), requetes (N prochaines requêtes),
+    duree_secondes (fenêtre), intervalle_ms (échantillonnage, défaut 5), cprofile (défaut true).
+    """
+    from ..utils.profilage import creer_session
+
+    if not _est_admin():
+        return jsonify({'error': 'Accès non autorisé'}), 403
+
+    data = request.get_json(silent=True) or {}
+    try:
+        session = creer_session(
+            current_app.config['PROFILAGE_DOSSIER'],
+            route=data.get('route'),
+            requetes=int(data['requetes']) if data.get('requetes') is not None else None,
+            duree_secondes=float(data['duree_secondes']) if data.get('duree_secondes') is not None else None,
+            intervalle_ms=float(data.get('intervalle_ms', 5)),
+            cprofile=bool(data.get('cprofile', True))
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Paramètres de profilage invalides: {str(e)}'}), 400
+    except OSError as e:
+        return jsonify({'error': f'Impossible d\'écrire la session de profilage: {str(e)}'}), 500
+
+    current_app.logger.info(f"🔬 Profilage démarré: {session}")
+    return jsonify({'message': 'Profilage démarré', 'session': session}), 201
+
+
+@profilage_bp.route('/profilage', methods=['DELETE'])
+@jwt_required()
+def arreter_profilage():
+    """Arrête la session de profilage en cours ; les fichiers produits restent (admin seulement)"""
+    from ..utils.profilage import arreter_session
+
+    if not _est_admin():
+        return jsonify({'error': 'Accès non autorisé'}), 403
+
+    if not arreter_session(current_app.config['PROFILAGE_DOSSIER']):
+        return jsonify({'error': 'Aucune session de profilage en cours'}), 404
+
+    current_app.logger.info("🔬 Profilage arrêté")
+    return jsonify({'message': 'Profilage arrêté'}), 200
+
+
+@profilage_bp.route('/profilage/<session_id>/<fichier>', methods=['GET'])
+@jwt_required()
+def telecharger_profil(session_id, fichier):
+    """Télécharge un fichier de profil (.collapsed ou .prof) d'une session (admin seulement)"""
+    import os
+
+    if not _est_admin():
+        return jsonify({'error': 'Accès non autorisé'}), 403
+
+    # send_from_directory refuse les chemins qui sortent du dossier ; session_id est vérifié ici
+    if session_id != os.path.basename(session_id) or session_id.startswith('.'):
+        return jsonify({'error': 'Session inconnue'}), 404
+    repertoire = os.path.join(current_app.config['PROFILAGE_DOSSIER'], session_id)
+    return send_from_directory(repertoire, fichier, as_attachment=True)
@@ -7,6 +7,10 @@ from ..models.resultat import Resultat
 
 qcm_bp = Blueprint("qcm", __name__)
 
+# Pagination des listes d'étudiants (un examen de 1000 étudiants tient en une page)
+PAR_PAGE_DEFAUT = 100
+PAR_PAGE_MAX = 1000
+
 @qcm_bp.route("/simulate", methods=["POST"])
 def simulate_qcm():
     """
@@ -30,8 +34,14 @@ def simulate_qcm():
         
         if qcm_simulation:
             # Supprimer seulement les données liées à ce QCM de simulation
+            from ..models.statistiques_qcm import StatistiquesQCM
+            from ..services.resume_notes import recalculer_resumes_notes
             ReponseComposee.query.filter_by(qcm_id=qcm_simulation.id).delete()
+            # Suppression en masse : résumés des notes recalculés ensuite
+            etudiant_ids = [e for (e,) in db.session.query(Resultat.etudiant_id).filter_by(qcm_id=qcm_simulation.id).distinct()]
             Resultat.query.filter_by(qcm_id=qcm_simulation.id).delete()
+            recalculer_resumes_notes(etudiant_ids, [qcm_simulation.matiere_id])
+            StatistiquesQCM.query.filter_by(qcm_id=qcm_simulation.id).delete()
             
             # Supprimer les questions de ce QCM (les options sont maintenant dans la table Question)
             Question.query.filter_by(qcm_id=qcm_simulation.id).delete()
@@ -145,11 +155,12 @@ def get_qcms_enseignant():
     Retourne la liste des QCM pour le dashboard enseignant.
     """
     qcms = QCM.query.all()
+    # QCM déjà corrigés (ayant au moins un résultat) : une seule requête pour toute la liste
+    qcms_corriges = {qcm_id for (qcm_id,) in db.session.query(Resultat.qcm_id).distinct()}
     result = []
     for q in qcms:
         # Vérifier si ce QCM a déjà été corrigé
-        resultat_existant = Resultat.query.filter_by(qcm_id=q.id).first()
-        est_corrige = resultat_existant is not None
+        est_corrige = q.id in qcms_corriges
         
         result.append({
             "id": q.id,
@@ -215,8 +226,8 @@ def get_qcms_etudiant():
         
         etudiant_id = etudiant.id
         
-        # Récupérer les IDs des QCM déjà passés par cet étudiant
-        qcms_passes = db.session.query(Resultat.qcm_id).filter_by(etudiant_id=etudiant.utilisateur_id).all()
+        # Récupérer les IDs des QCM déjà passés par cet étudiant (Resultat.etudiant_id référence etudiant.id)
+        qcms_passes = db.session.query(Resultat.qcm_id).filter_by(etudiant_id=etudiant.id).all()
         qcms_passes_ids = [qcm_id[0] for qcm_id in qcms_passes]
         
         # Construire la requête pour les QCM disponibles
@@ -289,9 +300,11 @@ def soumettre_reponses_etudiant():
     """
     Soumet les réponses d'un étudiant pour un QCM et crée un résultat.
     """
+    import json
     from flask import request
     from ..models.reponse_composee import ReponseComposee
     from flask_jwt_extended import get_jwt_identity
+    from sqlalchemy.exc import IntegrityError
     
     try:
         data = request.get_json()
@@ -317,16 +330,16 @@ def soumettre_reponses_etudiant():
         # Vérifier que le QCM existe
         qcm = QCM.query.get_or_404(qcm_id)
         
-        # Vérifier si l'étudiant a déjà soumis ce QCM
-        resultat_existant = Resultat.query.filter_by(
-            etudiant_id=etudiant.utilisateur_id, 
-            qcm_id=qcm_id
-        ).first()
+        # Vérifier si l'étudiant a déjà soumis ce QCM (soumission ou résultat, par etudiant.id)
+        message_deja_soumis = "Vous avez déjà soumis ce QCM. Vous ne pouvez le passer qu'une seule fois."
+        deja_soumis = db.session.query(
+            ReponseComposee.query.filter_by(etudiant_id=etudiant_id, qcm_id=qcm_id).exists()
+        ).scalar() or db.session.query(
+            Resultat.query.filter_by(etudiant_id=etudiant_id, qcm_id=qcm_id).exists()
+        ).scalar()
         
-        if resultat_existant:
-            return jsonify({
-                "error": "Vous avez déjà soumis ce QCM. Vous ne pouvez le passer qu'une seule fois."
-            }), 400
+        if deja_soumis:
+            return jsonify({"error": message_deja_soumis}), 400
         
         # Calculer le score
         score = 0
@@ -345,7 +358,7 @@ def soumettre_reponses_etudiant():
         
         # Créer la réponse composée (pour l'historique) - SANS CORRECTION
         reponse_composee = ReponseComposee(
-            contenu=str(reponses),
+            contenu=json.dumps(reponses),
             etudiant_id=etudiant_id,
             qcm_id=qcm_id,
             est_correcte=False,  # Pas encore corrigé
@@ -356,8 +369,13 @@ def soumettre_reponses_etudiant():
         # NE PAS créer de résultat immédiatement - attendre la correction par l'enseignant
         
         # Sauvegarder seulement la réponse composée
+        # (deux soumissions simultanées : la contrainte unique étudiant / QCM refuse la seconde)
         db.session.add(reponse_composee)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return jsonify({"error": message_deja_soumis}), 400
         
         return jsonify({
             "message": "Réponses soumises avec succès. En attente de correction par l'enseignant.",
@@ -375,12 +393,21 @@ def soumettre_reponses_etudiant():
 def get_etudiants_composes(qcm_id):
     """
     Récupère la liste des étudiants qui ont composé un QCM spécifique.
+    Une ligne par étudiant : dernière soumission, nombre de soumissions et note,
+    lus en une seule requête paginée (?page=1&par_page=100).
     """
+    from flask import request
     from flask_jwt_extended import get_jwt_identity
-    from ..models.user import Enseignant, Etudiant
-    from sqlalchemy.orm import joinedload
+    from ..models.user import Enseignant, Etudiant, Utilisateur
+    from sqlalchemy import and_, func
     
     try:
+        try:
+            page = max(int(request.args.get('page', 1)), 1)
+            par_page = min(max(int(request.args.get('par_page', PAR_PAGE_DEFAUT)), 1), PAR_PAGE_MAX)
+        except ValueError:
+            return jsonify({"error": "Les paramètres 'page' et 'par_page' doivent être des entiers"}), 400
+        
         # Vérifier que l'utilisateur est un enseignant
         current_user_id = get_jwt_identity()
         enseignant = Enseignant.query.filter_by(utilisateur_id=current_user_id).first()
@@ -391,45 +418,71 @@ def get_etudiants_composes(qcm_id):
         # Vérifier que le QCM existe
         qcm = QCM.query.get_or_404(qcm_id)
         
-        # Récupérer les réponses composées pour ce QCM
-        reponses_composees = ReponseComposee.query.options(
-            joinedload(ReponseComposee.etudiant).joinedload(Etudiant.utilisateur)
-        ).filter_by(qcm_id=qcm_id).all()
-        
-        # Grouper par étudiant et compter les soumissions
-        etudiants_composes = []
-        etudiants_vus = set()
+        # Soumissions du QCM : rang 1 = dernière soumission de l'étudiant, nombre par étudiant
+        soumissions = db.session.query(
+            ReponseComposee.etudiant_id,
+            ReponseComposee.statut,
+            ReponseComposee.date_soumission,
+            func.count(ReponseComposee.id).over(
+                partition_by=ReponseComposee.etudiant_id
+            ).label('soumissions_count'),
+            func.row_number().over(
+                partition_by=ReponseComposee.etudiant_id,
+                order_by=(ReponseComposee.date_soumission.desc(), ReponseComposee.id.desc())
+            ).label('rang')
+        ).filter(ReponseComposee.qcm_id == qcm_id).subquery()
+        
+        # Résultat le plus récent de l'étudiant (Resultat.etudiant_id référence etudiant.id)
+        resultats = db.session.query(
+            Resultat.etudiant_id,
+            Resultat.note,
+            func.row_number().over(
+                partition_by=Resultat.etudiant_id,
+                order_by=(Resultat.date_correction.desc(), Resultat.id.desc())
+            ).label('rang')
+        ).filter(Resultat.qcm_id == qcm_id).subquery()
+        
+        lignes = db.session.query(
+            soumissions.c.etudiant_id,
+            Etudiant.matriculeId,
+            Utilisateur.username,
+            soumissions.c.statut,
+            soumissions.c.date_soumission,
+            soumissions.c.soumissions_count,
+            resultats.c.note,
+            func.count().over().label('total')
+        ).join(
+            Etudiant, Etudiant.id == soumissions.c.etudiant_id
+        ).join(
+            Utilisateur, Utilisateur.id == Etudiant.utilisateur_id
+        ).outerjoin(
+            resultats, and_(resultats.c.etudiant_id == soumissions.c.etudiant_id, resultats.c.rang == 1)
+        ).filter(
+            soumissions.c.rang == 1
+        ).order_by(
+            Utilisateur.username, soumissions.c.etudiant_id
+        ).limit(par_page).offset((page - 1) * par_page).all()
+        
+        if lignes:
+            total = lignes[0].total
+        else:
+            # Page au-delà de la fin : le total n'est pas porté par les lignes
+            total = db.session.query(func.count(func.distinct(ReponseComposee.etudiant_id))).filter(
+                ReponseComposee.qcm_id == qcm_id
+            ).scalar()
         
-        for reponse in reponses_composees:
-            etudiant_id = reponse.etudiant_id
-            if etudiant_id not in etudiants_vus:
-                etudiants_vus.add(etudiant_id)
-                
-                # Compter les soumissions pour cet étudiant
-                soumissions_count = ReponseComposee.query.filter_by(
-                    etudiant_id=etudiant_id, 
-                    qcm_id=qcm_id
-                ).count()
-                
-                # Récupérer la note si l'étudiant a été corrigé
-                note = None
-                resultat = Resultat.query.filter_by(
-                    etudiant_id=reponse.etudiant.utilisateur_id,
-                    qcm_id=qcm_id
-                ).first()
-                
-                if resultat:
-                    note = resultat.note
-                
-                etudiants_composes.append({
-                    'etudiant_id': etudiant_id,
-                    'matricule': reponse.etudiant.matriculeId,
-                    'nom': reponse.etudiant.utilisateur.username,
-                    'statut': reponse.statut,
-                    'date_soumission': reponse.date_soumission.isoformat(),
-                    'soumissions_count': soumissions_count,
-                    'note': note
-                })
+        etudiants_composes = [
+            {
+                'etudiant_id': ligne.etudiant_id,
+                'matricule': ligne.matriculeId,
+                'nom': ligne.username,
+                'statut': ligne.statut,
+                'date_soumission': ligne.date_soumission.isoformat() if ligne.date_soumission else None,
+                'soumissions_count': ligne.soumissions_count,
+                'note': ligne.note
+            }
+            for ligne in lignes
+        ]
         
         return jsonify({
             'qcm': {
@@ -438,7 +491,12 @@ def get_etudiants_composes(qcm_id):
                 'matiere': qcm.matiere.nom if qcm.matiere else 'N/A'
             },
             'etudiants_composes': etudiants_composes,
-            'total_etudiants': len(etudiants_composes)
+            'total_etudiants': total,
+            'pagination': {
+                'page': page,
+                'par_page': par_page,
+                'pages': (total + par_page - 1) // par_page
+            }
         }), 200
         
     except Exception as e:
@@ -450,9 +508,13 @@ def get_etudiants_composes(qcm_id):
 def corriger_qcm(qcm_id):
     """
     Corrige automatiquement toutes les réponses soumises pour un QCM.
+    Un QCM déjà corrigé peut l'être à nouveau pour les soumissions arrivées depuis
+    (correction tardive) : seules celles-ci sont corrigées.
     """
     from flask_jwt_extended import get_jwt_identity
     from ..models.user import Enseignant, Etudiant
+    from ..services.analyse_items import invalider_analyse_items
+    from ..services.classement_qcm import ajouter_notes_qcm, calculer_statistiques_qcm
     from sqlalchemy.orm import joinedload
     
     try:
@@ -466,17 +528,23 @@ def corriger_qcm(qcm_id):
         # Vérifier que le QCM existe
         qcm = QCM.query.get_or_404(qcm_id)
         
-        # Vérifier s'il existe déjà des résultats pour ce QCM (empêcher la correction multiple)
-        resultats_existants = Resultat.query.filter_by(qcm_id=qcm_id).first()
-        if resultats_existants:
-            return jsonify({"error": "Ce QCM a déjà été corrigé. Impossible de le corriger à nouveau."}), 400
+        # Étudiants déjà notés sur ce QCM : jamais notés deux fois (empêcher la correction multiple)
+        etudiants_corriges = {
+            etudiant_id for (etudiant_id,) in db.session.query(Resultat.etudiant_id).filter_by(qcm_id=qcm_id)
+        }
+        correction_tardive = bool(etudiants_corriges)
         
         # Récupérer toutes les réponses soumises pour ce QCM
-        reponses_composees = ReponseComposee.query.options(
-            joinedload(ReponseComposee.etudiant).joinedload(Etudiant.utilisateur)
-        ).filter_by(qcm_id=qcm_id, statut='soumis').all()
+        reponses_composees = [
+            reponse for reponse in ReponseComposee.query.options(
+                joinedload(ReponseComposee.etudiant).joinedload(Etudiant.utilisateur)
+            ).filter_by(qcm_id=qcm_id, statut='soumis').all()
+            if reponse.etudiant_id not in etudiants_corriges
+        ]
         
         if not reponses_composees:
+            if correction_tardive:
+                return jsonify({"error": "Ce QCM a déjà été corrigé. Impossible de le corriger à nouveau."}), 400
             return jsonify({"error": "Aucune réponse en attente de correction"}), 404
         
         corrections_reussies = []
@@ -486,25 +554,16 @@ def corriger_qcm(qcm_id):
             reponse.statut = 'en_correction'
             db.session.add(reponse)
             
-            # Parser les réponses de l'étudiant
-            import json
-            try:
-                reponses_etudiant = json.loads(reponse.contenu)
-            except:
-                reponses_etudiant = eval(reponse.contenu)  # Fallback pour l'ancien format
+            # Parser les réponses de l'étudiant (JSON ou ancien format str(dict))
+            options_choisies = reponse.get_options_choisies()
             
             # Calculer le score
             score = 0
             total_questions = len(qcm.questions)
             
             for question in qcm.questions:
-                if str(question.id) in reponses_etudiant:
-                    selected_option = reponses_etudiant[str(question.id)]
-                    if "_" in selected_option:
-                        question_id, option_index = selected_option.split("_")
-                        if int(question_id) == question.id:
-                            if question.is_correct_answer(int(option_index)):
-                                score += 1
+                if question.id in options_choisies and question.is_correct_answer(options_choisies[question.id]):
+                    score += 1
             
             # Créer le résultat
             nombre_incorrectes = total_questions - score
@@ -522,8 +581,8 @@ def corriger_qcm(qcm_id):
                 evaluation_id=None
             )
             
-            # Générer le feedback automatiquement
-            resultat.generer_feedback()
+            # Générer le feedback automatiquement (validé avec la distribution, en un seul commit)
+            resultat.definir_feedback()
             
             # Marquer la réponse comme corrigée
             reponse.est_correcte = (score == total_questions)
@@ -541,11 +600,19 @@ def corriger_qcm(qcm_id):
                 'score': f"{score}/{total_questions}"
             })
         
+        # Distribution des notes (rang, percentile, histogramme) : fusion incrémentale si correction tardive
+        if correction_tardive:
+            ajouter_notes_qcm(qcm_id, [c['note'] for c in corrections_reussies])
+        else:
+            calculer_statistiques_qcm(qcm_id)
+        
         # Sauvegarder toutes les corrections
         db.session.commit()
+        invalider_analyse_items(qcm_id)
         
         return jsonify({
             'message': f'Correction terminée pour {len(corrections_reussies)} étudiants',
+            'correction_tardive': correction_tardive,
             'corrections': corrections_reussies,
             'statistiques': {
                 'total_corriges': len(corrections_reussies),
@@ -558,6 +625,146 @@ def corriger_qcm(qcm_id):
         return jsonify({"error": str(e)}), 500
 
 
+@qcm_bp.route("/enseignant/qcm/<int:qcm_id>/statistiques", methods=["GET"])
+@jwt_required()
+def get_statistiques_qcm(qcm_id):
+    """
+    Statistiques de la classe sur un QCM (notes, taux de réussite, questions difficiles).
+    Calculées à partir des résultats enregistrés, sans recorriger.
+    """
+    from flask_jwt_extended import get_jwt_identity
+    from ..models.user import Enseignant
+    from ..services.analytics_service import AnalyticsService
+    from ..services.correction_service import CorrectionService
+    
+    try:
+        # Vérifier que l'utilisateur est un enseignant
+        current_user_id = get_jwt_identity()
+        enseignant = Enseignant.query.filter_by(utilisateur_id=current_user_id).first()
+        
+        if not enseignant:
+            return jsonify({"error": "Accès non autorisé"}), 403
+        
+        qcm = QCM.query.get_or_404(qcm_id)
+        
+        stats = AnalyticsService().analyser_qcm(qcm_id)
+        stats["recommandations"] = CorrectionService().generer_recommandations_enseignant(stats)
+        
+        return jsonify({
+            'qcm': {
+                'id': qcm.id,
+                'titre': qcm.titre,
+                'matiere': qcm.matiere.nom if qcm.matiere else 'N/A'
+            },
+            'statistiques': stats
+        }), 200
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@qcm_bp.route("/enseignant/qcm/<int:qcm_id>/analyse-items", methods=["GET"])
+@jwt_required()
+def get_analyse_items_qcm(qcm_id):
+    """
+    Analyse d'items d'un QCM : difficulté, discrimination et distracteurs de chaque question,
+    alpha de Cronbach. Mise en cache jusqu'à la prochaine correction.
+    """
+    from flask_jwt_extended import get_jwt_identity
+    from ..models.user import Enseignant
+    from ..services.analyse_items import obtenir_analyse_items
+    
+    try:
+        # Vérifier que l'utilisateur est un enseignant
+        current_user_id = get_jwt_identity()
+        enseignant = Enseignant.query.filter_by(utilisateur_id=current_user_id).first()
+        
+        if not enseignant:
+            return jsonify({"error": "Accès non autorisé"}), 403
+        
+        qcm = QCM.query.get_or_404(qcm_id)
+        
+        return jsonify({
+            'qcm': {
+                'id': qcm.id,
+                'titre': qcm.titre
+            },
+            'analyse': obtenir_analyse_items(qcm_id)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@qcm_bp.route("/enseignant/qcm/<int:qcm_id>/distribution", methods=["GET"])
+@jwt_required()
+def get_distribution_qcm(qcm_id):
+    """
+    Distribution des notes d'un QCM (moyenne, médiane, écart-type, histogramme par tranche de 2 points).
+    Calculée à la correction, lue sans parcourir les résultats.
+    """
+    from flask_jwt_extended import get_jwt_identity
+    from ..models.user import Enseignant
+    from ..services.classement_qcm import obtenir_statistiques_qcm
+    
+    try:
+        # Vérifier que l'utilisateur est un enseignant
+        current_user_id = get_jwt_identity()
+        enseignant = Enseignant.query.filter_by(utilisateur_id=current_user_id).first()
+        
+        if not enseignant:
+            return jsonify({"error": "Accès non autorisé"}), 403
+        
+        qcm = QCM.query.get_or_404(qcm_id)
+        
+        return jsonify({
+            'qcm': {
+                'id': qcm.id,
+                'titre': qcm.titre
+            },
+            'distribution': obtenir_statistiques_qcm(qcm_id).to_dict()
+        }), 200
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@qcm_bp.route("/etudiant/qcm/<int:qcm_id>/classement", methods=["GET"])
+@jwt_required()
+def get_classement_etudiant(qcm_id):
+    """
+    Rang et percentile de l'étudiant connecté sur un QCM corrigé, avec la distribution
+    (anonyme) des notes de la classe.
+    """
+    from ..models.user import Etudiant
+    from flask_jwt_extended import get_jwt_identity
+    from ..services.classement_qcm import classement, obtenir_statistiques_qcm
+    
+    try:
+        utilisateur_id = get_jwt_identity()
+        
+        # Récupérer l'étudiant
+        etudiant = Etudiant.query.filter_by(utilisateur_id=utilisateur_id).first()
+        if not etudiant:
+            return jsonify({"error": "Étudiant non trouvé"}), 404
+        
+        resultat = Resultat.query.filter_by(etudiant_id=etudiant.id, qcm_id=qcm_id).first()
+        if not resultat:
+            return jsonify({"error": "Aucun résultat corrigé pour ce QCM"}), 404
+        
+        statistiques = obtenir_statistiques_qcm(qcm_id)
+        
+        return jsonify({
+            'qcm_id': qcm_id,
+            'note': resultat.note,
+            **classement(statistiques, resultat.note),
+            'distribution': statistiques.to_dict()
+        }), 200
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @qcm_bp.route("/etudiant/resultats", methods=["GET"])
 @jwt_required()
 def get_resultats_etudiant():
@@ -566,6 +773,7 @@ def get_resultats_etudiant():
     """
     from ..models.user import Etudiant
     from flask_jwt_extended import get_jwt_identity
+    from sqlalchemy.orm import joinedload
     
     try:
         utilisateur_id = get_jwt_identity()
@@ -575,8 +783,10 @@ def get_resultats_etudiant():
         if not etudiant:
             return jsonify({"error": "Étudiant non trouvé"}), 404
         
-        # Récupérer tous les résultats corrigés de l'étudiant
-        resultats = Resultat.query.filter_by(etudiant_id=etudiant.id).all()
+        # Récupérer tous les résultats corrigés de l'étudiant (QCM chargés avec, pour les titres)
+        resultats = Resultat.query.options(
+            joinedload(Resultat.qcm)
+        ).filter_by(etudiant_id=etudiant.id).all()
         
         resultats_data = []
         for resultat in resultats:
@@ -596,7 +806,9 @@ def get_resultats_etudiant():
             })
         
         # Récupérer les soumissions en attente de correction
-        reponses_attente = ReponseComposee.query.filter_by(
+        reponses_attente = ReponseComposee.query.options(
+            joinedload(ReponseComposee.qcm)
+        ).filter_by(
             etudiant_id=etudiant.id,
             statut='soumis'
         ).all()
@@ -661,31 +873,25 @@ def get_profil_etudiant():
             'notes': []  # Sera récupéré depuis les résultats
         }
         
-        # Récupérer les notes/résultats de l'étudiant
+        # Moyennes par matière : une ligne de résumé par matière (voir services/resume_notes.py)
         from ..models.matiere import Matiere
+        from ..models.resume_notes import ResumeNotes
         
-        resultats = db.session.query(Resultat).join(QCM).join(Matiere).filter(
-            Resultat.etudiant_id == etudiant.id
-        ).all()
-        
-        # Grouper les notes par matière et calculer la moyenne
-        notes_par_matiere = {}
-        for resultat in resultats:
-            matiere_nom = resultat.qcm.matiere.nom if resultat.qcm and resultat.qcm.matiere else "Matière inconnue"
-            if matiere_nom not in notes_par_matiere:
-                notes_par_matiere[matiere_nom] = []
-            notes_par_matiere[matiere_nom].append(resultat.note)
-        
-        # Créer la liste des notes avec moyennes
-        notes_list = []
-        for matiere, notes in notes_par_matiere.items():
-            moyenne = sum(notes) / len(notes) if notes else 0
-            notes_list.append({
-                'matiere': matiere,
-                'note': round(moyenne, 2)
-            })
+        resumes = db.session.query(
+            Matiere.nom, ResumeNotes.moyenne, ResumeNotes.nombre, ResumeNotes.derniere_date
+        ).join(Matiere, Matiere.id == ResumeNotes.matiere_id).filter(
+            ResumeNotes.etudiant_id == etudiant.id
+        ).order_by(Matiere.nom).all()
         
-        profil_data['notes'] = notes_list
+        profil_data['notes'] = [
+            {
+                'matiere': nom,
+                'note': round(moyenne, 2),
+                'nombre': nombre,
+                'derniere_date': derniere_date.isoformat() if derniere_date else None
+            }
+            for nom, moyenne, nombre, derniere_date in resumes
+        ]
         
         return jsonify(profil_data), 200
 
@@ -969,6 +1175,101 @@ def get_matieres_enseignant():
         return jsonify({"error": str(e)}), 500
 
 
+def _charger_cibles_generation_ia(data):
+    """
+    Valide une requête de génération IA et charge l'enseignant, la matière, le niveau et le parcours.
+    
+    Returns:
+        ((enseignant, matiere, niveau, parcours), None) ou (None, (réponse JSON, code HTTP))
+    """
+    from flask_jwt_extended import get_jwt_identity
+    from ..models.user import Enseignant
+    from ..models.matiere import Matiere
+    from ..models.niveau_parcours import Niveau, Parcours
+    
+    if not data:
+        return None, (jsonify({"error": "Corps de requête JSON requis"}), 400)
+    required_fields = ['sujet', 'matiere_id', 'niveau_id', 'parcours_id']
+    for field in required_fields:
+        if field not in data:
+            return None, (jsonify({"error": f"Le champ '{field}' est requis"}), 400)
+    
+    # Récupérer l'enseignant depuis le token JWT
+    enseignant_id = get_jwt_identity()
+    enseignant = Enseignant.query.filter_by(utilisateur_id=enseignant_id).first()
+    if not enseignant:
+        return None, (jsonify({"error": "Enseignant non trouvé"}), 404)
+    
+    # Récupérer les informations de la matière, niveau et parcours
+    matiere = Matiere.query.get(data['matiere_id'])
+    niveau = Niveau.query.get(data['niveau_id'])
+    parcours = Parcours.query.get(data['parcours_id'])
+    
+    if not matiere or not niveau or not parcours:
+        return None, (jsonify({"error": "Matière, niveau ou parcours non trouvé"}), 404)
+    
+    return (enseignant, matiere, niveau, parcours), None
+
+
+def _document_source(data, enseignant):
+    """Document de l'enseignant choisi comme source (champ optionnel document_id) : (document, erreur)"""
+    from ..models.document import Document
+    
+    if not data.get('document_id'):
+        return None, None
+    document = Document.query.filter_by(id=data['document_id'], enseignant_id=enseignant.utilisateur_id).first()
+    if not document:
+        return None, (jsonify({"error": "Document non trouvé ou accès refusé"}), 404)
+    return document, None
+
+
+def _document_par_defaut(enseignant):
+    """Document auquel rattacher les QCM générés par IA (créé s'il n'en existe aucun)"""
+    from ..models.document import Document
+    
+    # Chercher un document existant ou en créer un
+    document = Document.query.first()
+    if not document:
+        document = Document(
+            titre="Document par défaut",
+            type="default",
+            contenu="Document par défaut pour les QCM",
+            enseignant_id=enseignant.id
+        )
+        db.session.add(document)
+        db.session.flush()
+    return document
+
+
+def _titre_qcm_ia(sujet_brut):
+    """Génère un titre court et intelligent pour un QCM IA à partir du sujet (ou d'un long prompt)"""
+    import re
+    
+    if len(sujet_brut) > 100:
+        # Si le sujet est un long prompt, extraire l'essentiel
+        
+        # Essayer d'extraire le thème entre guillemets
+        match = re.search(r'["\']([^"\']{5,100})["\']', sujet_brut)
+        if match:
+            sujet_court = match.group(1)
+        elif "sur le thème" in sujet_brut.lower():
+            # Extraire après "sur le thème"
+            match = re.search(r'sur le thème[:\s]*["\']?([^"\'.\n]{5,100})', sujet_brut, re.IGNORECASE)
+            sujet_court = match.group(1) if match else sujet_brut[:80]
+        elif "sur" in sujet_brut.lower() and "qcm" in sujet_brut.lower():
+            # Extraire après "sur"
+            match = re.search(r'sur[:\s]+([^.\n]{5,80})', sujet_brut, re.IGNORECASE)
+            sujet_court = match.group(1) if match else sujet_brut[:80]
+        else:
+            # Prendre les premiers mots
+            sujet_court = sujet_brut.split('.')[0][:80]
+    else:
+        sujet_court = sujet_brut
+    
+    # Créer le titre final (max 255 caractères)
+    return f"QCM IA - {sujet_court.strip()}"[:255]
+
+
 @qcm_bp.route("/generate-ai", methods=["POST"])
 @jwt_required()
 def generate_qcm_ai():
@@ -976,50 +1277,44 @@ def generate_qcm_ai():
     Génère automatiquement un QCM avec Hugging Face basé sur un sujet donné.
     """
     from flask import request
-    from flask_jwt_extended import get_jwt_identity
-    from ..services.hugging_face_service import HuggingFaceService
-    from ..models.user import Enseignant
-    from ..models.document import Document
-    from ..models.matiere import Matiere
-    from ..models.niveau_parcours import Niveau, Parcours
+    from ..services.ia import obtenir_service_ia
     
     try:
         data = request.get_json()
         
-        # Validation des données
-        required_fields = ['sujet', 'matiere_id', 'niveau_id', 'parcours_id']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({"error": f"Le champ '{field}' est requis"}), 400
-        
-        # Récupérer l'enseignant depuis le token JWT
-        enseignant_id = get_jwt_identity()
-        enseignant = Enseignant.query.filter_by(utilisateur_id=enseignant_id).first()
-        if not enseignant:
-            return jsonify({"error": "Enseignant non trouvé"}), 404
-        
-        # Récupérer les informations de la matière, niveau et parcours
-        matiere = Matiere.query.get(data['matiere_id'])
-        niveau = Niveau.query.get(data['niveau_id'])
-        parcours = Parcours.query.get(data['parcours_id'])
-        
-        if not matiere or not niveau or not parcours:
-            return jsonify({"error": "Matière, niveau ou parcours non trouvé"}), 404
+        # Validation des données, enseignant, matière, niveau et parcours
+        cibles, erreur = _charger_cibles_generation_ia(data)
+        if erreur:
+            return erreur
+        enseignant, matiere, niveau, parcours = cibles
         
         # Paramètres optionnels
         nombre_questions = data.get('nombre_questions', 5)
         duree_minutes = data.get('duree_minutes', 60)
         difficulte = data.get('difficulte', 'Moyen')
         contexte = data.get('contexte')  # Prompt détaillé optionnel
+        fresh = bool(data.get('fresh', False))  # Ignorer le cache de génération
+        # Document source optionnel : son contenu sert de contexte et son index disque est réutilisé
+        document_source, erreur = _document_source(data, enseignant)
+        if erreur:
+            return erreur
+        if document_source and not contexte:
+            contexte = document_source.contenu
+        profil = data.get('profil')  # Profil de décodage : rapide / equilibre / qualite (fast / balanced / quality)
+        langue = data.get('langue') or matiere.langue_cible  # Langue des questions : fr / en
         
         # Générer le QCM avec Hugging Face
-        hf_service = HuggingFaceService()
+        try:
+            hf_service = obtenir_service_ia(forcer_regeneration=fresh, profil=profil, langue=langue)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         result = hf_service.generer_qcm_complet(
             sujet=data['sujet'],
             matiere=matiere.nom,
             niveau=niveau.code,
             nombre_questions=nombre_questions,
-            contexte=contexte  # Nouveau paramètre
+            contexte=contexte,  # Nouveau paramètre
+            document_id=document_source.id if document_source and contexte == document_source.contenu else None
         )
         
         if not result['success']:
@@ -1027,8 +1322,7 @@ def generate_qcm_ai():
             if "Invalid credentials" in result.get('error', ''):
                 current_app.logger.warning("Token Hugging Face invalide, utilisation des questions de test")
                 # Utiliser les questions de test
-                from ..services.hugging_face_service import HuggingFaceService
-                hf_service = HuggingFaceService()
+                hf_service = obtenir_service_ia()
                 result = hf_service._generer_questions_test(
                     data['sujet'], 
                     matiere.nom, 
@@ -1038,47 +1332,9 @@ def generate_qcm_ai():
             else:
                 return jsonify({"error": f"Erreur génération IA: {result['error']}"}), 500
         
-        # Solution temporaire : utiliser un document existant ou en créer un
-        from ..models.document import Document
-        
-        # Chercher un document existant ou en créer un
-        document = Document.query.first()
-        if not document:
-            document = Document(
-                titre="Document par défaut",
-                type="default",
-                contenu="Document par défaut pour les QCM",
-                enseignant_id=enseignant.id
-            )
-            db.session.add(document)
-            db.session.flush()
-        
-        # Générer un titre court et intelligent pour le QCM
-        sujet_brut = data['sujet']
-        if len(sujet_brut) > 100:
-            # Si le sujet est un long prompt, extraire l'essentiel
-            import re
-            
-            # Essayer d'extraire le thème entre guillemets
-            match = re.search(r'["\']([^"\']{5,100})["\']', sujet_brut)
-            if match:
-                sujet_court = match.group(1)
-            elif "sur le thème" in sujet_brut.lower():
-                # Extraire après "sur le thème"
-                match = re.search(r'sur le thème[:\s]*["\']?([^"\'.\n]{5,100})', sujet_brut, re.IGNORECASE)
-                sujet_court = match.group(1) if match else sujet_brut[:80]
-            elif "sur" in sujet_brut.lower() and "qcm" in sujet_brut.lower():
-                # Extraire après "sur"
-                match = re.search(r'sur[:\s]+([^.\n]{5,80})', sujet_brut, re.IGNORECASE)
-                sujet_court = match.group(1) if match else sujet_brut[:80]
-            else:
-                # Prendre les premiers mots
-                sujet_court = sujet_brut.split('.')[0][:80]
-        else:
-            sujet_court = sujet_brut
-        
-        # Créer le titre final (max 255 caractères)
-        titre_qcm = f"QCM IA - {sujet_court.strip()}"[:255]
+        # Document source choisi, sinon solution temporaire : un document existant ou créé
+        document = document_source or _document_par_defaut(enseignant)
+        titre_qcm = _titre_qcm_ia(data['sujet'])
         
         # Créer le QCM avec le document
         qcm = QCM(
@@ -1142,6 +1398,150 @@ def generate_qcm_ai():
         return jsonify({"error": str(e)}), 500
 
 
+def _evenement_sse(nom, donnees):
+    """Formate un événement Server-Sent Events"""
+    import json
+    return f"event: {nom}\ndata: {json.dumps(donnees, ensure_ascii=False)}\n\n"
+
+
+@qcm_bp.route("/generate-ai/stream", methods=["POST"])
+@jwt_required()
+def generate_qcm_ai_stream():
+    """
+    Variante en streaming (Server-Sent Events) de /generate-ai.
+    
+    Le QCM est créé immédiatement, puis chaque question est enregistrée (commit) et
+    envoyée dès qu'elle est générée et traduite. Si le client se déconnecte, les
+    questions déjà enregistrées sont conservées.
+    
+    Événements : "qcm" (QCM créé), "question" (une par question), "fin", "erreur".
+    """
+    from flask import request, Response, stream_with_context
+    from ..services.ia import obtenir_service_ia
+    
+    data = request.get_json(silent=True)
+    
+    # Validation des données, enseignant, matière, niveau et parcours
+    cibles, erreur = _charger_cibles_generation_ia(data)
+    if erreur:
+        return erreur
+    enseignant, matiere, niveau, parcours = cibles
+    
+    # Paramètres optionnels
+    nombre_questions = data.get('nombre_questions', 5)
+    duree_minutes = data.get('duree_minutes', 60)
+    difficulte = data.get('difficulte', 'Moyen')
+    contexte = data.get('contexte')  # Prompt détaillé optionnel
+    fresh = bool(data.get('fresh', False))  # Ignorer le cache de génération
+    # Document source optionnel : son contenu sert de contexte et son index disque est réutilisé
+    document_source, erreur = _document_source(data, enseignant)
+    if erreur:
+        return erreur
+    if document_source and not contexte:
+        contexte = document_source.contenu
+    document_id = document_source.id if document_source and contexte == document_source.contenu else None
+    
+    try:
+        hf_service = obtenir_service_ia(
+            forcer_regeneration=fresh,
+            profil=data.get('profil'),
+            langue=data.get('langue') or matiere.langue_cible
+        )
+        difficulte_qcm = Difficulte(difficulte)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    # Le QCM existe avant la première question : chaque question y est rattachée dès sa génération
+    titre_qcm = _titre_qcm_ia(data['sujet'])
+    try:
+        document = document_source or _document_par_defaut(enseignant)
+        qcm = QCM(
+            titre=titre_qcm,
+            type_exercice=TypeExercice.QCM,
+            difficulte=difficulte_qcm,
+            duree_minutes=duree_minutes,
+            document_id=document.id,
+            est_cible=True,
+            niveau_id=data['niveau_id'],
+            parcours_id=data['parcours_id'],
+            matiere_id=data['matiere_id']
+        )
+        db.session.add(qcm)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Erreur création QCM IA (streaming): {str(e)}")
+        return jsonify({"error": str(e)}), 500
+    
+    qcm_id = qcm.id
+    
+    def evenements():
+        questions_ajoutees = 0
+        
+        def enregistrer(question_data):
+            question = Question(
+                question=question_data['texte'],
+                qcm_id=qcm_id,
+                reponse1=question_data['reponse1'],
+                reponse2=question_data['reponse2'],
+                reponse3=question_data['reponse3'],
+                reponse4=question_data['reponse4'],
+                bonne_reponse=question_data['bonne_reponse']
+            )
+            db.session.add(question)
+            db.session.commit()
+            return _evenement_sse("question", {"index": questions_ajoutees + 1, "question": question.to_dict()})
+        
+        try:
+            yield _evenement_sse("qcm", {"qcm_id": qcm_id, "titre": titre_qcm, "nombre_questions": nombre_questions})
+            
+            for question_data in hf_service.iterer_qcm_complet(
+                sujet=data['sujet'],
+                matiere=matiere.nom,
+                niveau=niveau.code,
+                nombre_questions=nombre_questions,
+                contexte=contexte,
+                document_id=document_id
+            ):
+                yield enregistrer(question_data)
+                questions_ajoutees += 1
+                if questions_ajoutees >= nombre_questions:
+                    break
+            
+            if questions_ajoutees == 0:
+                # Aucune question du modèle : utiliser les questions de test
+                current_app.logger.warning("Aucune question générée par le modèle, utilisation des questions de test")
+                for question_data in hf_service._generer_questions_test(
+                    data['sujet'], matiere.nom, niveau.code, nombre_questions
+                )['questions']:
+                    yield enregistrer(question_data)
+                    questions_ajoutees += 1
+            
+            yield _evenement_sse("fin", {
+                "message": f"QCM généré avec succès avec {questions_ajoutees} questions",
+                "qcm_id": qcm_id,
+                "questions_generes": questions_ajoutees,
+                "sujet": data['sujet'],
+                "matiere": matiere.nom,
+                "niveau": niveau.code,
+                "parcours": parcours.code
+            })
+        
+        except GeneratorExit:
+            current_app.logger.info(f"🔌 Client déconnecté : {questions_ajoutees} question(s) déjà enregistrée(s) pour le QCM {qcm_id}")
+            raise
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Erreur génération QCM IA (streaming): {str(e)}")
+            yield _evenement_sse("erreur", {"error": str(e), "qcm_id": qcm_id, "questions_generes": questions_ajoutees})
+    
+    response = Response(stream_with_context(evenements()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    # Pas de mise en tampon par un reverse proxy (nginx) : chaque événement part immédiatement
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
 @qcm_bp.route("/<int:qcm_id>/publier", methods=["POST"])
 @jwt_required()
 def publier_qcm(qcm_id):
@@ -1187,6 +1587,7 @@ def supprimer_qcm(qcm_id):
     from flask_jwt_extended import get_jwt_identity
     from ..models.user import Utilisateur, Enseignant
     from ..models.matiere import AssignationMatiereEnseignant
+    from ..models.statistiques_qcm import StatistiquesQCM
     
     try:
         utilisateur_id = get_jwt_identity()
@@ -1259,8 +1660,12 @@ def supprimer_qcm(qcm_id):
             # 1. Supprimer les réponses composées des étudiants
             ReponseComposee.query.filter_by(qcm_id=qcm_id).delete()
             
-            # 2. Supprimer les résultats des étudiants
+            # 2. Supprimer les résultats des étudiants (suppression en masse : résumés recalculés ensuite)
+            from ..services.resume_notes import recalculer_resumes_notes
+            etudiant_ids = [e for (e,) in db.session.query(Resultat.etudiant_id).filter_by(qcm_id=qcm_id).distinct()]
             Resultat.query.filter_by(qcm_id=qcm_id).delete()
+            recalculer_resumes_notes(etudiant_ids, [qcm.matiere_id])
+            StatistiquesQCM.query.filter_by(qcm_id=qcm_id).delete()
             
             # 3. Supprimer les questions du QCM (les options sont dans la table Question maintenant)
             Question.query.filter_by(qcm_id=qcm_id).delete()
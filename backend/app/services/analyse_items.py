@@ -0,0 +1,243 @@
+"""
+Analyse d'items des QCM (qualité des questions), vectorisée avec NumPy.
+
+Les soumissions corrigées d'un QCM sont chargées en une matrice étudiants × questions
+des options choisies (0 = pas de réponse). Une seule passe calcule :
+- l'indice de difficulté (p-value : proportion de bonnes réponses)
+- la discrimination (corrélation point-bisériale entre l'item et le score sur les autres items)
+- la fréquence de choix de chaque option (distracteurs)
+- l'alpha de Cronbach du QCM
+
+Les résultats sont gardés en mémoire par QCM. L'entrée est invalidée après une
+correction, et l'empreinte des soumissions (nombre, dernier id) la rend
+obsolète dans les autres workers.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import func
+
+from ..extensions import db
+from ..models.qcm import Question
+from ..models.reponse_composee import ReponseComposee
+from ..utils.metriques import metriques
+
+
+NOMBRE_OPTIONS = 4
+
+# Seuils usuels de l'analyse d'items
+SEUIL_TROP_DIFFICILE = 0.2
+SEUIL_TROP_FACILE = 0.9
+SEUIL_DISCRIMINATION = 0.2
+SEUIL_DISTRACTEUR = 0.05
+
+TAILLE_MAX_CACHE = 256
+
+_cache: "OrderedDict[int, Tuple[tuple, Dict[str, Any]]]" = OrderedDict()
+_verrou = threading.Lock()
+
+
+# ============================================================================
+# MATRICE DES RÉPONSES
+# ============================================================================
+
+def _filtre_soumissions(qcm_id: int):
+    return (ReponseComposee.qcm_id == qcm_id, ReponseComposee.statut == 'corrigé')
+
+
+def empreinte_qcm(qcm_id: int) -> tuple:
+    """Empreinte des soumissions corrigées et des questions : change dès qu'une correction arrive"""
+    soumissions = db.session.query(
+        func.count(ReponseComposee.id), func.max(ReponseComposee.id)
+    ).filter(*_filtre_soumissions(qcm_id)).one()
+    questions = db.session.query(
+        func.count(Question.id), func.max(Question.id)
+    ).filter(Question.qcm_id == qcm_id).one()
+    return tuple(soumissions) + tuple(questions)
+
+
+def construire_matrice(qcm_id: int) -> Tuple[List[Any], np.ndarray, np.ndarray]:
+    """
+    Charge les soumissions corrigées d'un QCM.
+
+    Returns:
+        (questions, choix, bonnes) : lignes Question (id, question, bonne_reponse),
+        matrice int8 étudiants × questions des options choisies (0 = pas de réponse),
+        vecteur des bonnes réponses
+    """
+    questions = db.session.query(
+        Question.id, Question.question, Question.bonne_reponse
+    ).filter(Question.qcm_id == qcm_id).order_by(Question.id).all()
+    contenus = [c for (c,) in db.session.query(ReponseComposee.contenu).filter(*_filtre_soumissions(qcm_id))]
+
+    colonnes = {q.id: j for j, q in enumerate(questions)}
+    lignes, cols, valeurs = [], [], []
+    for i, contenu in enumerate(contenus):
+        for question_id, option in ReponseComposee.lire_options_choisies(contenu).items():
+            j = colonnes.get(question_id)
+            if j is not None and 1 <= option <= NOMBRE_OPTIONS:
+                lignes.append(i)
+                cols.append(j)
+                valeurs.append(option)
+
+    choix = np.zeros((len(contenus), len(questions)), dtype=np.int8)
+    choix[lignes, cols] = valeurs
+    bonnes = np.array([q.bonne_reponse or 0 for q in questions], dtype=np.int8)
+    return questions, choix, bonnes
+
+
+# ============================================================================
+# CALCULS
+# ============================================================================
+
+def analyser_matrice(choix: np.ndarray, bonnes: np.ndarray) -> Dict[str, Any]:
+    """
+    Indicateurs d'items d'une matrice de choix (étudiants × questions).
+
+    Returns:
+        {"difficulte", "discrimination", "frequences_options", "alpha_cronbach", "scores"}
+        difficulte / discrimination : vecteurs par question (NaN si non calculable) ;
+        frequences_options : matrice questions × (NOMBRE_OPTIONS + 1), colonne 0 = sans réponse
+        (NaN sans soumission)
+    """
+    nombre_etudiants, nombre_questions = choix.shape
+    correct = (choix == bonnes[np.newaxis, :]).astype(np.float64)
+    scores = correct.sum(axis=1)
+
+    difficulte = np.full(nombre_questions, np.nan)
+    discrimination = np.full(nombre_questions, np.nan)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if nombre_etudiants:
+            difficulte = correct.mean(axis=0)
+
+            # Point-bisériale corrigée : l'item est retiré du score total pour ne pas se corréler à lui-même
+            reste = scores[:, np.newaxis] - correct
+            x = correct - difficulte
+            y = reste - reste.mean(axis=0)
+            discrimination = (x * y).sum(axis=0) / np.sqrt((x * x).sum(axis=0) * (y * y).sum(axis=0))
+
+        # Comptes par (question, option) en un seul bincount : case = question * (options + 1) + option
+        largeur = NOMBRE_OPTIONS + 1
+        cases = (choix.astype(np.int64) + largeur * np.arange(nombre_questions)).ravel()
+        frequences = np.bincount(cases, minlength=largeur * nombre_questions).reshape(nombre_questions, largeur)
+        frequences = frequences / nombre_etudiants if nombre_etudiants else np.full(frequences.shape, np.nan)
+
+        alpha = None
+        if nombre_questions > 1 and nombre_etudiants > 1:
+            variance_totale = scores.var(ddof=1)
+            if variance_totale > 0:
+                alpha = nombre_questions / (nombre_questions - 1) * (
+                    1 - correct.var(axis=0, ddof=1).sum() / variance_totale
+                )
+
+    return {
+        "difficulte": difficulte,
+        "discrimination": discrimination,
+        "frequences_options": frequences,
+        "alpha_cronbach": alpha,
+        "scores": scores
+    }
+
+
+def _arrondi(valeur) -> Optional[float]:
+    return None if valeur is None or np.isnan(valeur) else round(float(valeur), 3)
+
+
+def _alertes(difficulte: float, discrimination: float, frequences: np.ndarray, bonne: int) -> List[str]:
+    alertes = []
+    if not np.isnan(difficulte):
+        if difficulte < SEUIL_TROP_DIFFICILE:
+            alertes.append("trop_difficile")
+        elif difficulte > SEUIL_TROP_FACILE:
+            alertes.append("trop_facile")
+    if not np.isnan(discrimination):
+        if discrimination < 0:
+            alertes.append("discrimination_negative")
+        elif discrimination < SEUIL_DISCRIMINATION:
+            alertes.append("peu_discriminante")
+    if not np.isnan(frequences).any() and any(
+        frequences[o] < SEUIL_DISTRACTEUR for o in range(1, NOMBRE_OPTIONS + 1) if o != bonne
+    ):
+        alertes.append("distracteur_non_fonctionnel")
+    return alertes
+
+
+def analyser_items_qcm(qcm_id: int) -> Dict[str, Any]:
+    """
+    Analyse d'items d'un QCM, sans cache.
+
+    Returns:
+        Dict avec l'alpha de Cronbach et, par question : difficulté, discrimination,
+        fréquences des options et alertes
+    """
+    questions, choix, bonnes = construire_matrice(qcm_id)
+    indicateurs = analyser_matrice(choix, bonnes)
+    nombre_soumissions = int(choix.shape[0])
+
+    items = []
+    for j, question in enumerate(questions):
+        frequences = indicateurs["frequences_options"][j]
+        items.append({
+            "question_id": question.id,
+            "question": question.question,
+            "bonne_reponse": question.bonne_reponse,
+            "difficulte": _arrondi(indicateurs["difficulte"][j]),
+            "discrimination": _arrondi(indicateurs["discrimination"][j]),
+            "frequences_options": {
+                "sans_reponse": _arrondi(frequences[0]),
+                **{str(o): _arrondi(frequences[o]) for o in range(1, NOMBRE_OPTIONS + 1)}
+            },
+            # Sans soumission corrigée, les indicateurs sont nuls : aucune alerte
+            "alertes": _alertes(
+                indicateurs["difficulte"][j], indicateurs["discrimination"][j], frequences, question.bonne_reponse
+            ) if nombre_soumissions else []
+        })
+
+    return {
+        "qcm_id": qcm_id,
+        "nombre_soumissions": nombre_soumissions,
+        "nombre_questions": len(questions),
+        "alpha_cronbach": _arrondi(indicateurs["alpha_cronbach"]),
+        "score_moyen": _arrondi(indicateurs["scores"].mean()) if nombre_soumissions else None,
+        "items": items
+    }
+
+
+# ============================================================================
+# CACHE PAR QCM
+# ============================================================================
+
+def obtenir_analyse_items(qcm_id: int) -> Dict[str, Any]:
+    """Analyse d'items d'un QCM, recalculée seulement si ses soumissions corrigées ont changé"""
+    empreinte = empreinte_qcm(qcm_id)
+    with _verrou:
+        entree = _cache.get(qcm_id)
+        if entree is not None and entree[0] == empreinte:
+            _cache.move_to_end(qcm_id)
+            metriques.incrementer("analyse_items_cache", resultat="hit")
+            return entree[1]
+
+    metriques.incrementer("analyse_items_cache", resultat="miss")
+    analyse = analyser_items_qcm(qcm_id)
+    current_app.logger.info(
+        f"📊 Analyse d'items du QCM {qcm_id}: {analyse['nombre_soumissions']} soumissions, "
+        f"{analyse['nombre_questions']} questions"
+    )
+
+    with _verrou:
+        _cache[qcm_id] = (empreinte, analyse)
+        _cache.move_to_end(qcm_id)
+        while len(_cache) > TAILLE_MAX_CACHE:
+            _cache.popitem(last=False)
+    return analyse
+
+
+def invalider_analyse_items(qcm_id: int) -> None:
+    """Oublie l'analyse d'items d'un QCM (après une correction)"""
+    with _verrou:
+        _cache.pop(qcm_id, None)
@@ -0,0 +1,236 @@
+"""
+Service d'analyse des résultats d'une classe, en lecture seule.
+
+Ce service gère:
+- Les statistiques de notes (moyenne, médiane, écart-type, taux de réussite)
+  à partir des Resultat enregistrés (agrégats SQL + NumPy)
+- Les questions les plus échouées à partir des réponses enregistrées
+- Le rapport détaillé d'une évaluation
+
+Rien n'est recorrigé ni écrit en base : une cohorte entière s'analyse en
+quelques requêtes, sans charger la pile IA.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import case, func
+from sqlalchemy.orm import joinedload
+
+from ..extensions import db
+from ..models.qcm import QCM, Question
+from ..models.reponse_composee import ReponseComposee
+from ..models.resultat import Resultat
+from ..models.user import Etudiant
+
+
+# Note minimale (sur 20) pour qu'un résultat compte comme une réussite
+SEUIL_REUSSITE = 10
+
+# Nombre de questions difficiles retournées
+NOMBRE_QUESTIONS_DIFFICILES = 5
+
+
+class AnalyticsService:
+    """Statistiques de classe calculées depuis les résultats et réponses enregistrés"""
+
+    # ============================================================================
+    # ANALYSES
+    # ============================================================================
+
+    def analyser_qcm(self, qcm_id: int) -> Dict[str, Any]:
+        """
+        Analyse les résultats d'une classe sur un QCM.
+
+        Args:
+            qcm_id: ID du QCM
+
+        Returns:
+            Dict avec statistiques de notes et questions difficiles
+        """
+        return self._analyser(Resultat.qcm_id == qcm_id, ReponseComposee.qcm_id == qcm_id)
+
+    def analyser_evaluations(self, evaluation_ids: Iterable[int]) -> Dict[str, Any]:
+        """
+        Analyse les résultats d'une classe sur une ou plusieurs évaluations.
+
+        Args:
+            evaluation_ids: IDs des évaluations
+
+        Returns:
+            Dict avec statistiques de notes et questions difficiles
+        """
+        evaluation_ids = list(evaluation_ids)
+        return self._analyser(
+            Resultat.evaluation_id.in_(evaluation_ids),
+            ReponseComposee.evaluation_id.in_(evaluation_ids)
+        )
+
+    def _analyser(self, filtre_resultats, filtre_reponses) -> Dict[str, Any]:
+        stats = self.statistiques_notes(filtre_resultats)
+        stats["questions_difficiles"] = self.questions_difficiles(filtre_reponses)
+        # Format historique de CorrectionService : [(question, nombre d'erreurs)]
+        stats["difficultes_principales"] = [
+            (q["question"], q["nombre_erreurs"]) for q in stats["questions_difficiles"]
+        ]
+        return stats
+
+    # ============================================================================
+    # STATISTIQUES DE NOTES
+    # ============================================================================
+
+    def statistiques_notes(self, filtre) -> Dict[str, Any]:
+        """
+        Statistiques des notes (sur 20) des Resultat qui vérifient `filtre`.
+
+        Comptes, moyenne, min, max et réussites sont agrégés par la base ;
+        la médiane et l'écart-type sont calculés par NumPy sur la seule colonne des notes.
+        """
+        nombre, moyenne, note_min, note_max, reussites = db.session.query(
+            func.count(Resultat.id),
+            func.avg(Resultat.note),
+            func.min(Resultat.note),
+            func.max(Resultat.note),
+            func.sum(case((Resultat.note >= SEUIL_REUSSITE, 1), else_=0))
+        ).filter(filtre).one()
+
+        if not nombre:
+            return {
+                "note_moyenne": 0,
+                "note_mediane": 0,
+                "note_max": 0,
+                "note_min": 0,
+                "ecart_type": 0,
+                "nombre_participants": 0,
+                "taux_reussite": 0
+            }
+
+        notes = np.fromiter(
+            (note for (note,) in db.session.query(Resultat.note).filter(filtre)),
+            dtype=np.float64,
+            count=nombre
+        )
+
+        return {
+            "note_moyenne": round(float(moyenne), 2),
+            "note_mediane": round(float(np.median(notes)), 2),
+            "note_max": round(float(note_max), 2),
+            "note_min": round(float(note_min), 2),
+            # Écart-type d'échantillon, comme statistics.stdev
+            "ecart_type": round(float(np.std(notes, ddof=1)), 2) if nombre > 1 else 0,
+            "nombre_participants": nombre,
+            "taux_reussite": round(int(reussites or 0) / nombre * 100, 2)
+        }
+
+    # ============================================================================
+    # QUESTIONS DIFFICILES
+    # ============================================================================
+
+    def questions_difficiles(self, filtre, limite: int = NOMBRE_QUESTIONS_DIFFICILES) -> List[Dict[str, Any]]:
+        """
+        Questions les plus échouées dans les réponses corrigées qui vérifient `filtre`.
+
+        Une question sans réponse compte comme une erreur, comme à la correction.
+
+        Returns:
+            Liste triée par nombre d'erreurs décroissant
+            [{question_id, question, nombre_reponses, nombre_erreurs, taux_erreur}]
+        """
+        reponses = db.session.query(ReponseComposee.qcm_id, ReponseComposee.contenu).filter(
+            filtre, ReponseComposee.statut == 'corrigé'
+        ).all()
+        if not reponses:
+            return []
+
+        qcm_ids = {qcm_id for qcm_id, _ in reponses}
+        questions = db.session.query(
+            Question.id, Question.question, Question.qcm_id, Question.bonne_reponse
+        ).filter(Question.qcm_id.in_(qcm_ids)).order_by(Question.id).all()
+        if not questions:
+            return []
+
+        # Une colonne par question, regroupées par QCM
+        colonnes: Dict[int, List[int]] = {}
+        for indice, question in enumerate(questions):
+            colonnes.setdefault(question.qcm_id, []).append(indice)
+        bonnes = np.array([q.bonne_reponse or 0 for q in questions], dtype=np.int64)
+
+        indices = []
+        correctes = []
+        for qcm_id, contenu in reponses:
+            options = ReponseComposee.lire_options_choisies(contenu)
+            colonnes_qcm = colonnes.get(qcm_id, [])
+            indices.extend(colonnes_qcm)
+            correctes.extend(options.get(questions[i].id, -1) == bonnes[i] for i in colonnes_qcm)
+
+        indices = np.asarray(indices, dtype=np.int64)
+        correctes = np.asarray(correctes, dtype=bool)
+        nombre_reponses = np.bincount(indices, minlength=len(questions))
+        nombre_erreurs = np.bincount(indices[~correctes], minlength=len(questions))
+
+        ordre = np.lexsort((-nombre_reponses, -nombre_erreurs))
+        difficiles = []
+        for i in ordre[:limite]:
+            if nombre_erreurs[i] == 0:
+                break
+            difficiles.append({
+                "question_id": questions[i].id,
+                "question": questions[i].question,
+                "nombre_reponses": int(nombre_reponses[i]),
+                "nombre_erreurs": int(nombre_erreurs[i]),
+                "taux_erreur": round(float(nombre_erreurs[i] / nombre_reponses[i] * 100), 2)
+            })
+        return difficiles
+
+    # ============================================================================
+    # RAPPORTS
+    # ============================================================================
+
+    def rapport_evaluation(self, evaluation_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Rapport détaillé d'une évaluation à partir des résultats et réponses enregistrés.
+
+        Returns:
+            Dict (résultats, réponses, statistiques) ou None si aucune donnée
+        """
+        # to_dict() lit l'étudiant, son utilisateur, le QCM et l'évaluation : chargés avec les résultats
+        resultats = Resultat.query.options(
+            joinedload(Resultat.etudiant).joinedload(Etudiant.utilisateur),
+            joinedload(Resultat.qcm),
+            joinedload(Resultat.evaluation)
+        ).filter_by(evaluation_id=evaluation_id).all()
+        reponses = db.session.query(
+            ReponseComposee.id,
+            ReponseComposee.etudiant_id,
+            ReponseComposee.qcm_id,
+            QCM.titre,
+            ReponseComposee.est_correcte,
+            ReponseComposee.statut,
+            ReponseComposee.date_soumission
+        ).join(QCM, QCM.id == ReponseComposee.qcm_id).filter(
+            ReponseComposee.evaluation_id == evaluation_id
+        ).all()
+        if not resultats and not reponses:
+            return None
+
+        current_app.logger.info(f"📊 Rapport de l'évaluation {evaluation_id}: {len(resultats)} résultats, {len(reponses)} réponses")
+
+        dates = [r.date_correction for r in resultats if r.date_correction]
+        return {
+            "resultats": [r.to_dict() for r in resultats],
+            "details": [
+                {
+                    "reponse_id": r.id,
+                    "etudiant_id": r.etudiant_id,
+                    "qcm_id": r.qcm_id,
+                    "qcm": r.titre,
+                    "est_correcte": r.est_correcte,
+                    "statut": r.statut,
+                    "date_soumission": r.date_soumission.isoformat() if r.date_soumission else None
+                }
+                for r in reponses
+            ],
+            "statistiques": self.analyser_evaluations([evaluation_id]),
+            "date_correction": max(dates).isoformat() if dates else None
+        }
@@ -0,0 +1,128 @@
+"""
+Distribution des notes et classement des étudiants d'un QCM.
+
+La distribution (moyenne, médiane, écart-type, histogramme, notes triées) est calculée
+avec NumPy quand corriger_qcm termine, puis enregistrée dans statistiques_qcm :
+- correction complète : calcul depuis les notes du QCM (une seule colonne lue)
+- correction tardive : les nouvelles notes sont fusionnées dans les notes triées
+  enregistrées, sans relire resultats
+
+Le rang et le percentile d'un étudiant se lisent par recherche dichotomique dans les
+notes triées.
+"""
+
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import func
+
+from ..extensions import db
+from ..models.resultat import Resultat
+from ..models.statistiques_qcm import StatistiquesQCM, LARGEUR_TRANCHE, NOMBRE_TRANCHES
+
+
+# ============================================================================
+# CALCULS
+# ============================================================================
+
+def _histogramme(notes: np.ndarray) -> np.ndarray:
+    tranches = np.clip((notes // LARGEUR_TRANCHE).astype(np.int64), 0, NOMBRE_TRANCHES - 1)
+    return np.bincount(tranches, minlength=NOMBRE_TRANCHES)
+
+
+def _enregistrer(statistiques: StatistiquesQCM, notes_triees: np.ndarray, histogramme: np.ndarray) -> StatistiquesQCM:
+    nombre = len(notes_triees)
+    statistiques.nombre = nombre
+    statistiques.moyenne = float(notes_triees.mean()) if nombre else 0
+    statistiques.mediane = float(np.median(notes_triees)) if nombre else 0
+    # Écart-type d'échantillon, comme AnalyticsService.statistiques_notes
+    statistiques.ecart_type = float(notes_triees.std(ddof=1)) if nombre > 1 else 0
+    statistiques.note_min = float(notes_triees[0]) if nombre else 0
+    statistiques.note_max = float(notes_triees[-1]) if nombre else 0
+    statistiques.notes_triees = json.dumps(notes_triees.tolist())
+    statistiques.histogramme = json.dumps(histogramme.tolist())
+    statistiques.date_calcul = datetime.now(timezone.utc)
+    db.session.add(statistiques)
+    return statistiques
+
+
+def _ligne_statistiques(qcm_id: int, verrouiller: bool = False) -> Optional[StatistiquesQCM]:
+    query = StatistiquesQCM.query.filter_by(qcm_id=qcm_id)
+    if verrouiller:
+        query = query.with_for_update()
+    return query.first()
+
+
+def calculer_statistiques_qcm(qcm_id: int) -> StatistiquesQCM:
+    """Calcule la distribution complète d'un QCM depuis ses résultats (sans commit)"""
+    notes = np.sort(np.fromiter(
+        (note for (note,) in db.session.query(Resultat.note).filter(Resultat.qcm_id == qcm_id)),
+        dtype=np.float64
+    ))
+    statistiques = _ligne_statistiques(qcm_id, verrouiller=True) or StatistiquesQCM(qcm_id=qcm_id)
+    current_app.logger.info(f"📊 Distribution du QCM {qcm_id} calculée: {len(notes)} notes")
+    return _enregistrer(statistiques, notes, _histogramme(notes))
+
+
+def ajouter_notes_qcm(qcm_id: int, notes: Iterable[float]) -> StatistiquesQCM:
+    """
+    Ajoute des notes corrigées après coup à la distribution d'un QCM (sans commit).
+    Sans distribution enregistrée, ou si elle ne correspond plus aux résultats du QCM
+    (correction précédente interrompue), la calcule entièrement.
+    """
+    statistiques = _ligne_statistiques(qcm_id, verrouiller=True)
+    if statistiques is None:
+        return calculer_statistiques_qcm(qcm_id)
+
+    nouvelles = np.sort(np.fromiter(notes, dtype=np.float64))
+    nombre_resultats = db.session.query(func.count(Resultat.id)).filter(Resultat.qcm_id == qcm_id).scalar()
+    if (statistiques.nombre or 0) + len(nouvelles) != nombre_resultats:
+        current_app.logger.warning(
+            f"⚠️ Distribution du QCM {qcm_id} désynchronisée "
+            f"({statistiques.nombre} + {len(nouvelles)} notes pour {nombre_resultats} résultats): recalcul complet"
+        )
+        return calculer_statistiques_qcm(qcm_id)
+
+    triees = np.asarray(statistiques.get_notes_triees(), dtype=np.float64)
+    fusion = np.insert(triees, np.searchsorted(triees, nouvelles), nouvelles)
+    histogramme = np.asarray(statistiques.get_histogramme(), dtype=np.int64)
+    if len(histogramme) != NOMBRE_TRANCHES:
+        histogramme = _histogramme(triees)
+    current_app.logger.info(f"📊 Distribution du QCM {qcm_id} mise à jour: +{len(nouvelles)} notes")
+    return _enregistrer(statistiques, fusion, histogramme + _histogramme(nouvelles))
+
+
+def obtenir_statistiques_qcm(qcm_id: int) -> StatistiquesQCM:
+    """Distribution enregistrée d'un QCM ; calculée et enregistrée si elle manque (QCM corrigés avant son ajout)"""
+    statistiques = _ligne_statistiques(qcm_id)
+    if statistiques is None:
+        statistiques = calculer_statistiques_qcm(qcm_id)
+        db.session.commit()
+    return statistiques
+
+
+# ============================================================================
+# CLASSEMENT
+# ============================================================================
+
+def classement(statistiques: StatistiquesQCM, note: float) -> Dict[str, Any]:
+    """
+    Rang et percentile d'une note dans la distribution d'un QCM.
+
+    Rang : 1 + nombre de notes strictement supérieures (ex aequo au même rang).
+    Percentile : part des notes inférieures, les ex aequo comptant pour moitié.
+    """
+    triees = np.asarray(statistiques.get_notes_triees(), dtype=np.float64)
+    nombre = len(triees)
+    if not nombre:
+        return {"rang": None, "percentile": None, "nombre": 0}
+    inferieures = int(np.searchsorted(triees, note, side="left"))
+    inferieures_ou_egales = int(np.searchsorted(triees, note, side="right"))
+    return {
+        "rang": nombre - inferieures_ou_egales + 1,
+        "percentile": round((inferieures + 0.5 * (inferieures_ou_egales - inferieures)) / nombre * 100, 1),
+        "nombre": nombre
+    }
@@ -8,14 +8,14 @@ Ce service gère:
 - L'analyse des performances et recommandations
 """
 
-from .hugging_face_service import HuggingFaceService
+from .analytics_service import AnalyticsService
+from .ia import obtenir_service_ia
 from ..models.qcm import QCM, Question
 from ..models.reponse_composee import ReponseComposee, Evaluation
 from ..models.resultat import Resultat
 from ..models.user import Etudiant
 from ..extensions import db
 from typing import List, Dict, Any
-import statistics
 from flask import current_app
 
 
@@ -23,7 +23,15 @@ class CorrectionService:
     """Service intelligent de correction automatique"""
     
     def __init__(self):
-        self.hf_service = HuggingFaceService()
+        self._hf_service = None
+        self.analytics = AnalyticsService()
+    
+    @property
+    def hf_service(self):
+        """Service IA, créé (et la pile IA importée) seulement au premier besoin"""
+        if self._hf_service is None:
+            self._hf_service = obtenir_service_ia()
+        return self._hf_service
 
     # ============================================================================
     # CORRECTION D'UNE ÉVALUATION COMPLÈTE
@@ -249,6 +257,9 @@ class CorrectionService:
         """
         Analyse les performances globales d'une classe sur une évaluation.
         
+        Lecture seule : les statistiques viennent des résultats et réponses déjà
+        enregistrés (rien n'est recorrigé ni écrit en base).
+        
         Args:
             evaluations: Liste des évaluations de la classe
             
@@ -257,44 +268,10 @@ class CorrectionService:
         """
         current_app.logger.info(f"📊 Analyse de performance de {len(evaluations)} évaluations...")
         
-        notes = []
-        difficultes = {}
-        tous_resultats = []
-
-        for evaluation in evaluations:
-            try:
-                rapport = self.corriger_evaluation(evaluation)["rapport"]
-                notes.append(rapport["score_sur_20"])
-                tous_resultats.extend(rapport["details"])
-
-                for r in rapport["details"]:
-                    if not r["est_correcte"]:
-                        question = r["question"]
-                        difficultes[question] = difficultes.get(question, 0) + 1
-                        
-            except Exception as e:
-                current_app.logger.error(f"❌ Erreur analyse évaluation: {e}")
-                continue
-
-        stats = {
-            "note_moyenne": round(statistics.mean(notes), 2) if notes else 0,
-            "note_mediane": round(statistics.median(notes), 2) if notes else 0,
-            "note_max": round(max(notes), 2) if notes else 0,
-            "note_min": round(min(notes), 2) if notes else 0,
-            "ecart_type": round(statistics.stdev(notes), 2) if len(notes) > 1 else 0,
-            "nombre_participants": len(notes),
-            "difficultes_principales": sorted(difficultes.items(), key=lambda x: x[1], reverse=True)[:5],
-            "taux_reussite": round(sum(1 for n in notes if n >= 10) / len(notes) * 100, 2) if notes else 0
-        }
-        
-        # Générer des recommandations pour l'enseignant
-        recommandations_classe = self.hf_service.generer_recommandations(
-            tous_resultats,
-            niveau="classe",
-            matiere=""
-        )
+        stats = self.analytics.analyser_evaluations(evaluation.id for evaluation in evaluations)
         
-        stats["recommandations"] = recommandations_classe.get("recommandations_enseignant", [])
+        # Recommandations pour l'enseignant à partir des statistiques
+        stats["recommandations"] = self.generer_recommandations_enseignant(stats)
 
         current_app.logger.info(f"✅ Analyse terminée - Moyenne: {stats['note_moyenne']}/20")
 
@@ -412,7 +389,8 @@ class CorrectionService:
         format_export: str = "json"
     ) -> Dict[str, Any]:
         """
-        Exporte un rapport détaillé d'évaluation.
+        Exporte un rapport détaillé d'évaluation à partir des résultats enregistrés
+        (l'évaluation n'est pas recorrigée).
         
         Args:
             evaluation_id: ID de l'évaluation
@@ -425,13 +403,15 @@ class CorrectionService:
         if not evaluation:
             return {"error": "Évaluation non trouvée"}
         
-        rapport = self.corriger_evaluation(evaluation)
+        rapport = self.analytics.rapport_evaluation(evaluation_id)
+        if rapport is None:
+            return {"error": "Aucun résultat enregistré pour cette évaluation"}
         
         # Ajouter des métadonnées
         rapport["metadata"] = {
             "evaluation_id": evaluation_id,
-            "etudiant_id": evaluation.etudiant_id,
-            "date_correction": rapport["resultat"].get("date_correction"),
+            "titre": evaluation.titre,
+            "date_correction": rapport.pop("date_correction"),
             "format": format_export
         }
         
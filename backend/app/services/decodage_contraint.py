@@ -0,0 +1,169 @@
+"""
+Décodage contraint des QCM : la grammaire de sortie est imposée pendant generate().
+
+Le tokenizer T5 ne produit pas de retour à la ligne : un QCM généré sous contrainte
+a toujours la forme
+    Q: <question>? A) <option> B) <option> C) <option> D) <option> Answer: <A-D>
+Les marqueurs sont forcés, le texte libre de chaque champ reste choisi par le modèle
+(longueur bornée) et la lettre de la réponse est choisie parmi A-D. Une génération
+complète se parse donc toujours en une seule expression régulière.
+
+Utilisé par MoteurInference quand les paramètres de décodage contiennent
+"contrainte": "qcm" (voir HF_DECODAGE_CONTRAINT).
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import torch
+from transformers import LogitsProcessor
+
+
+MARQUEURS_QCM = ["Q:", "A)", "B)", "C)", "D)", "Answer:"]
+LETTRES_QCM = ["A", "B", "C", "D"]
+
+# Longueurs des champs libres (tokens) : le QCM complet tient dans ~200 nouveaux tokens
+LONGUEUR_MIN_QUESTION = 3
+LONGUEUR_MAX_QUESTION = 60
+LONGUEUR_MAX_OPTION = 25
+
+# États : (phase, champ, position)
+#   M = marqueur forcé (champ = indice du marqueur, position = token suivant du marqueur)
+#   C = champ libre (champ = indice du marqueur qui l'ouvre, position = tokens déjà générés)
+#   L = lettre de la réponse, F = fin de séquence forcée, T = terminé, X = hors grammaire
+Etat = Tuple[str, int, int]
+ETAT_INITIAL: Etat = ("M", 0, 0)
+
+_vocabulaires: Dict[int, "VocabulaireQCM"] = {}
+
+
+class VocabulaireQCM:
+    """Identifiants de tokens utiles à la grammaire, calculés une fois par tokenizer"""
+
+    def __init__(self, tokenizer):
+        self.marqueurs = [tokenizer.encode(m, add_special_tokens=False) for m in MARQUEURS_QCM]
+        lettres = [tokenizer.encode(lettre, add_special_tokens=False) for lettre in LETTRES_QCM]
+        if any(len(ids) != 1 for ids in lettres) or any(not ids for ids in self.marqueurs):
+            raise ValueError("Tokenizer incompatible avec la grammaire QCM")
+        self.lettres = [ids[0] for ids in lettres]
+        self.point_interrogation = tokenizer.encode("?", add_special_tokens=False)[-1]
+        # Tout token qui termine par "?" peut clore la question
+        self.fins_question = sorted(
+            i for piece, i in tokenizer.get_vocab().items() if piece.endswith("?")
+        )
+        self.eos = tokenizer.eos_token_id
+        self.pad = tokenizer.pad_token_id
+
+
+def vocabulaire_qcm(tokenizer) -> VocabulaireQCM:
+    cle = id(tokenizer)
+    if cle not in _vocabulaires:
+        _vocabulaires[cle] = VocabulaireQCM(tokenizer)
+    return _vocabulaires[cle]
+
+
+class ContrainteQCM(LogitsProcessor):
+    """LogitsProcessor qui impose la grammaire QCM à chaque séquence (beams et lots compris)"""
+
+    def __init__(self, vocabulaire: VocabulaireQCM):
+        self.v = vocabulaire
+        self._fins_question = set(vocabulaire.fins_question)
+        self._etats_precedents: Dict[Tuple[int, ...], Etat] = {}
+
+    # ------------------------------------------------------------------------
+    # Automate
+    # ------------------------------------------------------------------------
+
+    def _avancer(self, etat: Etat, token: int) -> Etat:
+        phase, champ, position = etat
+        if phase == "M":
+            marqueur = self.v.marqueurs[champ]
+            if token != marqueur[position]:
+                return ("X", 0, 0)
+            if position + 1 < len(marqueur):
+                return ("M", champ, position + 1)
+            return self._apres_marqueur(champ)
+        if phase == "C":
+            if champ == 0:
+                # La question se termine au premier "?"
+                if token in self._fins_question:
+                    return ("M", 1, 0)
+                return ("C", 0, position + 1)
+            suivant = self.v.marqueurs[champ + 1]
+            if token == suivant[0] and position > 0:
+                return ("M", champ + 1, 1) if len(suivant) > 1 else self._apres_marqueur(champ + 1)
+            return ("C", champ, position + 1)
+        if phase == "L":
+            return ("F", 0, 0)
+        if phase == "F":
+            return ("T", 0, 0)
+        return etat
+
+    @staticmethod
+    def _apres_marqueur(champ: int) -> Etat:
+        return ("L", 0, 0) if champ == len(MARQUEURS_QCM) - 1 else ("C", champ, 0)
+
+    def _etat(self, ids: Tuple[int, ...]) -> Etat:
+        # Chaque séquence prolonge une séquence de l'étape précédente : un seul token à rejouer
+        etat = self._etats_precedents.get(ids[:-1])
+        if etat is not None:
+            return self._avancer(etat, ids[-1])
+        # Première étape (ou préfixe imposé au décodeur) : rejouer depuis le token de départ
+        etat = ETAT_INITIAL
+        for token in ids[1:]:
+            etat = self._avancer(etat, token)
+        return etat
+
+    # ------------------------------------------------------------------------
+    # Masquage des scores
+    # ------------------------------------------------------------------------
+
+    def _autorises(self, etat: Etat) -> Optional[List[int]]:
+        """Tokens seuls autorisés (None = texte libre)"""
+        phase, champ, position = etat
+        if phase == "M":
+            return [self.v.marqueurs[champ][position]]
+        if phase == "C":
+            if champ == 0 and position >= LONGUEUR_MAX_QUESTION:
+                return [self.v.point_interrogation]
+            if champ > 0 and position >= LONGUEUR_MAX_OPTION:
+                return [self.v.marqueurs[champ + 1][0]]
+            return None
+        if phase == "L":
+            return self.v.lettres
+        if phase == "F":
+            return [self.v.eos]
+        return None
+
+    def _interdits(self, etat: Etat) -> List[int]:
+        """Tokens interdits dans un champ libre"""
+        phase, champ, position = etat
+        interdits = [self.v.eos, self.v.pad]
+        if champ == 0 and position < LONGUEUR_MIN_QUESTION:
+            interdits.extend(self.v.fins_question)
+        if champ > 0 and position == 0:
+            interdits.append(self.v.marqueurs[champ + 1][0])
+        return interdits
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor) -> torch.FloatTensor:
+        etats: Dict[Tuple[int, ...], Etat] = {}
+        for ligne, sequence in enumerate(input_ids.tolist()):
+            ids = tuple(sequence)
+            etat = self._etat(ids)
+            etats[ids] = etat
+            if etat[0] in ("T", "X"):
+                continue
+
+            autorises = self._autorises(etat)
+            if autorises is None:
+                scores[ligne, self._interdits(etat)] = -float("inf")
+                continue
+
+            conserves = scores[ligne, autorises].clone()
+            # Un autre processeur (no_repeat_ngram...) a pu interdire le seul token possible
+            if torch.isinf(conserves).all():
+                conserves.zero_()
+            scores[ligne, :] = -float("inf")
+            scores[ligne, autorises] = conserves
+
+        self._etats_precedents = etats
+        return scores
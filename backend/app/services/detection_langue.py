@@ -0,0 +1,111 @@
+"""
+Identification légère de la langue (français / anglais), sans modèle ni accès réseau.
+
+Les modèles de génération répondent en anglais ou en français selon le prompt et le
+contexte : la traduction MarianMT (anglais → français) n'est lancée que si le texte
+généré est en anglais et que la langue cible est le français.
+
+La détection compte les mots outils de chaque langue (et les lettres accentuées pour
+le français). Un texte trop court ou ambigu reste indéterminé (None) : l'appelant
+choisit alors la langue attendue d'après son prompt.
+"""
+
+import re
+from typing import Optional
+
+from flask import current_app
+
+
+LANGUE_FRANCAIS = "fr"
+LANGUE_ANGLAIS = "en"
+LANGUES_SUPPORTEES = (LANGUE_FRANCAIS, LANGUE_ANGLAIS)
+
+ALIAS_LANGUES = {
+    "francais": LANGUE_FRANCAIS,
+    "français": LANGUE_FRANCAIS,
+    "french": LANGUE_FRANCAIS,
+    "anglais": LANGUE_ANGLAIS,
+    "english": LANGUE_ANGLAIS
+}
+
+MOTS_OUTILS = {
+    LANGUE_FRANCAIS: frozenset("""
+        le la les un une des du de au aux ce cet cette ces et ou mais donc car ni que qui quoi
+        dont où est sont était être avoir ont il elle ils elles nous vous je tu se sa son ses
+        leur leurs mon ma mes ton ta tes dans sur sous avec sans pour par entre vers chez pas ne
+        plus moins très aussi comme quel quelle quels quelles lequel laquelle comment pourquoi
+        quand combien faux vrai suivant suivante suivantes parmi lorsque peut permet
+    """.split()),
+    LANGUE_ANGLAIS: frozenset("""
+        the an and or but so nor that which who whom whose what where when why how is are was
+        were be been being have has had do does did it its they them their we you he she his her
+        this these those in on at of to from with without for by into about between through not
+        no more less very also as following true false can could should would will may
+        used uses use than then there
+    """.split())
+}
+
+# Lettres propres au français (l'anglais n'en contient presque jamais)
+LETTRES_FRANCAISES = re.compile(r"[àâçéèêëîïôûùüÿœæ]")
+MOTS = re.compile(r"[a-zàâçéèêëîïôûùüÿœæ]+")
+
+# Nombre minimal d'indices pour se prononcer, et avance minimale sur l'autre langue
+INDICES_MIN = 2
+RAPPORT_MIN = 1.5
+
+
+def detecter_langue(texte: str) -> Optional[str]:
+    """
+    Langue d'un texte : "fr", "en" ou None si elle ne peut pas être déterminée.
+
+    Args:
+        texte: Texte à analyser (question, options, affirmation...)
+    """
+    if not texte:
+        return None
+    texte = texte.lower()
+    # "l'objet", "qu'une" : l'élision compte comme le mot outil
+    mots = MOTS.findall(texte.replace("'", " ").replace("’", " "))
+
+    scores = {langue: 0.0 for langue in LANGUES_SUPPORTEES}
+    for mot in mots:
+        for langue, mots_outils in MOTS_OUTILS.items():
+            if mot in mots_outils:
+                scores[langue] += 1
+    scores[LANGUE_FRANCAIS] += 0.5 * len(LETTRES_FRANCAISES.findall(texte))
+
+    meilleure, seconde = sorted(scores, key=scores.get, reverse=True)
+    if scores[meilleure] < INDICES_MIN or scores[meilleure] < RAPPORT_MIN * scores[seconde]:
+        return None
+    return meilleure
+
+
+def normaliser_langue(nom: Optional[str]) -> Optional[str]:
+    """
+    Code de langue canonique ("fr", "en") ; None si aucune langue n'est donnée.
+
+    Raises:
+        ValueError: Langue non prise en charge
+    """
+    if nom is None or not str(nom).strip():
+        return None
+    nom = str(nom).strip().lower()
+    nom = ALIAS_LANGUES.get(nom, nom)
+    if nom not in LANGUES_SUPPORTEES:
+        raise ValueError(f"Langue cible non prise en charge: {nom} (valeurs possibles: {', '.join(LANGUES_SUPPORTEES)})")
+    return nom
+
+
+def resoudre_langue(*candidats: Optional[str]) -> str:
+    """
+    Langue cible d'une génération : premier candidat renseigné (requête, puis matière),
+    sinon HF_LANGUE_CIBLE.
+
+    Raises:
+        ValueError: Langue non prise en charge
+    """
+    for candidat in candidats:
+        langue = normaliser_langue(candidat)
+        if langue:
+            return langue
+    return normaliser_langue(current_app.config.get("HF_LANGUE_CIBLE", LANGUE_FRANCAIS)) or LANGUE_FRANCAIS
@@ -0,0 +1,323 @@
+"""
+Service d'indexation sémantique des documents de cours.
+
+Ce service gère:
+- Le découpage des documents en chunks qui respectent les phrases
+- Le calcul des embeddings MiniLM de chaque chunk
+- Le stockage de l'index sur disque (matrice NumPy float16 + métadonnées JSON)
+  - doc<id>_<empreinte> : index d'un document en base, remplacé quand son contenu change
+  - texte_<empreinte> : index d'un texte libre (sujet, contexte), purgé par âge et par nombre
+- La recherche des chunks les plus pertinents et diversifiés (top-k / MMR)
+"""
+
+import hashlib
+import json
+import os
+import re
+import time
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+from flask import current_app
+
+
+# Version du format d'index : à incrémenter si le découpage change
+VERSION_INDEX = 1
+
+# Fin de phrase suivie d'un début de phrase (majuscule, chiffre, puce, guillemet)
+_FIN_PHRASE = re.compile(r'(?<=[.!?;])\s+(?=[A-ZÀ-ÖØ-Ý0-9«"(\-•])')
+
+
+def decouper_en_phrases(texte: str) -> List[str]:
+    """Découpe un texte en phrases sans couper les lignes de liste ni les abréviations courtes"""
+    phrases = []
+    for paragraphe in re.split(r'\n\s*\n', texte):
+        for ligne in paragraphe.split('\n'):
+            ligne = ligne.strip()
+            if not ligne:
+                continue
+            phrases.extend(p.strip() for p in _FIN_PHRASE.split(ligne) if p.strip())
+    return phrases
+
+
+def decouper_en_chunks(texte: str, taille_max: int = 600, chevauchement: int = 1) -> List[str]:
+    """
+    Découpe un texte en chunks d'au plus `taille_max` caractères sans couper de phrase.
+
+    Args:
+        texte: Texte à découper
+        taille_max: Taille maximale d'un chunk (en caractères)
+        chevauchement: Nombre de phrases reprises au début du chunk suivant
+
+    Returns:
+        Liste de chunks (au moins un chunk si le texte n'est pas vide)
+    """
+    phrases = []
+    for phrase in decouper_en_phrases(texte):
+        # Une phrase plus longue qu'un chunk est découpée sur les mots
+        while len(phrase) > taille_max:
+            coupure = phrase.rfind(' ', 0, taille_max)
+            coupure = coupure if coupure > 0 else taille_max
+            phrases.append(phrase[:coupure].strip())
+            phrase = phrase[coupure:].strip()
+        if phrase:
+            phrases.append(phrase)
+
+    chunks = []
+    courant: List[str] = []
+    longueur = 0
+
+    for phrase in phrases:
+        if courant and longueur + len(phrase) + 1 > taille_max:
+            chunks.append(" ".join(courant))
+            # Reprendre les dernières phrases pour garder le contexte entre deux chunks
+            courant = courant[-chevauchement:] if chevauchement else []
+            longueur = sum(len(p) + 1 for p in courant)
+            if longueur + len(phrase) + 1 > taille_max:
+                courant, longueur = [], 0
+        courant.append(phrase)
+        longueur += len(phrase) + 1
+
+    if courant:
+        chunks.append(" ".join(courant))
+
+    return chunks if chunks else ([texte.strip()[:taille_max]] if texte.strip() else [])
+
+
+class DocumentIndexService:
+    """Index sémantique d'un document : chunks + matrice d'embeddings persistée sur disque"""
+
+    def __init__(self, hf_service):
+        self.hf_service = hf_service
+        self.dossier = current_app.config.get("DOCUMENT_INDEX_DIR")
+        self.taille_chunk = current_app.config.get("DOCUMENT_INDEX_TAILLE_CHUNK", 600)
+        self.ttl_textes = current_app.config.get("DOCUMENT_INDEX_TEXTES_TTL", 7 * 24 * 3600)
+        self.max_textes = current_app.config.get("DOCUMENT_INDEX_TEXTES_MAX", 500)
+
+    # ============================================================================
+    # CONSTRUCTION ET CHARGEMENT DE L'INDEX
+    # ============================================================================
+
+    def indexer(self, contenu: str, document_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Retourne l'index du document, en le construisant seulement s'il n'existe pas encore.
+
+        Args:
+            contenu: Texte du document
+            document_id: ID du document en base (optionnel, utilisé pour le nettoyage)
+
+        Returns:
+            Dict avec les chunks et la matrice d'embeddings normalisés (float32)
+        """
+        cle = self._cle_index(contenu, document_id)
+        index = self._charger(cle)
+        if index is not None:
+            current_app.logger.info(f"📂 Index du document chargé depuis le disque ({len(index['chunks'])} chunks)")
+            return index
+
+        chunks = decouper_en_chunks(contenu, taille_max=self.taille_chunk)
+        current_app.logger.info(f"🧭 Indexation de {len(chunks)} chunks...")
+        embeddings = self.hf_service.encoder_textes(chunks) if chunks else np.zeros((0, 0), dtype=np.float32)
+
+        index = {"cle": cle, "chunks": chunks, "embeddings": embeddings.astype(np.float32)}
+        self._sauvegarder(cle, chunks, embeddings)
+        if document_id:
+            # Contenu modifié : les index des versions précédentes ne serviront plus
+            self.supprimer_index(document_id, garder=cle)
+        else:
+            self.purger_textes()
+        current_app.logger.info("✅ Index du document créé")
+        return index
+
+    def supprimer_index(self, document_id: int, garder: Optional[str] = None) -> None:
+        """Supprime du disque les index associés à un document (sauf celui de clé `garder`)"""
+        prefixe = f"doc{document_id}_"
+        for nom in self._fichiers():
+            if nom.startswith(prefixe) and os.path.splitext(nom)[0] != garder:
+                self._supprimer_fichier(nom)
+
+    def purger_textes(self) -> int:
+        """
+        Supprime les index de textes libres non lus depuis DOCUMENT_INDEX_TEXTES_TTL, puis les
+        moins récemment lus au-delà de DOCUMENT_INDEX_TEXTES_MAX. Retourne le nombre d'index supprimés.
+        """
+        derniers_acces = {}
+        for nom in self._fichiers():
+            if nom.startswith("texte_") and nom.endswith(".json"):
+                try:
+                    derniers_acces[nom[:-len(".json")]] = os.path.getmtime(os.path.join(self.dossier, nom))
+                except OSError:
+                    continue
+
+        limite = time.time() - self.ttl_textes
+        recents = sorted(derniers_acces, key=derniers_acces.get, reverse=True)
+        a_supprimer = [
+            cle for rang, cle in enumerate(recents)
+            if rang >= self.max_textes or derniers_acces[cle] < limite
+        ]
+        for cle in a_supprimer:
+            for chemin in self._chemins(cle):
+                self._supprimer_fichier(os.path.basename(chemin))
+        if a_supprimer:
+            current_app.logger.info(f"🧹 {len(a_supprimer)} index de textes libres purgés")
+        return len(a_supprimer)
+
+    def _fichiers(self) -> List[str]:
+        if not self.dossier or not os.path.isdir(self.dossier):
+            return []
+        return os.listdir(self.dossier)
+
+    def _supprimer_fichier(self, nom: str) -> None:
+        try:
+            os.remove(os.path.join(self.dossier, nom))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            current_app.logger.warning(f"⚠️ Impossible de supprimer l'index {nom}: {e}")
+
+    def _cle_index(self, contenu: str, document_id: Optional[int]) -> str:
+        empreinte = hashlib.sha1(
+            f"{VERSION_INDEX}:{self.taille_chunk}:{contenu}".encode("utf-8")
+        ).hexdigest()[:20]
+        return f"doc{document_id}_{empreinte}" if document_id else f"texte_{empreinte}"
+
+    def _chemins(self, cle: str):
+        return (
+            os.path.join(self.dossier, f"{cle}.npy"),
+            os.path.join(self.dossier, f"{cle}.json")
+        )
+
+    def _charger(self, cle: str) -> Optional[Dict[str, Any]]:
+        if not self.dossier:
+            return None
+        chemin_matrice, chemin_meta = self._chemins(cle)
+        if not (os.path.exists(chemin_matrice) and os.path.exists(chemin_meta)):
+            return None
+        try:
+            with open(chemin_meta, encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("version") != VERSION_INDEX:
+                return None
+            embeddings = np.load(chemin_matrice).astype(np.float32)
+            # Date de dernière lecture : les index de textes libres sont purgés du moins récent au plus récent
+            os.utime(chemin_meta)
+            return {"cle": cle, "chunks": meta["chunks"], "embeddings": embeddings}
+        except (OSError, ValueError, KeyError) as e:
+            current_app.logger.warning(f"⚠️ Index illisible ({cle}), reconstruction: {e}")
+            return None
+
+    def _sauvegarder(self, cle: str, chunks: List[str], embeddings: np.ndarray) -> None:
+        if not self.dossier:
+            return
+        try:
+            os.makedirs(self.dossier, exist_ok=True)
+            chemin_matrice, chemin_meta = self._chemins(cle)
+            # float16 : deux fois plus compact, précision suffisante pour un cosinus
+            np.save(chemin_matrice, embeddings.astype(np.float16))
+            with open(chemin_meta, "w", encoding="utf-8") as f:
+                json.dump({"version": VERSION_INDEX, "chunks": chunks}, f, ensure_ascii=False)
+        except OSError as e:
+            current_app.logger.warning(f"⚠️ Impossible d'écrire l'index {cle}: {e}")
+
+    # ============================================================================
+    # RECHERCHE
+    # ============================================================================
+
+    def rechercher(
+        self,
+        index: Dict[str, Any],
+        requete: str,
+        k: int = 3,
+        exclure: Optional[List[int]] = None,
+        diversite: float = 0.3
+    ) -> List[Dict[str, Any]]:
+        """
+        Retourne les k chunks les plus pertinents pour une requête (Maximal Marginal Relevance).
+
+        Args:
+            index: Index retourné par `indexer`
+            requete: Texte de la requête (concept, question...)
+            k: Nombre de chunks à retourner
+            exclure: Positions de chunks déjà utilisés
+            diversite: Poids de la pénalité de redondance (0 = pertinence pure)
+
+        Returns:
+            Liste de dicts {position, chunk, score} triée par ordre de sélection
+        """
+        embeddings = index["embeddings"]
+        if embeddings.size == 0:
+            return []
+
+        vecteur = self.hf_service.encoder_textes([requete])[0]
+        return self._selection_mmr(embeddings, index["chunks"], vecteur, k, exclure or [], diversite)
+
+    def selectionner_pour_concepts(
+        self,
+        index: Dict[str, Any],
+        concepts: List[str],
+        nombre: int,
+        diversite: float = 0.3
+    ) -> List[Dict[str, Any]]:
+        """
+        Choisit `nombre` chunks distincts : un chunk pertinent par concept (cyclique),
+        en pénalisant les chunks trop proches de ceux déjà retenus.
+
+        Returns:
+            Liste de dicts {position, chunk, score, concept}
+        """
+        embeddings = index["embeddings"]
+        chunks = index["chunks"]
+        if embeddings.size == 0 or not concepts:
+            return []
+
+        vecteurs_concepts = self.hf_service.encoder_textes(concepts)
+        selection: List[Dict[str, Any]] = []
+        utilises: List[int] = []
+
+        for i in range(nombre):
+            if len(utilises) >= len(chunks):
+                # Plus de chunks inédits : on recommence avec tout le document
+                utilises = []
+            vecteur = vecteurs_concepts[i % len(concepts)]
+            meilleur = self._selection_mmr(embeddings, chunks, vecteur, 1, utilises, diversite)
+            if not meilleur:
+                break
+            choix = meilleur[0]
+            choix["concept"] = concepts[i % len(concepts)]
+            selection.append(choix)
+            utilises.append(choix["position"])
+
+        return selection
+
+    @staticmethod
+    def _selection_mmr(
+        embeddings: np.ndarray,
+        chunks: List[str],
+        vecteur: np.ndarray,
+        k: int,
+        exclure: List[int],
+        diversite: float
+    ) -> List[Dict[str, Any]]:
+        # Embeddings normalisés : le produit scalaire est la similarité cosinus
+        pertinence = embeddings @ vecteur
+        candidats = np.ones(len(chunks), dtype=bool)
+        candidats[exclure] = False
+        deja = list(exclure)
+        resultats = []
+
+        for _ in range(min(k, int(candidats.sum()))):
+            scores = pertinence.copy()
+            if deja and diversite > 0:
+                redondance = (embeddings @ embeddings[deja].T).max(axis=1)
+                scores = (1 - diversite) * pertinence - diversite * redondance
+            scores[~candidats] = -np.inf
+            position = int(np.argmax(scores))
+            resultats.append({
+                "position": position,
+                "chunk": chunks[position],
+                "score": float(pertinence[position])
+            })
+            candidats[position] = False
+            deja.append(position)
+
+        return resultats
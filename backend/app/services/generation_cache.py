@@ -0,0 +1,159 @@
+"""
+Cache persistant des générations de texte (modèle local, API Inference, traduction).
+
+Les résultats sont stockés dans une base SQLite locale, indépendante de la session
+SQLAlchemy des requêtes : une écriture dans le cache ne valide jamais une transaction
+métier en cours. La clé combine le nom du modèle, l'empreinte du prompt et les
+paramètres de décodage. Les entrées expirent après un TTL et les moins récemment
+utilisées sont supprimées au-delà d'un nombre maximal d'entrées.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from flask import current_app
+
+from ..utils.metriques import metriques
+
+
+metriques.decrire("ia_cache_generation", "Lectures du cache de génération, par modèle et résultat (hit / miss)")
+
+
+class GenerationCache:
+    """Cache clé/valeur SQLite des textes générés"""
+
+    # Une purge TTL/taille toutes les N écritures
+    PURGE_TOUTES_LES = 100
+
+    def __init__(self, chemin: str, ttl_secondes: int = 7 * 24 * 3600, max_entrees: int = 20000):
+        self.chemin = chemin
+        self.ttl_secondes = ttl_secondes
+        self.max_entrees = max_entrees
+        self.hits = 0
+        self.misses = 0
+        self._ecritures = 0
+        self._verrou = threading.Lock()
+
+        dossier = os.path.dirname(chemin)
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+        with self._connexion() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS generations (
+                    cle TEXT PRIMARY KEY,
+                    modele TEXT NOT NULL,
+                    texte TEXT NOT NULL,
+                    cree_le REAL NOT NULL,
+                    dernier_acces REAL NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_generations_dernier_acces ON generations (dernier_acces)")
+
+    @contextmanager
+    def _connexion(self):
+        # Une connexion par opération : sûr entre threads et entre workers
+        conn = sqlite3.connect(self.chemin, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def cle(modele: str, prompt: str, parametres: Dict[str, Any]) -> str:
+        """Construit la clé de cache : modèle + empreinte du prompt + paramètres de décodage"""
+        empreinte_prompt = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        parametres_json = json.dumps(parametres, sort_keys=True, default=str)
+        return hashlib.sha256(f"{modele}\x00{empreinte_prompt}\x00{parametres_json}".encode("utf-8")).hexdigest()
+
+    def get(self, modele: str, prompt: str, parametres: Dict[str, Any]) -> Optional[str]:
+        """Retourne le texte en cache, ou None s'il est absent ou expiré"""
+        cle = self.cle(modele, prompt, parametres)
+        maintenant = time.time()
+        try:
+            with self._connexion() as conn:
+                ligne = conn.execute(
+                    "SELECT texte, cree_le FROM generations WHERE cle = ?", (cle,)
+                ).fetchone()
+                if ligne and maintenant - ligne[1] <= self.ttl_secondes:
+                    conn.execute("UPDATE generations SET dernier_acces = ? WHERE cle = ?", (maintenant, cle))
+                    self.hits += 1
+                    metriques.incrementer("ia_cache_generation", modele=modele, resultat="hit")
+                    return ligne[0]
+        except sqlite3.Error as e:
+            current_app.logger.warning(f"⚠️ Cache de génération indisponible (lecture): {e}")
+        self.misses += 1
+        metriques.incrementer("ia_cache_generation", modele=modele, resultat="miss")
+        return None
+
+    def set(self, modele: str, prompt: str, parametres: Dict[str, Any], texte: str) -> None:
+        """Enregistre (ou remplace) un texte généré"""
+        cle = self.cle(modele, prompt, parametres)
+        maintenant = time.time()
+        try:
+            with self._connexion() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO generations (cle, modele, texte, cree_le, dernier_acces) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (cle, modele, texte, maintenant, maintenant)
+                )
+            with self._verrou:
+                self._ecritures += 1
+                purger = self._ecritures % self.PURGE_TOUTES_LES == 0
+            if purger:
+                self.purger()
+        except sqlite3.Error as e:
+            current_app.logger.warning(f"⚠️ Cache de génération indisponible (écriture): {e}")
+
+    def purger(self) -> int:
+        """Supprime les entrées expirées puis les moins récemment utilisées au-delà de la limite"""
+        with self._connexion() as conn:
+            supprimees = conn.execute(
+                "DELETE FROM generations WHERE cree_le < ?", (time.time() - self.ttl_secondes,)
+            ).rowcount
+            supprimees += conn.execute(
+                "DELETE FROM generations WHERE cle IN ("
+                "  SELECT cle FROM generations ORDER BY dernier_acces DESC LIMIT -1 OFFSET ?"
+                ")",
+                (self.max_entrees,)
+            ).rowcount
+        return supprimees
+
+    def vider(self) -> None:
+        """Supprime toutes les entrées du cache"""
+        with self._connexion() as conn:
+            conn.execute("DELETE FROM generations")
+
+
+_caches: Dict[str, GenerationCache] = {}
+_verrou_caches = threading.Lock()
+
+
+def obtenir_cache_generation() -> Optional[GenerationCache]:
+    """Retourne le cache de génération du processus, ou None s'il est désactivé"""
+    config = current_app.config
+    if not config.get("GENERATION_CACHE_ACTIF", True):
+        return None
+    chemin = config.get("GENERATION_CACHE_PATH")
+    if not chemin:
+        return None
+
+    with _verrou_caches:
+        if chemin not in _caches:
+            try:
+                _caches[chemin] = GenerationCache(
+                    chemin,
+                    ttl_secondes=config.get("GENERATION_CACHE_TTL", 7 * 24 * 3600),
+                    max_entrees=config.get("GENERATION_CACHE_MAX_ENTREES", 20000)
+                )
+            except (sqlite3.Error, OSError) as e:
+                current_app.logger.warning(f"⚠️ Cache de génération désactivé: {e}")
+                return None
+        return _caches[chemin]
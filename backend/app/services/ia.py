@@ -0,0 +1,97 @@
+"""
+Point d'entrée paresseux de la pile IA (torch, transformers, sentence-transformers).
+
+Les routes et services passent par ce module au lieu d'importer
+`hugging_face_service` au niveau module : `create_app()`, `flask db upgrade`
+ou `seed_database.py` démarrent ainsi sans charger torch. La pile n'est importée
+qu'au premier appel d'un endpoint ou d'un traitement IA.
+"""
+
+import sys
+import threading
+import time
+from typing import List
+
+from ..utils.metriques import metriques
+
+
+_verrou_import = threading.Lock()
+
+
+def pile_ia_chargee() -> bool:
+    """Indique si torch/transformers ont déjà été importés dans ce processus"""
+    return f"{__package__}.hugging_face_service" in sys.modules
+
+
+def charger_pile_ia():
+    """Importe la pile IA (une seule fois) et retourne la classe HuggingFaceService"""
+    with _verrou_import:
+        deja_chargee = pile_ia_chargee()
+        debut = time.perf_counter()
+        from .hugging_face_service import HuggingFaceService
+        if not deja_chargee:
+            metriques.definir("ia_import_pile_secondes", time.perf_counter() - debut)
+    return HuggingFaceService
+
+
+def obtenir_service_ia(**options):
+    """
+    Crée un HuggingFaceService en important la pile IA à la demande.
+
+    Args:
+        **options: Arguments transmis au constructeur (ex: forcer_regeneration=True)
+    """
+    return charger_pile_ia()(**options)
+
+
+def obtenir_moteur():
+    """
+    Moteur d'inférence à utiliser : client du sidecar si INFERENCE_SIDECAR_SOCKET est défini,
+    sinon le moteur local du processus (qui importe torch).
+    """
+    from flask import current_app
+    chemin_socket = current_app.config.get("INFERENCE_SIDECAR_SOCKET")
+    if chemin_socket:
+        from .inference_sidecar import obtenir_client_sidecar
+        return obtenir_client_sidecar(chemin_socket, current_app.config.get("INFERENCE_SIDECAR_TIMEOUT", 300))
+    from .moteur_inference import obtenir_moteur_local
+    return obtenir_moteur_local()
+
+
+# Nom court (PRECHARGER_MODELES) → propriété lazy de MoteurInference
+MODELES_PRECHARGEABLES = {
+    "generation": "generation_model",
+    "traduction": "translation_model",
+    "similarite": "similarity_model"
+}
+
+
+def precharger_modeles(app, noms: List[str]) -> None:
+    """
+    Charge des modèles dans le processus courant (master Gunicorn, avant le fork).
+
+    Les modèles sont gardés par le moteur d'inférence du processus : les services créés
+    ensuite par les workers les réutilisent au lieu de les recharger.
+    """
+    with app.app_context():
+        inconnus = [nom for nom in noms if nom not in MODELES_PRECHARGEABLES]
+        if inconnus:
+            app.logger.warning(f"⚠️ Modèles à précharger inconnus ignorés: {', '.join(inconnus)}")
+        if app.config.get("INFERENCE_SIDECAR_SOCKET"):
+            app.logger.info("ℹ️ Sidecar d'inférence configuré : aucun modèle préchargé dans ce processus")
+            return
+
+        from .moteur_inference import obtenir_moteur_local
+        moteur = obtenir_moteur_local()
+        import torch
+        threads = torch.get_num_threads()
+        # Aucune région OpenMP parallèle dans le master : le fork doit rester sûr
+        torch.set_num_threads(1)
+        try:
+            for nom in noms:
+                if nom in MODELES_PRECHARGEABLES:
+                    debut = time.perf_counter()
+                    getattr(moteur, MODELES_PRECHARGEABLES[nom])
+                    app.logger.info(f"📦 Modèle '{nom}' préchargé en {time.perf_counter() - debut:.1f}s")
+        finally:
+            torch.set_num_threads(threads)
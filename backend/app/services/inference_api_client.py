@@ -0,0 +1,248 @@
+"""
+Client HTTP de l'API Inference Hugging Face.
+
+Ce client gère:
+- Une session HTTP partagée par le processus (connexions keep-alive réutilisées)
+- Un disjoncteur par modèle qui mémorise les 503 (cold start), 404 et erreurs
+  répétées d'une question à l'autre, pour ne pas repayer un aller-retour inutile
+- L'envoi concurrent de plusieurs prompts avec une limite de concurrence
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from flask import current_app
+
+from ..utils.metriques import metriques
+
+
+metriques.decrire("ia_api_duree_secondes", "Durée des appels à l'API Inference, par modèle et statut")
+
+
+class Disjoncteur:
+    """Disjoncteur d'un modèle distant : ouvert = on ne l'appelle plus jusqu'à `ouvert_jusqu_a`"""
+
+    DUREE_404 = 3600          # Modèle absent : inutile de réessayer avant une heure
+    DUREE_429 = 60            # Quota dépassé
+    DUREE_ERREUR = 30         # Erreurs répétées (timeout, 5xx)
+    ATTENTE_503_MIN = 5
+    ATTENTE_503_MAX = 120
+    ECHECS_AVANT_OUVERTURE = 2
+
+    def __init__(self, nom: str):
+        self.nom = nom
+        self.ouvert_jusqu_a = 0.0
+        self.echecs_consecutifs = 0
+        self._verrou = threading.Lock()
+
+    def disponible(self) -> bool:
+        return time.monotonic() >= self.ouvert_jusqu_a
+
+    def succes(self) -> None:
+        with self._verrou:
+            self.echecs_consecutifs = 0
+            self.ouvert_jusqu_a = 0.0
+
+    def echec(self, statut: Optional[int] = None, attente_estimee: Optional[float] = None) -> None:
+        with self._verrou:
+            self.echecs_consecutifs += 1
+            if statut == 404:
+                duree = self.DUREE_404
+            elif statut == 503:
+                # Cold start : le modèle indique combien de temps il lui faut pour charger
+                duree = min(max(attente_estimee or self.ATTENTE_503_MIN, self.ATTENTE_503_MIN), self.ATTENTE_503_MAX)
+            elif statut == 429:
+                duree = self.DUREE_429
+            elif self.echecs_consecutifs >= self.ECHECS_AVANT_OUVERTURE:
+                duree = self.DUREE_ERREUR
+            else:
+                return
+            self.ouvert_jusqu_a = time.monotonic() + duree
+
+
+# État partagé par toutes les instances du service dans le processus
+_disjoncteurs: Dict[str, Disjoncteur] = {}
+_session: Optional[requests.Session] = None
+_verrou_etat = threading.Lock()
+
+
+def obtenir_disjoncteur(nom_modele: str) -> Disjoncteur:
+    with _verrou_etat:
+        if nom_modele not in _disjoncteurs:
+            _disjoncteurs[nom_modele] = Disjoncteur(nom_modele)
+        return _disjoncteurs[nom_modele]
+
+
+def obtenir_session(taille_pool: int) -> requests.Session:
+    """Session HTTP du processus, avec un pool de connexions keep-alive"""
+    global _session
+    with _verrou_etat:
+        if _session is None:
+            session = requests.Session()
+            adaptateur = HTTPAdapter(pool_connections=4, pool_maxsize=max(taille_pool, 4), max_retries=0)
+            session.mount("https://", adaptateur)
+            session.mount("http://", adaptateur)
+            _session = session
+        return _session
+
+
+class InferenceAPIClient:
+    """Client de l'API Inference : cascade de modèles, disjoncteurs et envoi concurrent"""
+
+    def __init__(
+        self,
+        api_token: str,
+        modeles: List[str],
+        lire_cache: Optional[Callable[[str, str, int], Optional[str]]] = None,
+        ecrire_cache: Optional[Callable[[str, str, int, str], None]] = None
+    ):
+        """
+        Args:
+            api_token: Token Hugging Face
+            modeles: Noms des modèles, du préféré au plus accessible
+            lire_cache: Fonction (modele, prompt, variante) -> texte en cache ou None
+            ecrire_cache: Fonction (modele, prompt, variante, texte) appelée après une réponse valide
+        """
+        config = current_app.config
+        self.app = current_app._get_current_object()
+        self.modeles = modeles
+        self.url_base = config.get("HF_INFERENCE_API_URL", "https://api-inference.huggingface.co/models").rstrip("/")
+        self.timeout = config.get("HF_API_TIMEOUT", 60)
+        self.max_concurrence = max(1, config.get("HF_API_MAX_CONCURRENCE", 4))
+        self.headers = {"Authorization": f"Bearer {api_token}"}
+        self.session = obtenir_session(self.max_concurrence)
+        self.lire_cache = lire_cache
+        self.ecrire_cache = ecrire_cache
+
+    def generer(
+        self,
+        prompt: str,
+        parametres: Dict[str, Any],
+        rang_depart: int = 0,
+        variante: int = 0
+    ) -> Optional[Tuple[int, str]]:
+        """
+        Génère un texte avec le premier modèle disponible à partir de `rang_depart`.
+
+        Args:
+            prompt: Prompt complet
+            parametres: Paramètres de génération envoyés à l'API
+            rang_depart: Rang du premier modèle à essayer
+            variante: Numéro de tirage pour un même prompt (distingue les entrées du cache)
+
+        Returns:
+            (rang du modèle utilisé, texte généré) ou None si tous les modèles ont échoué
+        """
+        for rang in range(rang_depart, len(self.modeles)):
+            nom = self.modeles[rang]
+
+            if self.lire_cache:
+                texte = self.lire_cache(nom, prompt, variante)
+                if texte is not None:
+                    return rang, texte
+
+            disjoncteur = obtenir_disjoncteur(nom)
+            if not disjoncteur.disponible():
+                current_app.logger.info(f"⏭️ {nom} ignoré (disjoncteur ouvert)")
+                continue
+
+            texte = self._appeler_modele(nom, prompt, parametres, disjoncteur)
+            if texte:
+                if self.ecrire_cache:
+                    self.ecrire_cache(nom, prompt, variante, texte)
+                return rang, texte
+
+        return None
+
+    def generer_lot(
+        self,
+        requetes: List[Tuple[str, int, int]],
+        parametres: Dict[str, Any]
+    ) -> List[Optional[Tuple[int, str]]]:
+        """
+        Génère les textes de plusieurs prompts en parallèle (au plus `max_concurrence` à la fois).
+
+        Args:
+            requetes: Liste de (prompt, rang du premier modèle à essayer, variante)
+            parametres: Paramètres de génération envoyés à l'API
+
+        Returns:
+            Liste alignée sur `requetes` de (rang du modèle, texte) ou None
+        """
+        if not requetes:
+            return []
+
+        def executer(requete: Tuple[str, int, int]) -> Optional[Tuple[int, str]]:
+            # Chaque thread a besoin du contexte applicatif (config, logger)
+            with self.app.app_context():
+                prompt, rang_depart, variante = requete
+                return self.generer(prompt, parametres, rang_depart, variante)
+
+        if len(requetes) == 1:
+            return [executer(requetes[0])]
+
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrence, len(requetes))) as executeur:
+            return list(executeur.map(executer, requetes))
+
+    def _appeler_modele(
+        self,
+        nom: str,
+        prompt: str,
+        parametres: Dict[str, Any],
+        disjoncteur: Disjoncteur
+    ) -> Optional[str]:
+        current_app.logger.info(f"🌐 Essai avec {nom}...")
+        debut = time.perf_counter()
+        try:
+            response = self.session.post(
+                f"{self.url_base}/{nom}",
+                headers=self.headers,
+                json={"inputs": prompt, "parameters": parametres},
+                timeout=self.timeout
+            )
+        except requests.exceptions.Timeout:
+            metriques.observer("ia_api_duree_secondes", time.perf_counter() - debut, modele=nom, statut="timeout")
+            current_app.logger.warning(f"⏰ {nom} timeout, essai du modèle suivant...")
+            disjoncteur.echec()
+            return None
+        except requests.exceptions.RequestException as e:
+            metriques.observer("ia_api_duree_secondes", time.perf_counter() - debut, modele=nom, statut="erreur")
+            current_app.logger.warning(f"⚠️ {nom} erreur: {str(e)[:200]}, essai du modèle suivant...")
+            disjoncteur.echec()
+            return None
+
+        metriques.observer("ia_api_duree_secondes", time.perf_counter() - debut, modele=nom, statut=response.status_code)
+        if response.status_code == 200:
+            disjoncteur.succes()
+            return self._extraire_texte(response)
+
+        attente = None
+        if response.status_code == 503:
+            try:
+                attente = float(response.json().get("estimated_time", 0)) or None
+            except (ValueError, AttributeError):
+                attente = None
+            current_app.logger.warning(f"⚠️ {nom} en cold start (503), essai du modèle suivant...")
+        elif response.status_code == 404:
+            current_app.logger.warning(f"⚠️ {nom} non disponible (404), essai du modèle suivant...")
+        else:
+            current_app.logger.warning(f"⚠️ {nom} erreur {response.status_code}, essai du modèle suivant...")
+
+        disjoncteur.echec(response.status_code, attente)
+        return None
+
+    @staticmethod
+    def _extraire_texte(response: requests.Response) -> str:
+        try:
+            result = response.json()
+        except ValueError:
+            return ""
+        if isinstance(result, list) and len(result) > 0 and isinstance(result[0], dict):
+            return result[0].get("generated_text", "")
+        if isinstance(result, dict):
+            return result.get("generated_text", "")
+        return str(result)
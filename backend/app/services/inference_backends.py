@@ -0,0 +1,150 @@
+"""
+Backends d'inférence des modèles locaux (génération, traduction, embeddings).
+
+Backends disponibles (HF_INFERENCE_BACKEND) :
+- "torch" : modèles PyTorch en float32 (comportement historique)
+- "int8"  : quantification dynamique int8 des couches linéaires (CPU uniquement)
+- "onnx"  : sessions ONNX Runtime exportées via optimum (dépendance optionnelle)
+
+Les modèles chargés sont partagés par toutes les instances du service dans le
+processus : la quantification ou l'export ONNX n'est payé qu'une seule fois.
+
+torch et transformers ne sont importés qu'au chargement d'un modèle : les constantes
+et `backend_configure` restent utilisables par un worker qui délègue au sidecar.
+"""
+
+import os
+import re
+import threading
+from typing import Any, Callable, Dict, Tuple
+
+from flask import current_app
+
+
+# Modèles locaux par défaut
+MODELE_GENERATION = "google/flan-t5-large"
+MODELE_TRADUCTION = "Helsinki-NLP/opus-mt-en-fr"
+MODELE_SIMILARITE = "paraphrase-multilingual-MiniLM-L12-v2"
+
+BACKEND_TORCH = "torch"
+BACKEND_INT8 = "int8"
+BACKEND_ONNX = "onnx"
+BACKENDS = (BACKEND_TORCH, BACKEND_INT8, BACKEND_ONNX)
+
+_modeles_charges: Dict[Tuple[str, str, str, str], Any] = {}
+_verrou_modeles = threading.Lock()
+
+
+def backend_configure(device: str) -> str:
+    """Retourne le backend demandé par la configuration, ramené à "torch" s'il est inapplicable"""
+    backend = str(current_app.config.get("HF_INFERENCE_BACKEND", BACKEND_TORCH)).lower()
+    if backend not in BACKENDS:
+        current_app.logger.warning(f"⚠️ Backend d'inférence inconnu '{backend}', utilisation de torch")
+        return BACKEND_TORCH
+    if backend != BACKEND_TORCH and device != "cpu":
+        # int8 dynamique et ONNX Runtime CPU n'ont d'intérêt que sans GPU
+        current_app.logger.info(f"ℹ️ Backend {backend} ignoré sur {device}, utilisation de torch")
+        return BACKEND_TORCH
+    return backend
+
+
+def obtenir_modele_partage(type_modele: str, nom_modele: str, backend: str, device: str, chargeur: Callable[[], Any]) -> Any:
+    """Charge un modèle une seule fois par processus pour (type, nom, backend, device)"""
+    cle = (type_modele, nom_modele, backend, device)
+    with _verrou_modeles:
+        if cle not in _modeles_charges:
+            _modeles_charges[cle] = chargeur()
+        return _modeles_charges[cle]
+
+
+def charger_seq2seq(nom_modele: str, backend: str, device: str, demi_precision: bool = False) -> Tuple[Any, Any]:
+    """
+    Charge un modèle encodeur-décodeur (FLAN-T5, MarianMT...) avec le backend demandé.
+
+    Args:
+        demi_precision: Charger en float16 réparti sur le GPU (gros modèles, CUDA uniquement)
+
+    Returns:
+        (tokenizer, modèle) ; le modèle expose `generate()` quel que soit le backend
+    """
+    def chargeur():
+        from transformers import AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained(nom_modele)
+        if backend == BACKEND_ONNX:
+            modele = _charger_seq2seq_onnx(nom_modele)
+            if modele is not None:
+                return tokenizer, modele
+            current_app.logger.warning("⚠️ ONNX Runtime indisponible, repli sur la quantification int8")
+            return tokenizer, _quantifier_int8(_charger_seq2seq_torch(nom_modele, "cpu"))
+        if backend == BACKEND_INT8:
+            return tokenizer, _quantifier_int8(_charger_seq2seq_torch(nom_modele, "cpu"))
+        return tokenizer, _charger_seq2seq_torch(nom_modele, device, demi_precision)
+
+    return obtenir_modele_partage("seq2seq", nom_modele, backend, device, chargeur)
+
+
+def charger_encodeur_phrases(nom_modele: str, backend: str, device: str):
+    """Charge un modèle Sentence-Transformers (MiniLM) avec le backend demandé"""
+    def chargeur():
+        from sentence_transformers import SentenceTransformer
+        if backend == BACKEND_ONNX:
+            try:
+                # sentence-transformers >= 3.2 sait exporter et exécuter le modèle avec ONNX Runtime
+                return SentenceTransformer(nom_modele, backend="onnx", device="cpu")
+            except (TypeError, ImportError, ValueError) as e:
+                current_app.logger.warning(f"⚠️ Encodeur ONNX indisponible ({e}), repli sur la quantification int8")
+                return _quantifier_int8(SentenceTransformer(nom_modele, device="cpu"))
+        if backend == BACKEND_INT8:
+            return _quantifier_int8(SentenceTransformer(nom_modele, device="cpu"))
+        return SentenceTransformer(nom_modele, device=device)
+
+    return obtenir_modele_partage("sentence", nom_modele, backend, device, chargeur)
+
+
+def _charger_seq2seq_torch(nom_modele: str, device: str, demi_precision: bool = False):
+    import torch
+    from transformers import AutoModelForSeq2SeqLM
+    if demi_precision and device == "cuda":
+        modele = AutoModelForSeq2SeqLM.from_pretrained(
+            nom_modele,
+            torch_dtype=torch.float16,
+            device_map="auto",
+            low_cpu_mem_usage=True
+        )
+    else:
+        modele = AutoModelForSeq2SeqLM.from_pretrained(nom_modele, low_cpu_mem_usage=True).to(device)
+    modele.eval()
+    return modele
+
+
+def _quantifier_int8(modele):
+    """Quantification dynamique : poids des nn.Linear en int8, activations quantifiées à la volée"""
+    import torch
+    current_app.logger.info("⚙️ Quantification dynamique int8 des couches linéaires...")
+    modele.eval()
+    return torch.quantization.quantize_dynamic(modele, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _charger_seq2seq_onnx(nom_modele: str):
+    """Charge (en l'exportant au premier appel) un modèle encodeur-décodeur ONNX Runtime"""
+    try:
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    except ImportError:
+        return None
+
+    dossier = os.path.join(
+        current_app.config.get("ONNX_EXPORT_DIR", "onnx"),
+        re.sub(r"[^A-Za-z0-9_.-]", "_", nom_modele)
+    )
+    if os.path.isdir(dossier) and any(nom.endswith(".onnx") for nom in os.listdir(dossier)):
+        current_app.logger.info(f"📂 Modèle ONNX chargé depuis {dossier}")
+        return ORTModelForSeq2SeqLM.from_pretrained(dossier)
+
+    current_app.logger.info(f"📦 Export ONNX de {nom_modele} (une seule fois)...")
+    modele = ORTModelForSeq2SeqLM.from_pretrained(nom_modele, export=True)
+    try:
+        os.makedirs(dossier, exist_ok=True)
+        modele.save_pretrained(dossier)
+    except OSError as e:
+        current_app.logger.warning(f"⚠️ Impossible d'enregistrer l'export ONNX: {e}")
+    return modele
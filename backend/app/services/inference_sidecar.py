@@ -0,0 +1,312 @@
+"""
+Sidecar d'inférence : un processus (ou un petit pool) possède les modèles et les
+sert à tous les workers web sur un socket Unix.
+
+Protocole (une connexion persistante par thread client, requête/réponse) :
+    en-tête  : struct "!2sBBII" = magic b"HI", version, opération, taille JSON, taille binaire
+    corps    : JSON UTF-8 (paramètres, textes) puis données binaires brutes
+Les embeddings voyagent en float32 brut (forme dans le JSON), pas en JSON.
+
+Lancement (depuis backend/) :
+    python -m app.services.inference_sidecar --socket /tmp/inference.sock --processus 1
+Les workers web l'utilisent dès que INFERENCE_SIDECAR_SOCKET est défini.
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import socketserver
+import struct
+import threading
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+from flask import current_app
+
+from .profils_decodage import BudgetLatenceEpuise
+
+
+MAGIC = b"HI"
+VERSION_PROTOCOLE = 1
+EN_TETE = struct.Struct("!2sBBII")
+TAILLE_MAX_CORPS = 64 * 1024 * 1024
+
+OP_DECRIRE = 1
+OP_GENERER = 2
+OP_TRADUIRE = 3
+OP_ENCODER = 4
+OP_GENERER_TYPES = 5
+OP_ERREUR = 255
+
+
+class ErreurInference(Exception):
+    """Erreur renvoyée par le sidecar ou problème de transport"""
+
+
+# ============================================================================
+# TRAMES
+# ============================================================================
+
+def envoyer_trame(sock: socket.socket, operation: int, donnees: Dict[str, Any], binaire: bytes = b"") -> None:
+    corps_json = json.dumps(donnees, ensure_ascii=False).encode("utf-8")
+    sock.sendall(EN_TETE.pack(MAGIC, VERSION_PROTOCOLE, operation, len(corps_json), len(binaire)) + corps_json + binaire)
+
+
+def _lire_exactement(sock: socket.socket, taille: int) -> bytes:
+    morceaux = []
+    restant = taille
+    while restant:
+        morceau = sock.recv(min(restant, 1024 * 1024))
+        if not morceau:
+            raise ConnectionError("Connexion fermée par le pair")
+        morceaux.append(morceau)
+        restant -= len(morceau)
+    return b"".join(morceaux)
+
+
+def recevoir_trame(sock: socket.socket) -> Tuple[int, Dict[str, Any], bytes]:
+    magic, version, operation, taille_json, taille_binaire = EN_TETE.unpack(_lire_exactement(sock, EN_TETE.size))
+    if magic != MAGIC or version != VERSION_PROTOCOLE:
+        raise ErreurInference(f"Trame invalide (magic={magic!r}, version={version})")
+    if taille_json + taille_binaire > TAILLE_MAX_CORPS:
+        raise ErreurInference("Trame trop volumineuse")
+    donnees = json.loads(_lire_exactement(sock, taille_json).decode("utf-8")) if taille_json else {}
+    binaire = _lire_exactement(sock, taille_binaire) if taille_binaire else b""
+    return operation, donnees, binaire
+
+
+# ============================================================================
+# CLIENT (workers web)
+# ============================================================================
+
+class ClientInference:
+    """Client du sidecar : mêmes primitives que MoteurInference"""
+
+    def __init__(self, chemin_socket: str, timeout: float = 300):
+        self.chemin_socket = chemin_socket
+        self.timeout = timeout
+        self._local = threading.local()
+        self._description = None
+
+    def _connexion(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            # connect bloquant : attend une place dans la file d'attente du sidecar au lieu d'échouer (EAGAIN)
+            sock.connect(self.chemin_socket)
+            sock.settimeout(self.timeout)
+            self._local.sock = sock
+        return sock
+
+    def _fermer(self) -> None:
+        sock = getattr(self._local, "sock", None)
+        self._local.sock = None
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    def _appeler(self, operation: int, donnees: Dict[str, Any]) -> Tuple[Dict[str, Any], bytes]:
+        # Une reconnexion si la connexion persistante a été coupée (redémarrage du sidecar)
+        for tentative in range(2):
+            try:
+                sock = self._connexion()
+                envoyer_trame(sock, operation, donnees)
+                operation_reponse, reponse, binaire = recevoir_trame(sock)
+                break
+            except socket.timeout:
+                # Sidecar lent : rejouer la requête ne ferait qu'ajouter de la charge
+                self._fermer()
+                raise ErreurInference(f"Sidecar d'inférence: délai de {self.timeout}s dépassé")
+            except OSError as e:
+                self._fermer()
+                if tentative == 1:
+                    raise ErreurInference(f"Sidecar d'inférence injoignable ({self.chemin_socket}): {e}")
+            except (ErreurInference, ValueError):
+                # Trame invalide : le flux est désynchronisé, la connexion ne peut plus servir
+                self._fermer()
+                raise
+        if operation_reponse == OP_ERREUR:
+            if reponse.get("budget_epuise"):
+                raise BudgetLatenceEpuise(reponse.get("erreur", "Budget de latence épuisé"))
+            raise ErreurInference(reponse.get("erreur", "Erreur inconnue du sidecar"))
+        return reponse, binaire
+
+    def decrire(self) -> Dict[str, Any]:
+        if self._description is not None:
+            return self._description
+        description = self._appeler(OP_DECRIRE, {})[0]
+        # Tant que le modèle de génération n'est pas chargé, son nom peut encore changer
+        if description.get("modele_charge"):
+            self._description = description
+        return description
+
+    @property
+    def backend(self) -> str:
+        return self.decrire()["backend"]
+
+    @property
+    def device(self) -> str:
+        return self.decrire()["device"]
+
+    @property
+    def nom_modele_generation(self) -> str:
+        return self.decrire()["modele_generation"]
+
+    def generer(self, prompt: str, parametres: Dict[str, Any]) -> str:
+        return self._appeler(OP_GENERER, {"prompt": prompt, "parametres": parametres})[0]["texte"]
+
+    def generer_types(self, prompt: str, demandes: List[Dict[str, Any]]) -> List[str]:
+        if not demandes:
+            return []
+        return self._appeler(OP_GENERER_TYPES, {"prompt": prompt, "demandes": demandes})[0]["textes"]
+
+    def traduire(self, textes: List[str], parametres: Dict[str, Any]) -> List[str]:
+        if not textes:
+            return []
+        return self._appeler(OP_TRADUIRE, {"textes": textes, "parametres": parametres})[0]["textes"]
+
+    def encoder(self, textes: List[str]) -> np.ndarray:
+        reponse, binaire = self._appeler(OP_ENCODER, {"textes": textes})
+        return np.frombuffer(binaire, dtype=np.float32).reshape(reponse["forme"])
+
+
+_clients: Dict[str, ClientInference] = {}
+_verrou_clients = threading.Lock()
+
+
+def obtenir_client_sidecar(chemin_socket: str, timeout: float = 300) -> ClientInference:
+    """Client du processus pour ce socket (ses connexions persistent d'une requête à l'autre)"""
+    with _verrou_clients:
+        if chemin_socket not in _clients:
+            _clients[chemin_socket] = ClientInference(chemin_socket, timeout)
+        return _clients[chemin_socket]
+
+
+# ============================================================================
+# SERVEUR (processus sidecar)
+# ============================================================================
+
+def executer_operation(moteur, operation: int, donnees: Dict[str, Any]) -> Tuple[Dict[str, Any], bytes]:
+    """Exécute une opération du protocole sur un moteur (MoteurInference)"""
+    if operation == OP_DECRIRE:
+        return moteur.decrire(), b""
+    if operation == OP_GENERER:
+        return {"texte": moteur.generer(donnees["prompt"], donnees.get("parametres", {}))}, b""
+    if operation == OP_GENERER_TYPES:
+        return {"textes": moteur.generer_types(donnees["prompt"], donnees["demandes"])}, b""
+    if operation == OP_TRADUIRE:
+        return {"textes": moteur.traduire(donnees["textes"], donnees.get("parametres", {}))}, b""
+    if operation == OP_ENCODER:
+        embeddings = np.ascontiguousarray(moteur.encoder(donnees["textes"]), dtype=np.float32)
+        return {"forme": list(embeddings.shape)}, embeddings.tobytes()
+    raise ErreurInference(f"Opération inconnue: {operation}")
+
+
+class _GestionnaireConnexion(socketserver.BaseRequestHandler):
+    def handle(self):
+        from ..utils.metriques_http import exporter_metriques_processus
+        app = self.server.app
+        moteur = self.server.moteur
+        with app.app_context():
+            while True:
+                try:
+                    operation, donnees, _ = recevoir_trame(self.request)
+                except (ConnectionError, ErreurInference, OSError):
+                    return
+                try:
+                    reponse, binaire = executer_operation(moteur, operation, donnees)
+                    envoyer_trame(self.request, operation, reponse, binaire)
+                    # Temps des modèles visibles sur le /metrics des workers (METRIQUES_DOSSIER)
+                    exporter_metriques_processus(app.config)
+                except (ConnectionError, OSError):
+                    return
+                except BudgetLatenceEpuise as e:
+                    # Texte tronqué par max_time : l'appelant ne doit ni le parser ni le mettre en cache
+                    try:
+                        envoyer_trame(self.request, OP_ERREUR, {"erreur": str(e), "budget_epuise": True})
+                    except OSError:
+                        return
+                except Exception as e:
+                    current_app.logger.error(f"❌ Sidecar: erreur opération {operation}: {e}")
+                    try:
+                        envoyer_trame(self.request, OP_ERREUR, {"erreur": str(e)[:500]})
+                    except OSError:
+                        return
+
+
+class ServeurInference(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serveur Unix : un thread par connexion (chaque worker web garde la sienne)"""
+
+    daemon_threads = True
+    # Chaque thread de chaque worker web peut ouvrir sa connexion
+    request_queue_size = 128
+
+    def __init__(self, chemin_socket: str, app, moteur):
+        self.app = app
+        self.moteur = moteur
+        if os.path.exists(chemin_socket):
+            os.remove(chemin_socket)
+        super().__init__(chemin_socket, _GestionnaireConnexion)
+        os.chmod(chemin_socket, 0o660)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sidecar d'inférence partagé par les workers web")
+    parser.add_argument("--socket", default=os.getenv("INFERENCE_SIDECAR_SOCKET", "/tmp/inference.sock"))
+    parser.add_argument("--processus", type=int, default=int(os.getenv("INFERENCE_SIDECAR_PROCESSUS", 1)),
+                        help="Processus servant le socket (les modèles sont chargés avant le fork)")
+    parser.add_argument("--precharger", default="generation,traduction,similarite")
+    args = parser.parse_args()
+
+    from app import create_app
+    from .ia import precharger_modeles
+    from .moteur_inference import obtenir_moteur_local
+
+    app = create_app()
+    # Le sidecar exécute lui-même les modèles : il ne doit pas se rappeler lui-même
+    app.config["INFERENCE_SIDECAR_SOCKET"] = ""
+    noms = [n.strip() for n in args.precharger.split(",") if n.strip()]
+    if noms:
+        precharger_modeles(app, noms)
+
+    with app.app_context():
+        moteur = obtenir_moteur_local()
+    serveur = ServeurInference(args.socket, app, moteur)
+    app.logger.info(f"🔌 Sidecar d'inférence à l'écoute sur {args.socket} ({args.processus} processus)")
+
+    enfants = []
+    for _ in range(max(args.processus, 1) - 1):
+        pid = os.fork()
+        if pid == 0:
+            # Les enfants partagent les poids chargés en copy-on-write et acceptent sur le même socket
+            serveur.serve_forever()
+            os._exit(0)
+        enfants.append(pid)
+
+    def arreter(signum, frame):
+        for pid in enfants:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, arreter)
+    try:
+        serveur.serve_forever()
+    finally:
+        for pid in enfants:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Ordonnanceur de micro-lots pour les modèles locaux.
+
+Les requêtes concurrentes (plusieurs enseignants qui génèrent ou corrigent en même
+temps) sont retenues quelques millisecondes puis exécutées en un seul lot paddé :
+un `generate()` / `encode()` de taille N au lieu de N appels de taille 1 qui se
+disputent les mêmes cœurs. Chaque appelant reçoit ensuite son propre résultat.
+
+L'ordonnanceur est utilisé par MoteurInference, donc aussi bien dans un worker
+web (déploiement sans sidecar) que dans le processus sidecar.
+
+L'attente d'un résultat est bornée : si le thread d'exécution meurt ou reste bloqué,
+l'appelant reçoit DelaiLotDepasse au lieu d'attendre que Gunicorn tue le worker.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FuturTimeoutError
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from ..utils.metriques import metriques
+
+
+metriques.decrire("ia_lots_delais_depasses", "Requêtes abandonnées faute de résultat du lot dans le délai, par modèle")
+
+# Au-delà de max_time : tokenisation, décodage et lot déjà en cours devant la requête
+MARGE_DELAI_SECONDES = 10
+
+
+class DelaiLotDepasse(TimeoutError):
+    """Le lot d'une requête n'a pas rendu de résultat dans le délai (thread d'exécution mort ou bloqué)"""
+
+
+class OrdonnanceurLots:
+    """
+    File d'attente + thread d'exécution : regroupe les requêtes de même clé
+    (mêmes paramètres de décodage) en lots d'au plus `taille_max` éléments.
+    """
+
+    def __init__(
+        self,
+        nom: str,
+        executer_lot: Callable[[List[Any], Hashable], List[Any]],
+        app,
+        taille_max: int = 8,
+        attente_max_ms: float = 10,
+        delai_max_s: float = 120
+    ):
+        """
+        Args:
+            nom: Nom du modèle (logs et métriques)
+            executer_lot: Fonction (éléments, clé) -> résultats alignés sur les éléments
+            app: Application Flask (le thread d'exécution a besoin de son contexte)
+            taille_max: Nombre maximal d'éléments par lot
+            attente_max_ms: Délai maximal de regroupement après la première requête
+            delai_max_s: Attente maximale d'un résultat, regroupement compris
+        """
+        self.nom = nom
+        self.executer_lot = executer_lot
+        self.app = app
+        self.taille_max = max(1, taille_max)
+        self.attente_max = attente_max_ms / 1000
+        self.delai_max = delai_max_s
+        self._file: "queue.Queue[Tuple[List[Any], Hashable, Future]]" = queue.Queue()
+        self._verrou = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def soumettre(self, elements: List[Any], cle: Hashable = None, delai: Optional[float] = None) -> List[Any]:
+        """
+        Ajoute des éléments au prochain lot et attend leurs résultats.
+
+        Args:
+            delai: Durée maximale d'exécution de la requête (max_time) ; l'attente est bornée
+                par ce délai plus MARGE_DELAI_SECONDES, et toujours par `delai_max_s`
+
+        Raises:
+            DelaiLotDepasse: Pas de résultat dans le délai
+        """
+        if not elements:
+            return []
+        self._demarrer()
+        futur: Future = Future()
+        self._file.put((list(elements), cle, futur))
+
+        attente = self.delai_max if delai is None else min(delai + MARGE_DELAI_SECONDES, self.delai_max)
+        try:
+            return futur.result(timeout=self.attente_max + attente)
+        except FuturTimeoutError:
+            # Encore en file : le lot ne l'exécutera pas (voir _executer)
+            futur.cancel()
+            metriques.incrementer("ia_lots_delais_depasses", modele=self.nom)
+            vivant = self._thread is not None and self._thread.is_alive()
+            raise DelaiLotDepasse(
+                f"Lot {self.nom} sans résultat après {self.attente_max + attente:.1f}s "
+                f"(thread d'exécution {'bloqué' if vivant else 'arrêté'})"
+            ) from None
+
+    def _demarrer(self) -> None:
+        # Un thread ne survit pas au fork (Gunicorn, pool du sidecar) : le relancer dans chaque processus
+        with self._verrou:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                if self._pid != os.getpid():
+                    self._file = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._boucle, name=f"lots-{self.nom}", daemon=True)
+                self._thread.start()
+
+    def _boucle(self) -> None:
+        with self.app.app_context():
+            while True:
+                requetes = [self._file.get()]
+                nombre = len(requetes[0][0])
+                echeance = time.monotonic() + self.attente_max
+
+                # Regrouper ce qui arrive avant l'échéance, sans dépasser la taille maximale
+                while nombre < self.taille_max:
+                    restant = echeance - time.monotonic()
+                    if restant <= 0:
+                        break
+                    try:
+                        requete = self._file.get(timeout=restant)
+                    except queue.Empty:
+                        break
+                    requetes.append(requete)
+                    nombre += len(requete[0])
+
+                self._executer(requetes)
+
+    def _executer(self, requetes: List[Tuple[List[Any], Hashable, Future]]) -> None:
+        groupes: Dict[Hashable, List[Tuple[List[Any], Hashable, Future]]] = {}
+        for requete in requetes:
+            # Requête abandonnée par son appelant (délai dépassé) : rien à calculer
+            if requete[2].set_running_or_notify_cancel():
+                groupes.setdefault(requete[1], []).append(requete)
+
+        for cle, groupe in groupes.items():
+            elements = [element for requete in groupe for element in requete[0]]
+            try:
+                resultats = self.executer_lot(elements, cle)
+            except Exception as e:
+                for _, _, futur in groupe:
+                    futur.set_exception(e)
+                continue
+
+            metriques.incrementer("ia_lots_executes", modele=self.nom)
+            metriques.incrementer("ia_elements_par_lot_total", len(elements), modele=self.nom)
+
+            debut = 0
+            for elements_requete, _, futur in groupe:
+                futur.set_result(resultats[debut:debut + len(elements_requete)])
+                debut += len(elements_requete)
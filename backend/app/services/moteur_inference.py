@@ -0,0 +1,459 @@
+"""
+Moteur d'inférence local : possède les modèles et exécute les primitives.
+
+Primitives exposées (mêmes signatures que le client du sidecar) :
+- generer(prompt, parametres)   : génération FLAN-T5
+- generer_types(prompt, demandes) : plusieurs types de questions sur un même chunk,
+                                  encodeur exécuté une seule fois
+- traduire(textes, parametres)  : traduction MarianMT anglais → français
+- encoder(textes)               : embeddings MiniLM normalisés
+- decrire()                     : modèle de génération, backend, device
+
+Un seul moteur par processus : dans un worker web (déploiement sans sidecar)
+ou dans le processus sidecar qui sert tous les workers. Les appels concurrents
+passent par un ordonnanceur de micro-lots (voir micro_lots).
+"""
+
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import torch
+from flask import current_app
+
+from .inference_backends import (
+    MODELE_GENERATION, MODELE_TRADUCTION, MODELE_SIMILARITE, BACKEND_ONNX,
+    backend_configure, charger_seq2seq, charger_encodeur_phrases
+)
+from .micro_lots import OrdonnanceurLots
+from .profils_decodage import BudgetLatenceEpuise
+from .selection_modele import candidats_generation, enregistrer_modele_retenu
+from ..utils.metriques import metriques, TRANCHES_TAILLE
+
+
+metriques.decrire("ia_chargement_modele_secondes", "Durée de chargement des modèles, par modèle")
+metriques.decrire("ia_execution_duree_secondes", "Durée d'exécution d'un lot par le modèle, par opération")
+metriques.decrire("ia_taille_lot", "Éléments (prompts, textes) par exécution du modèle, par opération")
+metriques.decrire("ia_tokens_entree_total", "Tokens d'entrée traités, par opération")
+metriques.decrire("ia_tokens_sortie_total", "Tokens générés, par opération")
+metriques.definir_tranches("ia_taille_lot", TRANCHES_TAILLE)
+
+
+# Requêtes regroupées dans un même lot : échéances (max_time) dans la même tranche de N secondes
+PAS_ECHEANCE_SECONDES = 5
+
+
+def _compter_tokens(operation: str, inputs, outputs, pad_token_id) -> None:
+    """Tokens d'entrée (hors padding) et tokens générés d'un appel à generate()"""
+    metriques.incrementer("ia_tokens_entree_total", int(inputs["attention_mask"].sum()), operation=operation)
+    metriques.incrementer("ia_tokens_sortie_total", int((outputs != pad_token_id).sum()), operation=operation)
+
+
+class MoteurInference:
+    """Modèles locaux (chargés à la demande) et primitives d'inférence"""
+
+    def __init__(self):
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.backend = backend_configure(self.device)
+        current_app.logger.info(f"🚀 Initialisation du moteur d'inférence sur {self.device} (backend {self.backend})")
+
+        # Modèles chargés en lazy loading pour économiser la mémoire
+        self._generation_model = None
+        self._generation_tokenizer = None
+        self._nom_modele_generation = None
+        self._similarity_model = None
+        self._translation_model = None
+        self._translation_tokenizer = None
+
+        # Décodage assisté : modèle brouillon chargé au premier décodage glouton
+        config = current_app.config
+        self._draft_model = None
+        self._decodage_assiste = bool(config.get("HF_DECODAGE_ASSISTE", False)) and self.backend != BACKEND_ONNX
+        self._nom_modele_brouillon = config.get("HF_MODELE_BROUILLON", "google/flan-t5-small")
+
+        # Micro-lots : un ordonnanceur par modèle, désactivable par configuration
+        self._ordonnanceurs = None
+        if config.get("INFERENCE_LOTS_ACTIF", True):
+            app = current_app._get_current_object()
+            options = {
+                "taille_max": config.get("INFERENCE_LOT_TAILLE_MAX", 8),
+                "attente_max_ms": config.get("INFERENCE_LOT_ATTENTE_MS", 10),
+                "delai_max_s": config.get("INFERENCE_LOT_DELAI_MAX", 120)
+            }
+            self._ordonnanceurs = {
+                "generation": OrdonnanceurLots(
+                    "generation", lambda elements, cle: self._generer_elements(elements, json.loads(cle)), app, **options
+                ),
+                "traduction": OrdonnanceurLots(
+                    "traduction", lambda textes, cle: self.traduire_lot(textes, json.loads(cle)), app, **options
+                ),
+                "similarite": OrdonnanceurLots(
+                    "similarite", lambda textes, cle: list(self.encoder_lot(textes)), app,
+                    taille_max=max(options["taille_max"], 32), attente_max_ms=options["attente_max_ms"],
+                    delai_max_s=options["delai_max_s"]
+                )
+            }
+
+    # ============================================================================
+    # PROPRIÉTÉS LAZY LOADING DES MODÈLES
+    # ============================================================================
+
+    @property
+    def generation_model(self):
+        """Modèle de génération de texte : meilleur candidat qui tient sur le nœud (voir selection_modele)"""
+        if self._generation_model is None:
+            current_app.logger.info("Chargement du modèle de génération...")
+
+            candidats = candidats_generation(self.device, self.backend)
+            for candidat in candidats:
+                model_name = candidat["nom"]
+                try:
+                    current_app.logger.info(f"🎯 Chargement de {model_name}...")
+                    debut = time.perf_counter()
+                    self._generation_tokenizer, self._generation_model = charger_seq2seq(
+                        model_name, self.backend, self.device,
+                        demi_precision=candidat.get("demi_precision", False)
+                    )
+                    self._nom_modele_generation = model_name
+                    enregistrer_modele_retenu(self.device, self.backend, candidat)
+                    metriques.definir("ia_modele_charge", 1, modele=model_name, device=self.device, backend=self.backend)
+                    metriques.observer("ia_chargement_modele_secondes", time.perf_counter() - debut, modele=model_name)
+                    current_app.logger.info(f"✅ Modèle {model_name} chargé avec succès")
+                    return self._generation_model
+
+                except Exception as e:
+                    metriques.incrementer("ia_echecs_chargement_modele", modele=model_name)
+                    current_app.logger.warning(f"⚠️ Impossible de charger {model_name}: {str(e)[:200]}")
+
+            current_app.logger.error(f"❌ Aucun modèle de génération chargé ({len(candidats)} candidat(s) compatible(s))")
+            raise RuntimeError("Aucun modèle de génération ne peut être chargé sur ce nœud")
+
+        return self._generation_model
+
+    @property
+    def generation_tokenizer(self):
+        """Tokenizer pour le modèle de génération"""
+        if self._generation_tokenizer is None:
+            _ = self.generation_model  # Déclenche le chargement
+        return self._generation_tokenizer
+
+    @property
+    def nom_modele_generation(self) -> str:
+        """Nom du modèle de génération chargé (ou du modèle préféré s'il n'est pas encore chargé)"""
+        return self._nom_modele_generation or MODELE_GENERATION
+
+    @property
+    def draft_model(self):
+        """Modèle brouillon du décodage assisté (None si désactivé ou impossible à charger)"""
+        if self._draft_model is None and self._decodage_assiste:
+            current_app.logger.info(f"📥 Chargement du modèle brouillon {self._nom_modele_brouillon}...")
+            try:
+                # Même famille FLAN-T5 : le vocabulaire du modèle de génération est partagé
+                debut = time.perf_counter()
+                _, self._draft_model = charger_seq2seq(self._nom_modele_brouillon, self.backend, self.device)
+                metriques.observer("ia_chargement_modele_secondes", time.perf_counter() - debut, modele=self._nom_modele_brouillon)
+                current_app.logger.info("✅ Modèle brouillon chargé avec succès")
+            except Exception as e:
+                current_app.logger.warning(f"⚠️ Décodage assisté désactivé, modèle brouillon indisponible: {e}")
+                self._decodage_assiste = False
+        return self._draft_model
+
+    @property
+    def similarity_model(self):
+        """Modèle de similarité sémantique (Sentence-BERT)"""
+        if self._similarity_model is None:
+            current_app.logger.info("📥 Chargement du modèle de similarité sémantique...")
+            try:
+                # Modèle multilingue pour supporter français et anglais
+                debut = time.perf_counter()
+                self._similarity_model = charger_encodeur_phrases(MODELE_SIMILARITE, self.backend, self.device)
+                metriques.observer("ia_chargement_modele_secondes", time.perf_counter() - debut, modele=MODELE_SIMILARITE)
+                current_app.logger.info("✅ Modèle de similarité chargé avec succès")
+            except Exception as e:
+                current_app.logger.error(f"❌ Erreur chargement modèle similarité: {e}")
+                raise
+        return self._similarity_model
+
+    @property
+    def translation_model(self):
+        """Modèle de traduction anglais → français (MarianMT)"""
+        if self._translation_model is None:
+            current_app.logger.info("📥 Chargement du modèle de traduction anglais → français...")
+            try:
+                debut = time.perf_counter()
+                self._translation_tokenizer, self._translation_model = charger_seq2seq(
+                    MODELE_TRADUCTION, self.backend, self.device
+                )
+                metriques.observer("ia_chargement_modele_secondes", time.perf_counter() - debut, modele=MODELE_TRADUCTION)
+                current_app.logger.info("✅ Modèle de traduction chargé avec succès")
+            except Exception as e:
+                current_app.logger.error(f"❌ Erreur chargement modèle traduction: {e}")
+                raise
+        return self._translation_model
+
+    @property
+    def translation_tokenizer(self):
+        """Tokenizer pour le modèle de traduction"""
+        if self._translation_tokenizer is None:
+            _ = self.translation_model  # Déclenche le chargement
+        return self._translation_tokenizer
+
+    # ============================================================================
+    # PRIMITIVES
+    # ============================================================================
+
+    def decrire(self) -> Dict[str, Any]:
+        return {
+            "modele_generation": self.nom_modele_generation,
+            "modele_charge": self._generation_model is not None,
+            "decodage_assiste": self._decodage_assiste,
+            "modele_traduction": MODELE_TRADUCTION,
+            "backend": self.backend,
+            "device": self.device
+        }
+
+    def generer(self, prompt: str, parametres: Dict[str, Any]) -> str:
+        """
+        Génère un texte avec le modèle de génération local (regroupé avec les appels concurrents).
+
+        Raises:
+            BudgetLatenceEpuise: Génération arrêtée par max_time avant sa fin (texte tronqué)
+        """
+        if self._ordonnanceurs:
+            # max_time (budget de latence) varie d'une requête à l'autre : seule sa tranche entre
+            # dans la clé, pour ne pas couper une requête "qualite" à l'échéance d'une "rapide"
+            parametres = dict(parametres)
+            max_time = parametres.pop("max_time", None)
+            cle = dict(parametres)
+            if max_time is not None:
+                cle["tranche_echeance"] = int(max_time // PAS_ECHEANCE_SECONDES)
+            texte, coupe = self._ordonnanceurs["generation"].soumettre(
+                [(prompt, max_time)], self._cle_parametres(cle), delai=max_time
+            )[0]
+        else:
+            texte, coupe = self._generer_lot_suivi([prompt], parametres)[0]
+        if coupe:
+            raise BudgetLatenceEpuise("Génération interrompue par max_time avant sa fin")
+        return texte
+
+    def _generer_elements(self, elements: List[tuple], parametres: Dict[str, Any]) -> List[tuple]:
+        """Lot de l'ordonnanceur (prompt, max_time) : le lot s'arrête à l'échéance la plus proche"""
+        parametres.pop("tranche_echeance", None)
+        echeances = [max_time for _, max_time in elements if max_time is not None]
+        if echeances:
+            parametres = dict(parametres, max_time=min(echeances))
+        return self._generer_lot_suivi([prompt for prompt, _ in elements], parametres)
+
+    def generer_types(self, prompt: str, demandes: List[Dict[str, Any]]) -> List[str]:
+        """
+        Génère plusieurs textes à partir d'un même prompt (un par type de question).
+
+        Le prompt n'est tokenisé et encodé qu'une fois ; chaque demande réutilise la sortie
+        de l'encodeur et impose son préfixe au décodeur ("Q:", "Affirmation:", ...).
+
+        Args:
+            prompt: Entrée commune de l'encodeur (contexte + formats attendus)
+            demandes: [{"prefixe": str, "parametres": dict}], une par type
+
+        Returns:
+            Textes générés alignés sur `demandes` (préfixe inclus)
+        """
+        if not demandes:
+            return []
+        if self.backend == BACKEND_ONNX:
+            # ORTModelForSeq2SeqLM ne prend pas de sorties d'encodeur précalculées
+            return [
+                self.generer(f"{prompt}\n{demande['prefixe']}", demande["parametres"])
+                for demande in demandes
+            ]
+
+        from transformers.modeling_outputs import BaseModelOutput
+
+        tokenizer = self.generation_tokenizer
+        model = self.generation_model
+        inputs = tokenizer(prompt, max_length=512, truncation=True, return_tensors="pt").to(self.device)
+        debut_decodeur = model.config.decoder_start_token_id
+
+        textes = []
+        metriques.observer("ia_taille_lot", len(demandes), operation="generation_types")
+        with torch.no_grad(), metriques.chronometrer("ia_execution_duree_secondes", operation="generation_types"):
+            etats = model.get_encoder()(**inputs).last_hidden_state
+            metriques.incrementer("ia_encodages_partages", len(demandes) - 1)
+            metriques.incrementer("ia_tokens_entree_total", int(inputs["attention_mask"].sum()), operation="generation_types")
+            for demande in demandes:
+                prefixe = tokenizer(demande["prefixe"], add_special_tokens=False).input_ids
+                decoder_input_ids = torch.tensor([[debut_decodeur] + prefixe], device=self.device)
+                parametres, options = self._options_decodage(demande["parametres"])
+                outputs = model.generate(
+                    # generate() étend la sortie de l'encodeur en place (beams) : une copie par demande
+                    encoder_outputs=BaseModelOutput(last_hidden_state=etats),
+                    attention_mask=inputs["attention_mask"],
+                    decoder_input_ids=decoder_input_ids,
+                    **parametres,
+                    **options,
+                    pad_token_id=tokenizer.pad_token_id
+                )
+                metriques.incrementer(
+                    "ia_tokens_sortie_total", int((outputs != tokenizer.pad_token_id).sum()), operation="generation_types"
+                )
+                textes.append(tokenizer.decode(outputs[0], skip_special_tokens=True))
+        return textes
+
+    def traduire(self, textes: List[str], parametres: Dict[str, Any]) -> List[str]:
+        """Traduit des textes anglais vers le français (regroupés avec les appels concurrents)"""
+        if self._ordonnanceurs:
+            return self._ordonnanceurs["traduction"].soumettre(textes, self._cle_parametres(parametres))
+        return self.traduire_lot(textes, parametres)
+
+    def encoder(self, textes: List[str]) -> np.ndarray:
+        """Encode une liste de textes en vecteurs normalisés (regroupés avec les appels concurrents)"""
+        if self._ordonnanceurs and textes:
+            return np.stack(self._ordonnanceurs["similarite"].soumettre(textes))
+        return self.encoder_lot(textes)
+
+    @staticmethod
+    def _cle_parametres(parametres: Dict[str, Any]) -> str:
+        # Seules les requêtes aux paramètres de décodage identiques partagent un lot
+        return json.dumps(parametres, sort_keys=True)
+
+    def _options_decodage(self, parametres: Dict[str, Any]):
+        """
+        Sépare les options propres au moteur des paramètres de generate().
+        "contrainte": "qcm" devient un LogitsProcessor qui impose la grammaire des QCM.
+        """
+        parametres = dict(parametres)
+        contrainte = parametres.pop("contrainte", None)
+        if contrainte != "qcm":
+            return parametres, {}
+
+        from transformers import LogitsProcessorList
+        from .decodage_contraint import ContrainteQCM, vocabulaire_qcm
+        try:
+            vocabulaire = vocabulaire_qcm(self.generation_tokenizer)
+        except ValueError as e:
+            current_app.logger.warning(f"⚠️ Décodage contraint indisponible: {e}")
+            return parametres, {}
+        metriques.incrementer("ia_generations_contraintes", modele=self.nom_modele_generation)
+        return parametres, {"logits_processor": LogitsProcessorList([ContrainteQCM(vocabulaire)])}
+
+    def _assistant_pour(self, parametres: Dict[str, Any]):
+        """Modèle brouillon utilisable pour ces paramètres (décodage glouton uniquement), sinon None"""
+        if not self._decodage_assiste or parametres.get("num_beams", 1) != 1 or parametres.get("do_sample"):
+            return None
+        _ = self.generation_model  # Le modèle retenu n'est connu qu'après son chargement
+        if self.nom_modele_generation == self._nom_modele_brouillon:
+            # Le nœud n'a pu charger que le petit modèle : rien à accélérer
+            return None
+        return self.draft_model
+
+    def generer_lot(self, prompts: List[str], parametres: Dict[str, Any]) -> List[str]:
+        """Génère un texte par prompt en un seul generate() paddé"""
+        return [texte for texte, _ in self._generer_lot_suivi(prompts, parametres)]
+
+    def _generer_lot_suivi(self, prompts: List[str], parametres: Dict[str, Any]) -> List[tuple]:
+        """Comme generer_lot, avec pour chaque texte s'il a été coupé par max_time : [(texte, coupe)]"""
+        if not prompts:
+            return []
+        assistant = self._assistant_pour(parametres)
+        if assistant is not None:
+            return [self._generer_assiste(prompt, parametres, assistant) for prompt in prompts]
+        parametres, options = self._options_decodage(parametres)
+        inputs = self.generation_tokenizer(
+            prompts,
+            max_length=512,
+            truncation=True,
+            padding=True,
+            return_tensors="pt"
+        ).to(self.device)
+
+        metriques.observer("ia_taille_lot", len(prompts), operation="generation")
+        debut = time.monotonic()
+        with torch.no_grad(), metriques.chronometrer("ia_execution_duree_secondes", operation="generation"):
+            outputs = self.generation_model.generate(
+                **inputs,
+                **parametres,
+                **options,
+                pad_token_id=self.generation_tokenizer.pad_token_id
+            )
+        _compter_tokens("generation", inputs, outputs, self.generation_tokenizer.pad_token_id)
+
+        textes = self.generation_tokenizer.batch_decode(outputs, skip_special_tokens=True)
+        return list(zip(textes, self._coupes_par_max_time(outputs, parametres, time.monotonic() - debut)))
+
+    def _coupes_par_max_time(self, outputs, parametres: Dict[str, Any], duree: float) -> List[bool]:
+        """Séquences arrêtées par max_time : ni fin de séquence générée, ni max_new_tokens atteint"""
+        max_time = parametres.get("max_time")
+        if max_time is None or duree < max_time:
+            return [False] * len(outputs)
+        terminees = (outputs == self.generation_tokenizer.eos_token_id).any(dim=1).tolist()
+        # Seq2seq : le premier token est le token de départ du décodeur
+        longueur_atteinte = outputs.shape[1] - 1 >= parametres.get("max_new_tokens", float("inf"))
+        return [not terminee and not longueur_atteinte for terminee in terminees]
+
+    def _generer_assiste(self, prompt: str, parametres: Dict[str, Any], assistant) -> tuple:
+        """Décodage assisté : le brouillon propose plusieurs tokens, le grand modèle les vérifie en une passe"""
+        # generate() n'accepte pas de lot avec un assistant : un prompt à la fois
+        parametres, options = self._options_decodage(parametres)
+        inputs = self.generation_tokenizer(prompt, max_length=512, truncation=True, return_tensors="pt").to(self.device)
+        metriques.observer("ia_taille_lot", 1, operation="generation_assistee")
+        debut = time.monotonic()
+        with torch.no_grad(), metriques.chronometrer("ia_execution_duree_secondes", operation="generation_assistee"):
+            outputs = self.generation_model.generate(
+                **inputs,
+                **parametres,
+                **options,
+                assistant_model=assistant,
+                pad_token_id=self.generation_tokenizer.pad_token_id
+            )
+        _compter_tokens("generation_assistee", inputs, outputs, self.generation_tokenizer.pad_token_id)
+        metriques.incrementer("ia_generations_assistees", modele=self.nom_modele_generation)
+        coupe = self._coupes_par_max_time(outputs, parametres, time.monotonic() - debut)[0]
+        return self.generation_tokenizer.decode(outputs[0], skip_special_tokens=True), coupe
+
+    def traduire_lot(self, textes: List[str], parametres: Dict[str, Any]) -> List[str]:
+        """Traduit des textes anglais vers le français en un seul generate() paddé"""
+        if not textes:
+            return []
+        inputs = self.translation_tokenizer(
+            textes,
+            max_length=512,
+            truncation=True,
+            padding=True,
+            return_tensors="pt"
+        ).to(self.device)
+
+        metriques.observer("ia_taille_lot", len(textes), operation="traduction")
+        with torch.no_grad(), metriques.chronometrer("ia_execution_duree_secondes", operation="traduction"):
+            outputs = self.translation_model.generate(**inputs, **parametres)
+        _compter_tokens("traduction", inputs, outputs, self.translation_tokenizer.pad_token_id)
+
+        return self.translation_tokenizer.batch_decode(outputs, skip_special_tokens=True)
+
+    def encoder_lot(self, textes: List[str]) -> np.ndarray:
+        """Encode une liste de textes en vecteurs normalisés (MiniLM)"""
+        modele = self.similarity_model
+        metriques.observer("ia_taille_lot", len(textes), operation="encodage")
+        with metriques.chronometrer("ia_execution_duree_secondes", operation="encodage"):
+            embeddings = modele.encode(
+                textes,
+                batch_size=32,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False
+            )
+        return np.asarray(embeddings, dtype=np.float32)
+
+
+_moteur: Optional[MoteurInference] = None
+_verrou_moteur = threading.Lock()
+
+
+def obtenir_moteur_local() -> MoteurInference:
+    """Moteur d'inférence du processus (créé au premier appel)"""
+    global _moteur
+    with _verrou_moteur:
+        if _moteur is None:
+            _moteur = MoteurInference()
+        return _moteur
@@ -0,0 +1,129 @@
+"""
+Profils de décodage nommés pour la génération locale.
+
+Chaque profil regroupe les paramètres de generate() par tâche (QCM, Vrai/Faux,
+question ouverte, traduction) et un budget de latence par requête HTTP. Le budget
+est appliqué aux appels generate() via `max_time` (critère d'arrêt de transformers) ;
+une fois épuisé, les services passent aux générateurs à base de règles.
+
+Profils : "rapide" (décodage glouton, compatible avec le décodage assisté),
+"equilibre" (petit beam search) et "qualite" (réglages historiques des QCM).
+Les noms anglais fast / balanced / quality sont acceptés.
+"""
+
+import time
+from typing import Any, Dict, Optional
+
+from flask import current_app
+
+
+PROFIL_RAPIDE = "rapide"
+PROFIL_EQUILIBRE = "equilibre"
+PROFIL_QUALITE = "qualite"
+
+ALIAS_PROFILS = {
+    "fast": PROFIL_RAPIDE,
+    "balanced": PROFIL_EQUILIBRE,
+    "quality": PROFIL_QUALITE
+}
+
+PROFILS_DECODAGE: Dict[str, Dict[str, Any]] = {
+    PROFIL_RAPIDE: {
+        "budget_secondes": 20,
+        "qcm": {
+            "max_new_tokens": 200,
+            "num_beams": 1,
+            "do_sample": False,
+            "no_repeat_ngram_size": 2,
+            "repetition_penalty": 1.1
+        },
+        "vrai_faux": {"max_new_tokens": 80, "num_beams": 1, "do_sample": False},
+        "ouverte": {"max_new_tokens": 160, "num_beams": 1, "do_sample": False},
+        "traduction": {"max_new_tokens": 200, "num_beams": 1, "do_sample": False}
+    },
+    PROFIL_EQUILIBRE: {
+        "budget_secondes": 60,
+        "qcm": {
+            "max_new_tokens": 300,
+            "num_beams": 3,
+            "do_sample": False,
+            "no_repeat_ngram_size": 2,
+            "repetition_penalty": 1.1,
+            "early_stopping": True
+        },
+        "vrai_faux": {"max_new_tokens": 120, "num_beams": 2, "do_sample": False, "early_stopping": True},
+        "ouverte": {"max_new_tokens": 220, "num_beams": 2, "do_sample": False, "early_stopping": True},
+        "traduction": {"max_new_tokens": 200, "num_beams": 2, "do_sample": False, "early_stopping": True}
+    },
+    PROFIL_QUALITE: {
+        "budget_secondes": 180,
+        "qcm": {
+            "max_new_tokens": 500,       # BEAUCOUP plus d'espace pour QCM complet
+            "num_beams": 6,              # Beams pour qualité
+            "temperature": 0.8,          # Plus de créativité pour varier les options
+            "do_sample": True,
+            "top_p": 0.95,               # Plus de diversité
+            "top_k": 50,                 # Vocabulaire plus large
+            "no_repeat_ngram_size": 2,   # Moins restrictif
+            "repetition_penalty": 1.1,   # Moins de pénalité
+            "length_penalty": 1.2,       # ENCOURAGER des réponses LONGUES
+            "early_stopping": False      # NE PAS s'arrêter trop tôt
+        },
+        "vrai_faux": {"max_new_tokens": 150, "num_beams": 4, "do_sample": False},
+        "ouverte": {"max_new_tokens": 300, "num_beams": 4, "temperature": 0.7, "do_sample": True},
+        "traduction": {"max_new_tokens": 200, "num_beams": 4, "temperature": 0.7, "do_sample": True, "early_stopping": True}
+    }
+}
+
+
+class BudgetLatenceEpuise(Exception):
+    """Le budget de latence de la requête est consommé : passer aux générateurs de secours"""
+
+
+def resoudre_profil(nom: Optional[str] = None) -> str:
+    """
+    Nom canonique d'un profil (français ou alias anglais).
+    Sans nom, utilise HF_PROFIL_DECODAGE.
+
+    Raises:
+        ValueError: Profil inconnu
+    """
+    if not nom:
+        nom = current_app.config.get("HF_PROFIL_DECODAGE", PROFIL_QUALITE)
+    nom = str(nom).strip().lower()
+    nom = ALIAS_PROFILS.get(nom, nom)
+    if nom not in PROFILS_DECODAGE:
+        noms = ", ".join(list(PROFILS_DECODAGE) + list(ALIAS_PROFILS))
+        raise ValueError(f"Profil de décodage inconnu: {nom} (valeurs possibles: {noms})")
+    return nom
+
+
+def parametres_profil(profil: str, tache: str) -> Dict[str, Any]:
+    """Copie des paramètres de generate() du profil pour une tâche (qcm, vrai_faux, ouverte, traduction)"""
+    return dict(PROFILS_DECODAGE[profil][tache])
+
+
+class BudgetLatence:
+    """Temps restant pour une requête de génération (horloge monotone)"""
+
+    def __init__(self, secondes: float):
+        self.secondes = secondes
+        self.echeance = time.monotonic() + secondes
+
+    def restant(self) -> float:
+        return max(0.0, self.echeance - time.monotonic())
+
+    def epuise(self) -> bool:
+        return self.restant() <= 0
+
+    def appliquer(self, parametres: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Ajoute le temps restant comme critère d'arrêt (max_time) aux paramètres de generate().
+
+        Raises:
+            BudgetLatenceEpuise: Plus de temps disponible
+        """
+        restant = self.restant()
+        if restant <= 0:
+            raise BudgetLatenceEpuise(f"Budget de latence de {self.secondes:.0f}s épuisé")
+        return dict(parametres, max_time=restant)
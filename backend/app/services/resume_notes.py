@@ -0,0 +1,241 @@
+"""
+Résumés des notes par étudiant et par matière (table resumes_notes).
+
+Chaque écriture de Resultat (ajout, modification de note / QCM / étudiant, suppression)
+met à jour le résumé du couple étudiant / matière dans la même transaction :
+- before_flush relève les résultats retirés ou modifiés avec leurs valeurs en base
+  (lues tant que la ligne existe encore)
+- after_flush y ajoute les valeurs écrites et applique le tout : un upsert unique pour les
+  couples qui gagnent des résultats (nombre et somme ajoutés, moyenne recalculée), un
+  recalcul exact depuis resultats pour ceux qui en perdent
+
+Les suppressions en masse (Query.delete) ne déclenchent pas ces événements : l'appelant
+recalcule les couples concernés (recalculer_resumes_notes). La commande
+`flask resumes-notes reconstruire` reconstruit toute la table (migration, reprise de données).
+"""
+
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import case, delete, event, func, insert, or_, select
+
+from ..extensions import db
+from ..models.qcm import QCM
+from ..models.resultat import Resultat
+from ..models.resume_notes import ResumeNotes
+
+
+# Relevé de before_flush : {"retraits": [(etudiant_id, qcm_id, note)], "ajouts": [Resultat]}
+CLE_SESSION = "resume_notes_mouvements"
+Mouvement = Tuple[Optional[int], Optional[int], int, float, Optional[datetime]]
+Couple = Tuple[int, int]
+
+CHAMPS_SUIVIS = ("note", "qcm_id", "etudiant_id")
+
+
+def _utc_naif(date: Optional[datetime]) -> Optional[datetime]:
+    """Dates comparables entre elles : les colonnes DateTime sont stockées sans fuseau"""
+    if date is not None and date.tzinfo is not None:
+        return date.astimezone(timezone.utc).replace(tzinfo=None)
+    return date
+
+
+# ============================================================================
+# SUIVI DES ÉCRITURES DE RESULTAT
+# ============================================================================
+
+def _noter_mouvements(session, flush_context, instances) -> None:
+    ajouts = [objet for objet in session.new if isinstance(objet, Resultat)]
+    modifies = [
+        objet for objet in session.dirty
+        if isinstance(objet, Resultat) and objet not in session.deleted
+        and any(db.inspect(objet).attrs[champ].history.has_changes() for champ in CHAMPS_SUIVIS)
+    ]
+    retires = [objet for objet in session.deleted if isinstance(objet, Resultat)] + modifies
+    if not ajouts and not retires:
+        return
+
+    # Anciennes valeurs lues en base : l'historique des attributs est vide s'ils étaient expirés
+    retraits = []
+    ids = [objet.id for objet in retires if objet.id is not None]
+    if ids:
+        retraits = session.connection().execute(
+            select(Resultat.etudiant_id, Resultat.qcm_id, Resultat.note).where(Resultat.id.in_(ids))
+        ).all()
+
+    releve = session.info.setdefault(CLE_SESSION, {"retraits": [], "ajouts": []})
+    releve["retraits"].extend(retraits)
+    releve["ajouts"].extend(ajouts + modifies)
+
+
+def _appliquer_mouvements(session, flush_context) -> None:
+    releve = session.info.pop(CLE_SESSION, None)
+    if not releve:
+        return
+    connexion = session.connection()
+
+    # Valeurs écrites (date de correction par défaut comprise) : lues après l'INSERT / UPDATE
+    mouvements: List[Mouvement] = [
+        (etudiant_id, qcm_id, -1, note or 0, None) for etudiant_id, qcm_id, note in releve["retraits"]
+    ] + [
+        (objet.etudiant_id, objet.qcm_id, 1, objet.note or 0, objet.date_correction) for objet in releve["ajouts"]
+    ]
+
+    qcm_ids = {qcm_id for _, qcm_id, _, _, _ in mouvements if qcm_id is not None}
+    matieres = dict(connexion.execute(select(QCM.id, QCM.matiere_id).where(QCM.id.in_(qcm_ids))).all())
+
+    # Deltas par couple (étudiant, matière) : [nombre, somme, date la plus récente]
+    deltas: Dict[Couple, list] = {}
+    baisses: Set[Couple] = set()
+    for etudiant_id, qcm_id, signe, note, date in mouvements:
+        matiere_id = matieres.get(qcm_id)
+        if etudiant_id is None or matiere_id is None:
+            continue  # QCM sans matière : pas de résumé
+        couple = (etudiant_id, matiere_id)
+        delta = deltas.setdefault(couple, [0, 0.0, None])
+        delta[0] += signe
+        delta[1] += signe * note
+        if signe > 0:
+            date = _utc_naif(date) or _utc_naif(datetime.now(timezone.utc))
+            delta[2] = date if delta[2] is None else max(delta[2], date)
+        else:
+            baisses.add(couple)
+
+    ajouts = {couple: delta for couple, delta in deltas.items() if couple not in baisses}
+    if ajouts:
+        _ajouter(connexion, ajouts)
+    if baisses:
+        # Un résultat retiré : la date la plus récente n'est plus connue, recalcul exact
+        _recalculer(connexion, baisses)
+
+
+def suivre_resumes_notes(session=None) -> None:
+    """Branche la mise à jour des résumés sur les flush de la session (une seule fois)"""
+    session = session if session is not None else db.session
+    if not event.contains(session, "before_flush", _noter_mouvements):
+        event.listen(session, "before_flush", _noter_mouvements)
+        event.listen(session, "after_flush", _appliquer_mouvements)
+
+
+# ============================================================================
+# ÉCRITURE DES RÉSUMÉS
+# ============================================================================
+
+def _ajouter(connexion, deltas: Dict[Couple, list]) -> None:
+    """Upsert des deltas : une seule instruction, sûre face aux corrections concurrentes"""
+    if connexion.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as insert_upsert
+    elif connexion.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as insert_upsert
+    else:
+        _recalculer(connexion, deltas)
+        return
+
+    table = ResumeNotes.__table__
+    maintenant = _utc_naif(datetime.now(timezone.utc))
+    instruction = insert_upsert(table).values([
+        {
+            "etudiant_id": etudiant_id,
+            "matiere_id": matiere_id,
+            "nombre": nombre,
+            "somme": somme,
+            "moyenne": somme / nombre if nombre > 0 else 0,
+            "derniere_date": date,
+            "date_maj": maintenant
+        }
+        for (etudiant_id, matiere_id), (nombre, somme, date) in deltas.items()
+    ])
+    nouveau = instruction.excluded
+    nombre = table.c.nombre + nouveau.nombre
+    somme = table.c.somme + nouveau.somme
+    instruction = instruction.on_conflict_do_update(
+        index_elements=[table.c.etudiant_id, table.c.matiere_id],
+        set_={
+            "nombre": nombre,
+            "somme": somme,
+            "moyenne": case((nombre > 0, somme / nombre), else_=0),
+            "derniere_date": case(
+                (or_(table.c.derniere_date.is_(None), nouveau.derniere_date > table.c.derniere_date), nouveau.derniere_date),
+                else_=table.c.derniere_date
+            ),
+            "date_maj": nouveau.date_maj
+        }
+    )
+    connexion.execute(instruction)
+
+
+def _select_agregats(*filtres):
+    """Agrégats (étudiant, matière, nombre, somme, moyenne, dernière date) depuis resultats"""
+    return select(
+        Resultat.etudiant_id,
+        QCM.matiere_id,
+        func.count(Resultat.id),
+        func.sum(Resultat.note),
+        func.avg(Resultat.note),
+        func.max(Resultat.date_correction),
+        func.now()
+    ).join(QCM, QCM.id == Resultat.qcm_id).where(
+        QCM.matiere_id.isnot(None), *filtres
+    ).group_by(Resultat.etudiant_id, QCM.matiere_id)
+
+
+COLONNES_AGREGATS = ["etudiant_id", "matiere_id", "nombre", "somme", "moyenne", "derniere_date", "date_maj"]
+
+
+def _recalculer(connexion, couples: Iterable[Couple]) -> None:
+    """
+    Recalcule exactement les résumés des couples donnés. Le produit cartésien de leurs
+    étudiants et matières est recalculé (il contient les couples demandés).
+    """
+    couples = list(couples)
+    if not couples:
+        return
+    etudiant_ids = {etudiant_id for etudiant_id, _ in couples}
+    matiere_ids = {matiere_id for _, matiere_id in couples}
+    table = ResumeNotes.__table__
+
+    connexion.execute(delete(table).where(
+        table.c.etudiant_id.in_(etudiant_ids), table.c.matiere_id.in_(matiere_ids)
+    ))
+    connexion.execute(insert(table).from_select(
+        COLONNES_AGREGATS,
+        _select_agregats(Resultat.etudiant_id.in_(etudiant_ids), QCM.matiere_id.in_(matiere_ids))
+    ))
+
+
+def recalculer_resumes_notes(etudiant_ids: Iterable[int], matiere_ids: Iterable[Optional[int]]) -> None:
+    """
+    Recalcule les résumés de ces étudiants dans ces matières, dans la transaction en cours.
+    À appeler après une suppression en masse de Resultat (Query.delete).
+    """
+    etudiant_ids = set(etudiant_ids)
+    matiere_ids = {m for m in matiere_ids if m is not None}
+    if etudiant_ids and matiere_ids:
+        db.session.flush()
+        _recalculer(db.session.connection(), [(e, m) for e in etudiant_ids for m in matiere_ids])
+
+
+def reconstruire_resumes_notes() -> int:
+    """Reconstruit toute la table des résumés depuis resultats (sans commit). Retourne le nombre de lignes"""
+    db.session.flush()
+    connexion = db.session.connection()
+    connexion.execute(delete(ResumeNotes.__table__))
+    connexion.execute(insert(ResumeNotes.__table__).from_select(COLONNES_AGREGATS, _select_agregats()))
+    return connexion.execute(select(func.count()).select_from(ResumeNotes.__table__)).scalar()
+
+
+# ============================================================================
+# COMMANDE FLASK
+# ============================================================================
+
+resumes_notes_cli = AppGroup("resumes-notes", help="Résumés des notes par étudiant et par matière")
+
+
+@resumes_notes_cli.command("reconstruire")
+def reconstruire_commande():
+    """Reconstruit la table resumes_notes depuis les résultats"""
+    nombre = reconstruire_resumes_notes()
+    db.session.commit()
+    click.echo(f"✅ {nombre} résumés de notes reconstruits")
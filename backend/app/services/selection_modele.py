@@ -0,0 +1,194 @@
+"""
+Politique de sélection du modèle de génération local.
+
+Les modèles candidats sont déclarés avec leur empreinte mémoire et les devices
+sur lesquels ils sont raisonnables. Avant tout chargement, la liste est filtrée
+selon la RAM (ou VRAM) disponible et le device du nœud : un modèle qui ne tient
+pas n'est jamais chargé, au lieu de geler un worker en swap ou en offload disque.
+
+Ce module n'importe pas torch : le preflight s'exécute au démarrage de l'application.
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional
+
+from flask import current_app
+
+from ..utils.metriques import metriques
+
+
+GO = 1024 ** 3
+
+# Du plus capable au plus léger. `memoire_go` : empreinte en float32 (poids + activations)
+CANDIDATS_GENERATION: List[Dict[str, Any]] = [
+    {
+        "nom": "google/flan-ul2",
+        "memoire_go": 42.0,          # 20B paramètres en float16
+        "devices": ("cuda",),        # Inutilisable sur CPU (offload disque = worker gelé)
+        "demi_precision": True
+    },
+    {
+        "nom": "google/flan-t5-large",
+        "memoire_go": 4.0,
+        "devices": ("cuda", "cpu")
+    },
+    {
+        "nom": "google/flan-t5-base",
+        "memoire_go": 1.5,
+        "devices": ("cuda", "cpu")
+    },
+    {
+        "nom": "google/flan-t5-small",
+        "memoire_go": 0.6,
+        "devices": ("cuda", "cpu")
+    }
+]
+
+# Empreinte relative au float32 selon le backend d'inférence
+FACTEUR_MEMOIRE_BACKEND = {"torch": 1.0, "int8": 0.4, "onnx": 1.2}
+
+_choix_preflight: Optional[Dict[str, Any]] = None
+
+# Modèle effectivement chargé par (device, backend) : le choix ne change plus ensuite
+_modeles_retenus: Dict[tuple, Dict[str, Any]] = {}
+
+
+def memoire_disponible_octets() -> Optional[int]:
+    """RAM disponible pour le processus (MemAvailable, bornée par la limite cgroup s'il y en a une)"""
+    disponible = None
+    try:
+        with open("/proc/meminfo") as f:
+            for ligne in f:
+                if ligne.startswith("MemAvailable:"):
+                    disponible = int(ligne.split()[1]) * 1024
+                    break
+    except (OSError, ValueError, IndexError):
+        try:
+            disponible = os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+        except (ValueError, OSError, AttributeError):
+            disponible = None
+
+    # Conteneur : la limite cgroup v2 peut être bien plus basse que la RAM de l'hôte
+    try:
+        with open("/sys/fs/cgroup/memory.max") as f:
+            limite = f.read().strip()
+        with open("/sys/fs/cgroup/memory.current") as f:
+            utilise = int(f.read().strip())
+        if limite != "max":
+            reste = int(limite) - utilise
+            disponible = reste if disponible is None else min(disponible, reste)
+    except (OSError, ValueError):
+        pass
+
+    return disponible
+
+
+def detecter_device() -> str:
+    """Détecte le device sans importer torch (sauf s'il est déjà chargé)"""
+    if "torch" in sys.modules:
+        return "cuda" if sys.modules["torch"].cuda.is_available() else "cpu"
+    if os.environ.get("CUDA_VISIBLE_DEVICES", None) in ("", "-1"):
+        return "cpu"
+    if os.path.isdir("/proc/driver/nvidia/gpus") and os.listdir("/proc/driver/nvidia/gpus"):
+        return "cuda"
+    return "cpu"
+
+
+def memoire_gpu_octets() -> Optional[int]:
+    """Mémoire libre du premier GPU (nvidia-smi), None si inconnue"""
+    if "torch" in sys.modules and sys.modules["torch"].cuda.is_available():
+        libre, _ = sys.modules["torch"].cuda.mem_get_info(0)
+        return int(libre)
+    if not shutil.which("nvidia-smi"):
+        return None
+    try:
+        sortie = subprocess.run(
+            ["nvidia-smi", "--query-gpu=memory.free", "--format=csv,noheader,nounits"],
+            capture_output=True, text=True, timeout=5
+        ).stdout
+        return int(sortie.splitlines()[0].strip()) * 1024 * 1024
+    except (OSError, ValueError, IndexError, subprocess.SubprocessError):
+        return None
+
+
+def candidats_compatibles(device: str, backend: str) -> List[Dict[str, Any]]:
+    """
+    Candidats qui tiennent sur ce nœud, du plus capable au plus léger.
+
+    Une mémoire inconnue n'élimine que les modèles réservés au GPU.
+    """
+    marge = current_app.config.get("HF_MARGE_MEMOIRE_GO", 1.0) * GO
+    memoire = memoire_gpu_octets() if device == "cuda" else memoire_disponible_octets()
+    facteur = FACTEUR_MEMOIRE_BACKEND.get(backend, 1.0) if device == "cpu" else 1.0
+
+    retenus = []
+    for candidat in CANDIDATS_GENERATION:
+        if device not in candidat["devices"]:
+            continue
+        requis = candidat["memoire_go"] * facteur * GO
+        if memoire is None:
+            if device == "cuda" and candidat.get("demi_precision"):
+                continue
+        elif requis + marge > memoire:
+            continue
+        retenus.append(dict(candidat, memoire_requise_octets=int(requis)))
+    return retenus
+
+
+def preflight_modeles(app) -> Optional[Dict[str, Any]]:
+    """
+    Choisit au démarrage le meilleur modèle de génération qui tient sur le nœud
+    et l'enregistre dans les métriques (aucun modèle n'est chargé ici).
+    """
+    global _choix_preflight
+    with app.app_context():
+        device = detecter_device()
+        backend = str(app.config.get("HF_INFERENCE_BACKEND", "torch")).lower()
+        if device != "cpu":
+            backend = "torch"
+        memoire = memoire_disponible_octets()
+        candidats = candidats_compatibles(device, backend)
+
+        if memoire is not None:
+            metriques.definir("ia_memoire_disponible_octets", memoire)
+        metriques.definir("ia_candidats_compatibles", len(candidats), device=device)
+
+        if not candidats:
+            app.logger.warning(f"⚠️ Preflight: aucun modèle de génération ne tient sur ce nœud ({device})")
+            _choix_preflight = None
+            return None
+
+        choix = candidats[0]
+        _choix_preflight = dict(choix, device=device, backend=backend)
+        metriques.definir("ia_modele_selectionne", 1, modele=choix["nom"], device=device, backend=backend)
+        memoire_texte = f"{memoire / GO:.1f} Go" if memoire is not None else "inconnue"
+        app.logger.info(
+            f"🧮 Preflight: {choix['nom']} retenu sur {device} (backend {backend}, mémoire disponible {memoire_texte})"
+        )
+        return _choix_preflight
+
+
+def candidats_generation(device: str, backend: str) -> List[Dict[str, Any]]:
+    """
+    Ordre de chargement du modèle de génération : à partir du choix du preflight
+    (s'il a été fait pour ce device/backend), en descendant vers les modèles plus légers.
+    """
+    if (device, backend) in _modeles_retenus:
+        # La RAM occupée par le modèle déjà chargé ne doit pas faire choisir un autre modèle
+        return [_modeles_retenus[(device, backend)]]
+
+    candidats = candidats_compatibles(device, backend)
+    if _choix_preflight and _choix_preflight["device"] == device and _choix_preflight["backend"] == backend:
+        noms = [c["nom"] for c in candidats]
+        if _choix_preflight["nom"] in noms:
+            # Pas de remontée vers un modèle que le preflight a écarté
+            candidats = candidats[noms.index(_choix_preflight["nom"]):]
+    return candidats
+
+
+def enregistrer_modele_retenu(device: str, backend: str, candidat: Dict[str, Any]) -> None:
+    """Mémorise le modèle chargé pour ce device/backend"""
+    _modeles_retenus[(device, backend)] = candidat
@@ -0,0 +1,200 @@
+"""
+Instrumentation SQL par requête HTTP : nombre de requêtes, durée totale en base et
+formes de requêtes répétées (une même forme exécutée N fois = N+1 probable).
+
+Les événements before/after_cursor_execute de SQLAlchemy alimentent les suivis actifs
+du contexte courant (ContextVar) :
+- un suivi par requête HTTP (installer_instrumentation_sql) : en-têtes X-SQL-* en mode
+  debug, métriques sql_* en production, avertissement si une forme se répète
+- budget_requetes() : échoue si un bloc de code dépasse un nombre de requêtes ou de
+  répétitions déclaré (vérifications et scripts de benchmarks)
+
+La forme d'une requête est son SQL sans valeurs : paramètres, nombres et chaînes
+remplacés, listes IN réduites à un seul élément.
+"""
+
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+
+from flask import current_app, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .metriques import metriques
+
+
+_suivis_actifs: ContextVar[Tuple["SuiviSQL", ...]] = ContextVar("suivis_sql", default=())
+
+_CHAINES = re.compile(r"'(?:[^']|'')*'")
+_NOMBRES = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAMETRES = re.compile(r"%\(\w+\)s|%s|\?|:\w+|\$\d+|\[POSTCOMPILE_\w+\]|__\[POSTCOMPILE_\w+\]")
+_LISTES = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ESPACES = re.compile(r"\s+")
+
+
+def forme_requete(sql: str) -> str:
+    """SQL sans valeurs : deux exécutions de la même requête avec d'autres paramètres ont la même forme"""
+    forme = _CHAINES.sub("?", sql)
+    forme = _PARAMETRES.sub("?", forme)
+    forme = _NOMBRES.sub("?", forme)
+    forme = _LISTES.sub("(?)", forme)
+    return _ESPACES.sub(" ", forme).strip()
+
+
+class SuiviSQL:
+    """Requêtes SQL exécutées pendant un suivi (requête HTTP ou bloc de code)"""
+
+    def __init__(self):
+        self.nombre = 0
+        self.duree = 0.0
+        self.formes: Counter = Counter()
+
+    def enregistrer(self, sql: str, duree: float) -> None:
+        self.nombre += 1
+        self.duree += duree
+        self.formes[forme_requete(sql)] += 1
+
+    def repetition_max(self) -> int:
+        return max(self.formes.values(), default=0)
+
+    def formes_repetees(self, seuil: int) -> List[Tuple[str, int]]:
+        """Formes exécutées plus de `seuil` fois, les plus fréquentes d'abord"""
+        return [(forme, nombre) for forme, nombre in self.formes.most_common() if nombre > seuil]
+
+
+# ============================================================================
+# ÉVÉNEMENTS SQLALCHEMY
+# ============================================================================
+
+# Début de la requête gardé sur son contexte d'exécution (une requête en erreur,
+# sans after_cursor_execute, ne laisse rien sur la connexion du pool)
+def _avant_execution(conn, cursor, statement, parameters, context, executemany):
+    if _suivis_actifs.get() and context is not None:
+        context._debut_sql = time.perf_counter()
+
+
+def _apres_execution(conn, cursor, statement, parameters, context, executemany):
+    suivis = _suivis_actifs.get()
+    debut = getattr(context, "_debut_sql", None)
+    if not suivis or debut is None:
+        return
+    duree = time.perf_counter() - debut
+    for suivi in suivis:
+        suivi.enregistrer(statement, duree)
+
+
+def ecouter_requetes_sql() -> None:
+    """Branche le suivi sur tous les moteurs SQLAlchemy (une seule fois)"""
+    if not event.contains(Engine, "before_cursor_execute", _avant_execution):
+        event.listen(Engine, "before_cursor_execute", _avant_execution)
+        event.listen(Engine, "after_cursor_execute", _apres_execution)
+
+
+@contextmanager
+def suivre_sql():
+    """Suit les requêtes SQL exécutées dans le bloc : `with suivre_sql() as suivi: ...`"""
+    ecouter_requetes_sql()
+    suivi = SuiviSQL()
+    jeton = _suivis_actifs.set(_suivis_actifs.get() + (suivi,))
+    try:
+        yield suivi
+    finally:
+        _suivis_actifs.reset(jeton)
+
+
+# ============================================================================
+# BUDGET DE REQUÊTES
+# ============================================================================
+
+class BudgetRequetesDepasse(AssertionError):
+    """Un bloc de code a exécuté plus de requêtes SQL (ou de répétitions) que son budget"""
+
+
+@contextmanager
+def budget_requetes(max_requetes: Optional[int] = None, max_repetitions: Optional[int] = None, nom: str = "bloc"):
+    """
+    Vérifie le nombre de requêtes SQL d'un bloc de code.
+
+    Args:
+        max_requetes: Nombre maximal de requêtes
+        max_repetitions: Nombre maximal d'exécutions d'une même forme de requête
+        nom: Nom du bloc dans le message d'erreur (ex: "GET /api/qcm/enseignant/qcms")
+
+    Raises:
+        BudgetRequetesDepasse: Budget dépassé, avec les formes les plus répétées
+    """
+    with suivre_sql() as suivi:
+        yield suivi
+
+    erreurs = []
+    if max_requetes is not None and suivi.nombre > max_requetes:
+        erreurs.append(f"{suivi.nombre} requêtes SQL (budget: {max_requetes})")
+    if max_repetitions is not None and suivi.repetition_max() > max_repetitions:
+        erreurs.append(f"une même requête exécutée {suivi.repetition_max()} fois (budget: {max_repetitions})")
+    if erreurs:
+        details = "\n".join(f"  {nombre} × {forme[:200]}" for forme, nombre in suivi.formes.most_common(3))
+        raise BudgetRequetesDepasse(f"{nom}: {' ; '.join(erreurs)}\n{details}")
+
+
+# ============================================================================
+# SUIVI DES REQUÊTES HTTP
+# ============================================================================
+
+def installer_instrumentation_sql(app) -> None:
+    """Suit les requêtes SQL de chaque requête HTTP (SQL_INSTRUMENTATION_ACTIVE)"""
+    if not app.config.get("SQL_INSTRUMENTATION_ACTIVE", True):
+        return
+    ecouter_requetes_sql()
+
+    metriques.decrire("sql_requetes_total", "Requêtes SQL exécutées, par endpoint")
+    metriques.decrire("sql_duree_secondes_total", "Temps passé en base, par endpoint")
+    metriques.decrire("sql_requetes_http_total", "Requêtes HTTP suivies, par endpoint")
+    metriques.decrire("sql_n_plus_1_suspects_total", "Requêtes HTTP où une même requête SQL se répète au-delà du seuil")
+
+    @app.before_request
+    def _debut_suivi_sql():
+        suivi = SuiviSQL()
+        g.suivi_sql = suivi
+        g.jeton_suivi_sql = _suivis_actifs.set(_suivis_actifs.get() + (suivi,))
+
+    @app.after_request
+    def _fin_suivi_sql(response):
+        suivi = g.get("suivi_sql")
+        if suivi is None:
+            return response
+        endpoint = request.endpoint or "inconnu"
+        seuil = current_app.config.get("SQL_SEUIL_REPETITIONS", 10)
+
+        metriques.incrementer("sql_requetes_http_total", endpoint=endpoint)
+        metriques.incrementer("sql_requetes_total", suivi.nombre, endpoint=endpoint)
+        metriques.incrementer("sql_duree_secondes_total", suivi.duree, endpoint=endpoint)
+
+        repetees = suivi.formes_repetees(seuil)
+        if repetees:
+            metriques.incrementer("sql_n_plus_1_suspects_total", endpoint=endpoint)
+            forme, nombre = repetees[0]
+            current_app.logger.warning(
+                f"🐢 N+1 probable sur {request.method} {request.path}: {nombre} × {forme[:200]} "
+                f"({suivi.nombre} requêtes SQL au total)"
+            )
+
+        if current_app.debug or current_app.config.get("SQL_INSTRUMENTATION_ENTETES"):
+            response.headers["X-SQL-Requetes"] = str(suivi.nombre)
+            response.headers["X-SQL-Duree-Ms"] = f"{suivi.duree * 1000:.1f}"
+            response.headers["X-SQL-Repetition-Max"] = str(suivi.repetition_max())
+        return response
+
+    @app.teardown_request
+    def _arret_suivi_sql(exception=None):
+        jeton = g.pop("jeton_suivi_sql", None)
+        if jeton is None:
+            return
+        try:
+            _suivis_actifs.reset(jeton)
+        except ValueError:
+            # Réponse en streaming terminée dans un autre contexte : le suivi n'a plus lieu d'être
+            _suivis_actifs.set(tuple(s for s in _suivis_actifs.get() if s is not g.get("suivi_sql")))
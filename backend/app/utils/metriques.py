@@ -0,0 +1,282 @@
+"""
+Registre de métriques du processus (compteurs, jauges et histogrammes étiquetés).
+
+Les valeurs restent en mémoire dans chaque worker ; elles servent aux logs,
+aux endpoints de diagnostic et à l'exposition des métriques (format texte
+Prometheus, voir format_prometheus et utils/metriques_http).
+
+Avec plusieurs workers Gunicorn, chacun peut déposer ses valeurs dans un dossier
+partagé (exporter) : l'endpoint /metrics additionne alors les séries de tous les
+workers vivants (fusionner) au lieu de ne montrer que celui qui répond.
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+
+Etiquettes = Tuple[Tuple[str, str], ...]
+
+# Tranches (bornes supérieures) des histogrammes de durée, en secondes
+TRANCHES_DUREE = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# Tranches des histogrammes de taille (éléments par lot, tokens)
+TRANCHES_TAILLE = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048)
+
+
+def _etiquettes(labels: Dict[str, object]) -> Etiquettes:
+    return tuple(sorted((cle, str(valeur)) for cle, valeur in labels.items()))
+
+
+class RegistreMetriques:
+    """
+    Compteurs (valeurs qui ne font qu'augmenter), jauges (dernière valeur connue)
+    et histogrammes (nombre d'observations par tranche, somme et nombre total).
+    """
+
+    def __init__(self):
+        self._compteurs: Dict[str, Dict[Etiquettes, float]] = {}
+        self._jauges: Dict[str, Dict[Etiquettes, float]] = {}
+        # Histogramme : {etiquettes: [compte par tranche..., compte au-delà, somme]}
+        self._histogrammes: Dict[str, Dict[Etiquettes, List[float]]] = {}
+        self._tranches: Dict[str, Tuple[float, ...]] = {}
+        self._descriptions: Dict[str, str] = {}
+        self._collecteurs: Dict[str, Callable[[], None]] = {}
+        self._dernier_export = 0.0
+        self._verrou = threading.Lock()
+
+    def decrire(self, nom: str, description: str) -> None:
+        self._descriptions[nom] = description
+
+    def incrementer(self, nom: str, valeur: float = 1, **labels) -> None:
+        cle = _etiquettes(labels)
+        with self._verrou:
+            serie = self._compteurs.setdefault(nom, {})
+            serie[cle] = serie.get(cle, 0) + valeur
+
+    def definir(self, nom: str, valeur: float, **labels) -> None:
+        with self._verrou:
+            self._jauges.setdefault(nom, {})[_etiquettes(labels)] = valeur
+
+    def ajouter(self, nom: str, delta: float, **labels) -> None:
+        """Fait varier une jauge (ex: requêtes en cours, +1 puis -1)"""
+        cle = _etiquettes(labels)
+        with self._verrou:
+            serie = self._jauges.setdefault(nom, {})
+            serie[cle] = serie.get(cle, 0) + delta
+
+    def definir_tranches(self, nom: str, tranches: Sequence[float]) -> None:
+        """Tranches d'un histogramme (TRANCHES_DUREE par défaut), avant sa première observation"""
+        self._tranches[nom] = tuple(sorted(tranches))
+
+    def observer(self, nom: str, valeur: float, **labels) -> None:
+        """Ajoute une observation (durée, taille) à un histogramme"""
+        cle = _etiquettes(labels)
+        with self._verrou:
+            tranches = self._tranches.setdefault(nom, TRANCHES_DUREE)
+            serie = self._histogrammes.setdefault(nom, {})
+            comptes = serie.get(cle)
+            if comptes is None:
+                comptes = serie[cle] = [0] * (len(tranches) + 2)
+            # Tranche "le" : première borne supérieure ou égale à la valeur
+            comptes[bisect.bisect_left(tranches, valeur)] += 1
+            comptes[-1] += valeur
+
+    @contextmanager
+    def chronometrer(self, nom: str, **labels):
+        """Observe la durée du bloc dans l'histogramme `nom`, exception comprise"""
+        debut = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observer(nom, time.perf_counter() - debut, **labels)
+
+    def valeur(self, nom: str, **labels) -> float:
+        cle = _etiquettes(labels)
+        with self._verrou:
+            if nom in self._compteurs:
+                return self._compteurs[nom].get(cle, 0)
+            if nom in self._histogrammes:
+                comptes = self._histogrammes[nom].get(cle)
+                return sum(comptes[:-1]) if comptes else 0
+            return self._jauges.get(nom, {}).get(cle, 0)
+
+    def ajouter_collecteur(self, nom: str, collecteur: Callable[[], None]) -> None:
+        """Fonction appelée avant chaque lecture du registre (jauges lues à la demande : pool de connexions)"""
+        self._collecteurs[nom] = collecteur
+
+    def collecter(self) -> None:
+        for nom, collecteur in list(self._collecteurs.items()):
+            try:
+                collecteur()
+            except Exception:
+                # Une source indisponible (base arrêtée) ne doit pas priver des autres métriques
+                self.incrementer("metriques_collectes_echouees", collecteur=nom)
+
+    def instantane(self) -> Dict[str, Dict[str, object]]:
+        """
+        Copie des séries : {"compteurs": {nom: {etiquettes: valeur}}, "jauges": {...},
+        "histogrammes": {nom: {etiquettes: [comptes..., somme]}}, "tranches": {nom: tranches}}
+        """
+        with self._verrou:
+            return {
+                "compteurs": {nom: dict(serie) for nom, serie in self._compteurs.items()},
+                "jauges": {nom: dict(serie) for nom, serie in self._jauges.items()},
+                "histogrammes": {
+                    nom: {cle: list(comptes) for cle, comptes in serie.items()}
+                    for nom, serie in self._histogrammes.items()
+                },
+                "tranches": dict(self._tranches),
+                "descriptions": dict(self._descriptions)
+            }
+
+    # ============================================================================
+    # PLUSIEURS WORKERS
+    # ============================================================================
+
+    def exporter(self, dossier: str) -> None:
+        """Dépose l'instantané du processus dans `dossier` (un fichier par PID, remplacé atomiquement)"""
+        self.collecter()
+        contenu = {
+            genre: {nom: [[list(map(list, cle)), valeur] for cle, valeur in serie.items()] for nom, serie in series.items()}
+            for genre, series in self.instantane().items() if genre in ("compteurs", "jauges", "histogrammes")
+        }
+        contenu["tranches"] = {nom: list(tranches) for nom, tranches in self._tranches.items()}
+        chemin = os.path.join(dossier, f"metriques-{os.getpid()}.json")
+        temporaire = f"{chemin}.{threading.get_ident()}.tmp"
+        with open(temporaire, "w", encoding="utf-8") as fichier:
+            json.dump(contenu, fichier)
+        os.replace(temporaire, chemin)
+
+    def exporter_periodiquement(self, dossier: str, periode: float = 5) -> None:
+        """Exporte au plus une fois toutes les `periode` secondes (appelé après chaque requête)"""
+        maintenant = time.monotonic()
+        with self._verrou:
+            if maintenant - self._dernier_export < periode:
+                return
+            self._dernier_export = maintenant
+        self.exporter(dossier)
+
+
+def lire_exports(dossier: str) -> List[Dict[str, Dict[str, object]]]:
+    """Instantanés déposés par les workers encore vivants (les fichiers des autres sont supprimés)"""
+    instantanes = []
+    for nom_fichier in os.listdir(dossier):
+        if not (nom_fichier.startswith("metriques-") and nom_fichier.endswith(".json")):
+            continue
+        chemin = os.path.join(dossier, nom_fichier)
+        try:
+            pid = int(nom_fichier[len("metriques-"):-len(".json")])
+        except ValueError:
+            continue
+        if pid != os.getpid() and not _processus_vivant(pid):
+            try:
+                os.remove(chemin)
+            except OSError:
+                pass
+            continue
+        try:
+            with open(chemin, encoding="utf-8") as fichier:
+                contenu = json.load(fichier)
+        except (OSError, ValueError):
+            continue
+        instantane = {
+            genre: {
+                nom: {tuple(tuple(paire) for paire in cle): valeur for cle, valeur in serie}
+                for nom, serie in contenu.get(genre, {}).items()
+            }
+            for genre in ("compteurs", "jauges", "histogrammes")
+        }
+        instantane["tranches"] = {nom: tuple(tranches) for nom, tranches in contenu.get("tranches", {}).items()}
+        instantanes.append(instantane)
+    return instantanes
+
+
+def _processus_vivant(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def fusionner(instantanes: Iterable[Dict[str, Dict[str, object]]]) -> Dict[str, Dict[str, object]]:
+    """Additionne les séries de plusieurs processus (compteurs, jauges et histogrammes)"""
+    fusion = {"compteurs": {}, "jauges": {}, "histogrammes": {}, "tranches": {}, "descriptions": {}}
+    for instantane in instantanes:
+        for genre in ("compteurs", "jauges"):
+            for nom, serie in instantane.get(genre, {}).items():
+                cible = fusion[genre].setdefault(nom, {})
+                for cle, valeur in serie.items():
+                    cible[cle] = cible.get(cle, 0) + valeur
+        for nom, serie in instantane.get("histogrammes", {}).items():
+            cible = fusion["histogrammes"].setdefault(nom, {})
+            for cle, comptes in serie.items():
+                if cle in cible and len(cible[cle]) == len(comptes):
+                    cible[cle] = [a + b for a, b in zip(cible[cle], comptes)]
+                elif cle not in cible:
+                    cible[cle] = list(comptes)
+        fusion["tranches"].update(instantane.get("tranches", {}))
+        fusion["descriptions"].update(instantane.get("descriptions", {}))
+    return fusion
+
+
+# ============================================================================
+# FORMAT TEXTE PROMETHEUS
+# ============================================================================
+
+def _echapper(valeur: str) -> str:
+    return valeur.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _nombre(valeur: float) -> str:
+    valeur = float(valeur)
+    if valeur.is_integer() and abs(valeur) < 1e15:
+        return str(int(valeur))
+    return repr(valeur)
+
+
+def _serie(nom: str, etiquettes: Etiquettes, valeur: float) -> str:
+    if etiquettes:
+        labels = ",".join(f'{cle}="{_echapper(val)}"' for cle, val in etiquettes)
+        return f"{nom}{{{labels}}} {_nombre(valeur)}"
+    return f"{nom} {_nombre(valeur)}"
+
+
+def format_prometheus(instantane: Dict[str, Dict[str, object]]) -> str:
+    """Instantané (ou fusion) au format texte d'exposition Prometheus 0.0.4"""
+    descriptions = instantane.get("descriptions", {})
+    lignes = []
+
+    def entete(nom, genre):
+        if nom in descriptions:
+            lignes.append(f"# HELP {nom} {_echapper(descriptions[nom])}")
+        lignes.append(f"# TYPE {nom} {genre}")
+
+    for genre, type_prometheus in (("compteurs", "counter"), ("jauges", "gauge")):
+        for nom, serie in sorted(instantane.get(genre, {}).items()):
+            entete(nom, type_prometheus)
+            lignes.extend(_serie(nom, cle, valeur) for cle, valeur in sorted(serie.items()))
+
+    for nom, serie in sorted(instantane.get("histogrammes", {}).items()):
+        tranches = instantane.get("tranches", {}).get(nom, TRANCHES_DUREE)
+        entete(nom, "histogram")
+        for cle, comptes in sorted(serie.items()):
+            cumul = 0
+            for borne, compte in zip(tranches, comptes):
+                cumul += compte
+                lignes.append(_serie(f"{nom}_bucket", cle + (("le", f"{borne:g}"),), cumul))
+            cumul += comptes[len(tranches)]
+            lignes.append(_serie(f"{nom}_bucket", cle + (("le", "+Inf"),), cumul))
+            lignes.append(_serie(f"{nom}_sum", cle, comptes[-1]))
+            lignes.append(_serie(f"{nom}_count", cle, cumul))
+
+    return "\n".join(lignes) + "\n"
+
+
+metriques = RegistreMetriques()
@@ -0,0 +1,119 @@
+"""
+Métriques des requêtes HTTP et de la base, exposées au format Prometheus sur /metrics.
+
+- http_requete_duree_secondes : histogramme par blueprint, route (règle Flask, pas l'URL)
+  et méthode ; les réponses en streaming sont mesurées jusqu'à l'envoi des en-têtes
+- http_requetes_total : requêtes terminées, avec le statut HTTP
+- http_requetes_en_cours : requêtes en cours de traitement
+- db_pool_* : connexions du pool SQLAlchemy (taille, utilisées, libres, débordement)
+
+Avec METRIQUES_DOSSIER, chaque worker (et le sidecar d'inférence) y dépose ses valeurs
+après ses requêtes : /metrics additionne alors tous les processus vivants.
+METRIQUES_JETON protège l'endpoint (Authorization: Bearer <jeton>).
+"""
+
+import hmac
+import os
+import time
+
+from flask import Response, current_app, g, jsonify, request
+
+from ..extensions import db
+from .metriques import format_prometheus, fusionner, lire_exports, metriques
+
+
+def _labels_route():
+    return {
+        "blueprint": request.blueprint or "app",
+        "route": request.url_rule.rule if request.url_rule else "inconnue",
+        "methode": request.method
+    }
+
+
+def _collecteur_pool(moteur_bdd):
+    def collecter():
+        pool = moteur_bdd.pool
+        # Les pools sans file (SQLite en mémoire, NullPool) n'exposent pas ces compteurs
+        if not hasattr(pool, "checkedout"):
+            return
+        metriques.definir("db_pool_taille", pool.size())
+        metriques.definir("db_pool_connexions_utilisees", pool.checkedout())
+        metriques.definir("db_pool_connexions_libres", pool.checkedin())
+        metriques.definir("db_pool_debordement", max(pool.overflow(), 0))
+    return collecter
+
+
+def exporter_metriques_processus(config) -> None:
+    """Dépose les métriques du processus dans METRIQUES_DOSSIER (au plus toutes les METRIQUES_EXPORT_SECONDES)"""
+    dossier = config.get("METRIQUES_DOSSIER")
+    if not dossier:
+        return
+    try:
+        metriques.exporter_periodiquement(dossier, config.get("METRIQUES_EXPORT_SECONDES", 5))
+    except OSError as e:
+        current_app.logger.warning(f"⚠️ Export des métriques impossible dans {dossier}: {e}")
+
+
+def exposer_metriques():
+    """Toutes les métriques au format texte Prometheus"""
+    jeton = current_app.config.get("METRIQUES_JETON")
+    if jeton and not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {jeton}"):
+        return jsonify({"error": "Accès non autorisé"}), 401
+
+    metriques.collecter()
+    instantane = metriques.instantane()
+    dossier = current_app.config.get("METRIQUES_DOSSIER")
+    if dossier:
+        try:
+            metriques.exporter(dossier)
+            descriptions = instantane["descriptions"]
+            instantane = fusionner(lire_exports(dossier))
+            instantane["descriptions"].update(descriptions)
+        except OSError as e:
+            current_app.logger.warning(f"⚠️ Métriques des autres processus illisibles dans {dossier}: {e}")
+
+    return Response(format_prometheus(instantane), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def installer_metriques(app) -> None:
+    """Mesure les requêtes HTTP, suit le pool de connexions et expose /metrics (METRIQUES_ACTIVES)"""
+    if not app.config.get("METRIQUES_ACTIVES", True):
+        return
+
+    dossier = app.config.get("METRIQUES_DOSSIER")
+    if dossier:
+        os.makedirs(dossier, exist_ok=True)
+
+    metriques.decrire("http_requete_duree_secondes", "Durée des requêtes HTTP, par blueprint, route et méthode")
+    metriques.decrire("http_requetes_total", "Requêtes HTTP terminées, par route et statut")
+    metriques.decrire("http_requetes_en_cours", "Requêtes HTTP en cours de traitement")
+    metriques.decrire("db_pool_taille", "Taille du pool de connexions SQLAlchemy")
+    metriques.decrire("db_pool_connexions_utilisees", "Connexions du pool prêtées à une requête")
+    metriques.decrire("db_pool_connexions_libres", "Connexions ouvertes disponibles dans le pool")
+    metriques.decrire("db_pool_debordement", "Connexions ouvertes au-delà de la taille du pool")
+
+    with app.app_context():
+        metriques.ajouter_collecteur("pool_bdd", _collecteur_pool(db.engine))
+
+    @app.before_request
+    def _debut_mesure_http():
+        g.debut_requete_http = time.perf_counter()
+        metriques.ajouter("http_requetes_en_cours", 1)
+
+    @app.after_request
+    def _fin_mesure_http(response):
+        debut = g.get("debut_requete_http")
+        if debut is None:
+            return response
+        labels = _labels_route()
+        metriques.observer("http_requete_duree_secondes", time.perf_counter() - debut, **labels)
+        metriques.incrementer("http_requetes_total", statut=response.status_code, **labels)
+        return response
+
+    @app.teardown_request
+    def _arret_mesure_http(exception=None):
+        if g.pop("debut_requete_http", None) is not None:
+            metriques.ajouter("http_requetes_en_cours", -1)
+            exporter_metriques_processus(current_app.config)
+
+    app.add_url_rule("/metrics", "metriques", exposer_metriques, methods=["GET"])
@@ -0,0 +1,333 @@
+"""
+Profilage à la demande des workers en production, sans redémarrage.
+
+Une session de profilage est un fichier JSON (PROFILAGE_DOSSIER/session.json) écrit par
+l'endpoint admin /api/admin/profilage : tous les workers le relisent au plus toutes les
+PROFILAGE_VERIFICATION_SECONDES. Sans session, chaque requête ne coûte qu'une
+comparaison d'horloge.
+
+Une session profile les N prochaines requêtes (partagées entre workers) et/ou toutes
+celles d'une fenêtre de temps, éventuellement filtrées par route :
+- échantillonnage : un thread relève la pile des threads profilés (requête et threads
+  des micro-lots qui exécutent les modèles) toutes les `intervalle_ms` ; les piles
+  s'accumulent au format « collapsed » (flamegraph.pl, speedscope) dans
+  <session>/piles-<pid>.collapsed
+- cProfile (optionnel, plus coûteux) : un fichier .prof par requête, lisible avec pstats
+  ou snakeviz ; `pstats.Stats(*fichiers)` les additionne
+
+Avec le sidecar d'inférence, les modèles tournent dans un autre processus : les piles
+des workers montrent alors l'attente du socket, pas le détail de generate().
+"""
+
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any, Dict, Optional
+
+from flask import current_app, g, request
+
+
+FICHIER_SESSION = "session.json"
+# Threads des ordonnanceurs de micro-lots (services/micro_lots.py) : ils exécutent les modèles
+PREFIXE_THREADS_LOTS = "lots-"
+
+MAX_REQUETES = 1000
+MAX_DUREE_SECONDES = 3600
+# Une session sans fenêtre explicite s'arrête quand même après ce délai
+DUREE_DEFAUT_SECONDES = 900
+
+
+# ============================================================================
+# SESSIONS
+# ============================================================================
+
+def creer_session(dossier: str, route: Optional[str] = None, requetes: Optional[int] = None,
+                  duree_secondes: Optional[float] = None, intervalle_ms: float = 5,
+                  cprofile: bool = True) -> Dict[str, Any]:
+    """
+    Démarre une session de profilage (remplace la session en cours).
+
+    Args:
+        dossier: PROFILAGE_DOSSIER
+        route: Endpoint ("qcm.generate_ai"), règle ("/api/qcm/generate-ai") ou préfixe de chemin ; vide = toutes
+        requetes: Nombre de requêtes à profiler, tous workers confondus
+        duree_secondes: Fenêtre de profilage
+        intervalle_ms: Période d'échantillonnage des piles
+        cprofile: Écrire aussi un profil cProfile par requête
+
+    Raises:
+        ValueError: Paramètres hors limites
+    """
+    if requetes is not None and not 1 <= requetes <= MAX_REQUETES:
+        raise ValueError(f"requetes doit être compris entre 1 et {MAX_REQUETES}")
+    if duree_secondes is not None and not 0 < duree_secondes <= MAX_DUREE_SECONDES:
+        raise ValueError(f"duree_secondes doit être compris entre 0 et {MAX_DUREE_SECONDES}")
+    if not 1 <= intervalle_ms <= 1000:
+        raise ValueError("intervalle_ms doit être compris entre 1 et 1000")
+
+    maintenant = time.time()
+    session = {
+        "id": time.strftime("%Y%m%d-%H%M%S", time.localtime(maintenant)) + "-" + uuid.uuid4().hex[:6],
+        "route": route or None,
+        "requetes": requetes,
+        "debut": maintenant,
+        "fin": maintenant + (duree_secondes or DUREE_DEFAUT_SECONDES),
+        "intervalle_ms": intervalle_ms,
+        "cprofile": bool(cprofile)
+    }
+    os.makedirs(os.path.join(dossier, session["id"]), exist_ok=True)
+    temporaire = os.path.join(dossier, f"{FICHIER_SESSION}.tmp")
+    with open(temporaire, "w", encoding="utf-8") as fichier:
+        json.dump(session, fichier)
+    os.replace(temporaire, os.path.join(dossier, FICHIER_SESSION))
+    return session
+
+
+def arreter_session(dossier: str) -> bool:
+    """Arrête la session en cours (les fichiers produits restent). Retourne False s'il n'y en avait pas"""
+    try:
+        os.remove(os.path.join(dossier, FICHIER_SESSION))
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def lire_session(dossier: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(dossier, FICHIER_SESSION), encoding="utf-8") as fichier:
+            return json.load(fichier)
+    except (OSError, ValueError):
+        return None
+
+
+def requetes_profilees(dossier: str, session: Dict[str, Any]) -> int:
+    """Requêtes déjà profilées par la session (places réservées par les workers)"""
+    try:
+        return sum(1 for nom in os.listdir(os.path.join(dossier, session["id"])) if nom.startswith("place-"))
+    except OSError:
+        return 0
+
+
+def _reserver_place(dossier: str, session: Dict[str, Any]) -> bool:
+    """Réserve une des N places de la session : création exclusive d'un fichier, sûre entre workers"""
+    repertoire = os.path.join(dossier, session["id"])
+    for numero in range(session["requetes"]):
+        try:
+            os.close(os.open(os.path.join(repertoire, f"place-{numero}"), os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            continue
+        except OSError:
+            return False
+    return False
+
+
+class _EtatSession:
+    """Session lue sur disque, relue au plus toutes les `periode` secondes"""
+
+    def __init__(self):
+        self.verifiee_a = float("-inf")
+        self.modifiee_a = None
+        self.session: Optional[Dict[str, Any]] = None
+        self.places_epuisees = False
+        self.verrou = threading.Lock()
+
+    def active(self, dossier: str, periode: float) -> Optional[Dict[str, Any]]:
+        maintenant = time.monotonic()
+        if maintenant - self.verifiee_a >= periode:
+            with self.verrou:
+                self.verifiee_a = maintenant
+                try:
+                    modifiee_a = os.stat(os.path.join(dossier, FICHIER_SESSION)).st_mtime
+                except OSError:
+                    modifiee_a = None
+                if modifiee_a != self.modifiee_a:
+                    self.modifiee_a = modifiee_a
+                    self.session = lire_session(dossier) if modifiee_a is not None else None
+                    self.places_epuisees = False
+        session = self.session
+        if session is None or time.time() > session["fin"]:
+            return None
+        return session
+
+
+_etat = _EtatSession()
+
+
+def _route_concernee(session: Dict[str, Any]) -> bool:
+    route = session.get("route")
+    if not route:
+        return True
+    regle = request.url_rule.rule if request.url_rule else None
+    return route in (request.endpoint, regle) or request.path.startswith(route)
+
+
+# ============================================================================
+# ÉCHANTILLONNAGE DES PILES
+# ============================================================================
+
+def _nom_fichier(chemin: str) -> str:
+    if "site-packages" in chemin:
+        return chemin.split("site-packages", 1)[1].lstrip("/\\")
+    racine = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    if chemin.startswith(racine):
+        return os.path.relpath(chemin, racine)
+    return os.path.basename(chemin)
+
+
+class EchantillonneurPiles:
+    """Thread qui relève périodiquement la pile des threads suivis (un par processus)"""
+
+    def __init__(self):
+        self.piles: Counter = Counter()
+        self._cibles: Dict[int, str] = {}
+        self._noms_code: Dict[Any, str] = {}
+        self._intervalle = 0.005
+        self._verrou = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def suivre(self, thread_id: int, nom: str, intervalle_ms: float) -> None:
+        with self._verrou:
+            self._cibles[thread_id] = nom
+            self._intervalle = intervalle_ms / 1000
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._boucle, name="profilage-piles", daemon=True)
+                self._thread.start()
+
+    def arreter_suivi(self, thread_id: int) -> None:
+        with self._verrou:
+            self._cibles.pop(thread_id, None)
+
+    def _nom_cadre(self, code) -> str:
+        nom = self._noms_code.get(code)
+        if nom is None:
+            nom = self._noms_code[code] = f"{code.co_name} ({_nom_fichier(code.co_filename)}:{code.co_firstlineno})"
+        return nom
+
+    def _pile(self, cadre, racine: str) -> str:
+        noms = []
+        while cadre is not None:
+            noms.append(self._nom_cadre(cadre.f_code))
+            cadre = cadre.f_back
+        noms.append(racine)
+        return ";".join(reversed(noms))
+
+    def _boucle(self) -> None:
+        while True:
+            with self._verrou:
+                if not self._cibles:
+                    self._thread = None
+                    return
+                cibles = dict(self._cibles)
+                intervalle = self._intervalle
+            # Les threads des micro-lots exécutent les modèles pour le compte des requêtes suivies
+            for thread in threading.enumerate():
+                if thread.name.startswith(PREFIXE_THREADS_LOTS):
+                    cibles.setdefault(thread.ident, thread.name)
+            cadres = sys._current_frames()
+            releves = [self._pile(cadres[thread_id], nom) for thread_id, nom in cibles.items() if thread_id in cadres]
+            del cadres
+            with self._verrou:
+                self.piles.update(releves)
+            time.sleep(intervalle)
+
+    def ecrire(self, chemin: str) -> None:
+        """Piles accumulées au format collapsed : « cadre;cadre;cadre nombre » par ligne"""
+        with self._verrou:
+            lignes = [f"{pile} {nombre}" for pile, nombre in self.piles.most_common()]
+        temporaire = f"{chemin}.tmp"
+        with open(temporaire, "w", encoding="utf-8") as fichier:
+            fichier.write("\n".join(lignes) + "\n")
+        os.replace(temporaire, chemin)
+
+    def vider(self) -> None:
+        with self._verrou:
+            self.piles.clear()
+
+
+_echantillonneur = EchantillonneurPiles()
+_session_piles = {"id": None}
+_compteur_requetes = {"valeur": 0}
+_verrou_compteur = threading.Lock()
+
+
+# ============================================================================
+# REQUÊTES HTTP
+# ============================================================================
+
+def installer_profilage(app) -> None:
+    """Profile les requêtes désignées par la session en cours (PROFILAGE_ACTIF)"""
+    if not app.config.get("PROFILAGE_ACTIF", True):
+        return
+
+    @app.before_request
+    def _debut_profilage():
+        config = current_app.config
+        dossier = config["PROFILAGE_DOSSIER"]
+        session = _etat.active(dossier, config.get("PROFILAGE_VERIFICATION_SECONDES", 1))
+        if session is None or not _route_concernee(session):
+            return
+        if session.get("requetes"):
+            if _etat.places_epuisees:
+                return
+            if not _reserver_place(dossier, session):
+                _etat.places_epuisees = True
+                return
+
+        with _verrou_compteur:
+            _compteur_requetes["valeur"] += 1
+            numero = _compteur_requetes["valeur"]
+            if _session_piles["id"] != session["id"]:
+                # Nouvelle session : les piles de la précédente sont déjà écrites
+                _echantillonneur.vider()
+                _session_piles["id"] = session["id"]
+
+        profil = None
+        if session.get("cprofile"):
+            profil = cProfile.Profile()
+            try:
+                profil.enable()
+            except ValueError:
+                # Un autre profileur est déjà actif sur ce thread
+                profil = None
+        g.profilage = {
+            "session": session,
+            "numero": numero,
+            "debut": time.perf_counter(),
+            "profil": profil,
+            "thread": threading.get_ident()
+        }
+        # Racine des piles : la règle de la route, pour additionner les requêtes d'une même route
+        racine = f"{request.method} {request.url_rule.rule if request.url_rule else request.path}".replace(";", ",")
+        _echantillonneur.suivre(threading.get_ident(), racine, session.get("intervalle_ms", 5))
+
+    @app.teardown_request
+    def _fin_profilage(exception=None):
+        profilage = g.pop("profilage", None)
+        if profilage is None:
+            return
+        profil = profilage["profil"]
+        if profil is not None:
+            profil.disable()
+        _echantillonneur.arreter_suivi(profilage["thread"])
+        duree = time.perf_counter() - profilage["debut"]
+
+        session = profilage["session"]
+        repertoire = os.path.join(current_app.config["PROFILAGE_DOSSIER"], session["id"])
+        endpoint = (request.endpoint or "inconnu").replace(".", "_")
+        try:
+            os.makedirs(repertoire, exist_ok=True)
+            if profil is not None:
+                profil.dump_stats(os.path.join(repertoire, f"{os.getpid()}-{profilage['numero']}-{endpoint}.prof"))
+            _echantillonneur.ecrire(os.path.join(repertoire, f"piles-{os.getpid()}.collapsed"))
+        except OSError as e:
+            current_app.logger.warning(f"⚠️ Profil non écrit dans {repertoire}: {e}")
+            return
+        current_app.logger.info(
+            f"🔬 Requête profilée ({session['id']}): {request.method} {request.path} en {duree * 1000:.0f} ms"
+        )
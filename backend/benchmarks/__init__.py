@@ -0,0 +1,4 @@
+"""
+Scripts de mesure des performances (hors application web).
+Usage depuis backend/ : python -m benchmarks.<nom_du_script>
+"""
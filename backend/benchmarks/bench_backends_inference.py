@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+"""
+Compare les backends d'inférence locaux (torch, int8, onnx) : parité et latence.
+
+Pour chaque backend, les mêmes prompts sont générés en décodage glouton
+(déterministe) et comparés au backend torch de référence :
+- génération FLAN-T5 et traduction MarianMT : textes identiques / nombre de prompts
+- embeddings MiniLM : similarité cosinus minimale avec les vecteurs de référence
+
+Usage (depuis backend/) :
+    python -m benchmarks.bench_backends_inference
+    python -m benchmarks.bench_backends_inference --backends torch int8 --repetitions 5
+"""
+
+import argparse
+import statistics
+import sys
+import time
+
+import numpy as np
+import torch
+
+from app import create_app
+from app.services.hugging_face_service import HuggingFaceService
+from app.services.inference_backends import BACKENDS, charger_seq2seq, charger_encodeur_phrases
+
+
+PROMPTS_GENERATION = [
+    "Create a multiple choice question about photosynthesis.\n\nContext: Photosynthesis converts light energy into chemical energy stored in glucose.",
+    "Create a multiple choice question about variables.\n\nContext: In Python, a variable is created the moment you first assign a value to it.",
+    "Create a multiple choice question about supply and demand.\n\nContext: When demand increases and supply stays the same, prices tend to rise.",
+]
+
+TEXTES_TRADUCTION = [
+    "What is the main product of photosynthesis?",
+    "Which statement about Python variables is correct?",
+    "Prices tend to rise when demand increases.",
+]
+
+PHRASES_EMBEDDINGS = PROMPTS_GENERATION + TEXTES_TRADUCTION
+
+# Décodage glouton : seule la précision numérique du backend peut changer le résultat
+PARAMETRES_GLOUTONS = {"max_new_tokens": 120, "num_beams": 1, "do_sample": False}
+
+
+def mesurer(fonction, repetitions):
+    """Retourne (résultat du dernier appel, latence médiane en ms)"""
+    durees = []
+    resultat = None
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        resultat = fonction()
+        durees.append((time.perf_counter() - debut) * 1000)
+    return resultat, statistics.median(durees)
+
+
+def generer(tokenizer, modele, textes):
+    sorties = []
+    for texte in textes:
+        inputs = tokenizer(texte, max_length=512, truncation=True, return_tensors="pt")
+        with torch.no_grad():
+            outputs = modele.generate(**inputs, **PARAMETRES_GLOUTONS)
+        sorties.append(tokenizer.decode(outputs[0], skip_special_tokens=True))
+    return sorties
+
+
+def evaluer_backend(backend, repetitions):
+    resultats = {}
+
+    debut = time.perf_counter()
+    tokenizer, modele = charger_seq2seq(HuggingFaceService.MODELE_GENERATION, backend, "cpu")
+    resultats["chargement_generation_s"] = time.perf_counter() - debut
+    resultats["generation"], resultats["latence_generation_ms"] = mesurer(
+        lambda: generer(tokenizer, modele, PROMPTS_GENERATION), repetitions
+    )
+
+    tokenizer, modele = charger_seq2seq(HuggingFaceService.MODELE_TRADUCTION, backend, "cpu")
+    resultats["traduction"], resultats["latence_traduction_ms"] = mesurer(
+        lambda: generer(tokenizer, modele, TEXTES_TRADUCTION), repetitions
+    )
+
+    encodeur = charger_encodeur_phrases("paraphrase-multilingual-MiniLM-L12-v2", backend, "cpu")
+    resultats["embeddings"], resultats["latence_embeddings_ms"] = mesurer(
+        lambda: encodeur.encode(PHRASES_EMBEDDINGS, convert_to_numpy=True, normalize_embeddings=True),
+        repetitions
+    )
+    return resultats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parité et latence des backends d'inférence")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--repetitions", type=int, default=3)
+    parser.add_argument("--seuil-cosinus", type=float, default=0.98,
+                        help="Similarité minimale exigée pour les embeddings")
+    args = parser.parse_args()
+
+    backends = [BACKENDS[0]] + [b for b in args.backends if b != BACKENDS[0]]
+    app = create_app()
+
+    with app.app_context():
+        resultats = {}
+        for backend in backends:
+            print(f"\n⏱️  Backend {backend}...")
+            resultats[backend] = evaluer_backend(backend, args.repetitions)
+
+        reference = resultats[BACKENDS[0]]
+        ecart_excessif = False
+
+        print("\n" + "=" * 96)
+        print(f"{'Backend':<8} {'Chargement':>11} {'Génération':>12} {'Traduction':>12} {'Embeddings':>12} "
+              f"{'Parité gén.':>12} {'Parité trad.':>13} {'Cos. min':>9}")
+        print("=" * 96)
+        for backend in backends:
+            r = resultats[backend]
+            parite_generation = sum(a == b for a, b in zip(r["generation"], reference["generation"]))
+            parite_traduction = sum(a == b for a, b in zip(r["traduction"], reference["traduction"]))
+            cosinus_min = float(np.min(np.sum(r["embeddings"] * reference["embeddings"], axis=1)))
+            ecart_excessif = ecart_excessif or cosinus_min < args.seuil_cosinus
+            print(f"{backend:<8} {r['chargement_generation_s']:>10.1f}s "
+                  f"{r['latence_generation_ms']:>10.0f}ms {r['latence_traduction_ms']:>10.0f}ms "
+                  f"{r['latence_embeddings_ms']:>10.0f}ms "
+                  f"{parite_generation:>8}/{len(PROMPTS_GENERATION):<3} {parite_traduction:>9}/{len(TEXTES_TRADUCTION):<3} "
+                  f"{cosinus_min:>9.4f}")
+
+        for backend in backends[1:]:
+            for i, (texte, texte_ref) in enumerate(zip(resultats[backend]["generation"], reference["generation"])):
+                if texte != texte_ref:
+                    print(f"\n🔎 {backend} / prompt {i + 1}\n  torch : {texte_ref}\n  {backend:<6}: {texte}")
+
+    if ecart_excessif:
+        print(f"\n❌ Similarité des embeddings sous le seuil ({args.seuil_cosinus})")
+        sys.exit(1)
+    print("\n✅ Parité des embeddings respectée")
+
+
+if __name__ == "__main__":
+    main()
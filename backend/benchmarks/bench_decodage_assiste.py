@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+"""
+Compare le décodage actuel des QCM au décodage assisté par un modèle brouillon.
+
+Trois modes sont mesurés sur les mêmes prompts QCM, avec le même modèle de génération :
+- actuel  : profil "qualite" (6 beams, échantillonnage, 500 tokens)
+- glouton : profil "rapide" sans assistant
+- assiste : profil "rapide" avec le modèle brouillon (HF_MODELE_BROUILLON)
+
+Pour chaque mode : tokens générés par seconde et taux de QCM parsés avec succès.
+
+Usage (depuis backend/) :
+    python -m benchmarks.bench_decodage_assiste
+    python -m benchmarks.bench_decodage_assiste --modele google/flan-t5-large --brouillon google/flan-t5-small
+"""
+
+import argparse
+import time
+
+import torch
+
+from app import create_app
+from app.services.hugging_face_service import HuggingFaceService
+from app.services.inference_backends import BACKEND_TORCH, charger_seq2seq
+from app.services.profils_decodage import PROFIL_QUALITE, PROFIL_RAPIDE, parametres_profil
+
+
+CONTEXTES = [
+    ("photosynthesis", "Photosynthesis converts light energy into chemical energy stored in glucose. "
+                       "It takes place in the chloroplasts and releases oxygen as a by-product."),
+    ("variables", "In Python, a variable is created the moment you first assign a value to it. "
+                  "Variables do not need to be declared with any particular type."),
+    ("supply and demand", "When demand increases and supply stays the same, prices tend to rise. "
+                          "When supply increases and demand stays the same, prices tend to fall."),
+    ("TCP", "TCP is a connection-oriented protocol: it establishes a connection with a three-way handshake "
+            "and guarantees ordered, reliable delivery of data."),
+]
+
+
+def generer(tokenizer, modele, prompt, parametres, assistant=None):
+    """Retourne (texte, nombre de tokens générés)"""
+    inputs = tokenizer(prompt, max_length=512, truncation=True, return_tensors="pt")
+    options = {"assistant_model": assistant} if assistant is not None else {}
+    with torch.no_grad():
+        outputs = modele.generate(**inputs, **parametres, **options, pad_token_id=tokenizer.pad_token_id)
+    # Le premier token est le token de départ du décodeur
+    return tokenizer.decode(outputs[0], skip_special_tokens=True), outputs.shape[1] - 1
+
+
+def evaluer_mode(service, tokenizer, modele, prompts, parametres, assistant, repetitions):
+    tokens = 0
+    parses = 0
+    duree = 0.0
+    for _ in range(repetitions):
+        torch.manual_seed(0)
+        for prompt in prompts:
+            debut = time.perf_counter()
+            texte, nombre = generer(tokenizer, modele, prompt, parametres, assistant)
+            duree += time.perf_counter() - debut
+            tokens += nombre
+            parses += service._parser_question_generee(texte) is not None
+    total = len(prompts) * repetitions
+    return {
+        "tokens_par_seconde": tokens / duree if duree else 0.0,
+        "latence_moyenne_ms": duree / total * 1000,
+        "taux_parsing": parses / total
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Décodage actuel vs décodage assisté (modèle brouillon)")
+    parser.add_argument("--modele", default=HuggingFaceService.MODELE_GENERATION)
+    parser.add_argument("--brouillon", default=None, help="Modèle brouillon (défaut: HF_MODELE_BROUILLON)")
+    parser.add_argument("--repetitions", type=int, default=2)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        brouillon = args.brouillon or app.config.get("HF_MODELE_BROUILLON", "google/flan-t5-small")
+        service = HuggingFaceService()
+        prompts = [service._construire_prompt_qcm(contexte, concept, "Moyen") for concept, contexte in CONTEXTES]
+
+        print(f"📥 Chargement de {args.modele} et du brouillon {brouillon} (backend torch, CPU)...")
+        tokenizer, modele = charger_seq2seq(args.modele, BACKEND_TORCH, "cpu")
+        _, assistant = charger_seq2seq(brouillon, BACKEND_TORCH, "cpu")
+
+        modes = {
+            "actuel": (parametres_profil(PROFIL_QUALITE, "qcm"), None),
+            "glouton": (parametres_profil(PROFIL_RAPIDE, "qcm"), None),
+            "assiste": (parametres_profil(PROFIL_RAPIDE, "qcm"), assistant),
+        }
+        resultats = {}
+        for nom, (parametres, modele_assistant) in modes.items():
+            print(f"\n⏱️  Mode {nom}...")
+            resultats[nom] = evaluer_mode(service, tokenizer, modele, prompts, parametres, modele_assistant, args.repetitions)
+
+    print("\n" + "=" * 64)
+    print(f"{'Mode':<10} {'Tokens/s':>10} {'Latence moy.':>14} {'Parsing OK':>12} {'Accélération':>13}")
+    print("=" * 64)
+    reference = resultats["actuel"]["latence_moyenne_ms"]
+    for nom, r in resultats.items():
+        print(f"{nom:<10} {r['tokens_par_seconde']:>10.1f} {r['latence_moyenne_ms']:>12.0f}ms "
+              f"{r['taux_parsing']:>11.0%} {reference / r['latence_moyenne_ms']:>12.2f}x")
+
+
+if __name__ == "__main__":
+    main()
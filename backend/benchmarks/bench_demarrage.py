@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+"""
+Mesure le coût de démarrage de l'application : durée de `create_app()` et RSS,
+avec et sans import de la pile IA (torch, transformers, sentence-transformers).
+
+Chaque mesure tourne dans un processus Python neuf pour ne pas profiter
+des modules déjà importés.
+
+Usage (depuis backend/) :
+    python -m benchmarks.bench_demarrage
+    python -m benchmarks.bench_demarrage --repetitions 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+SCRIPT_MESURE = r"""
+import json, resource, sys, time
+
+def rss_octets():
+    with open("/proc/self/status") as f:
+        for ligne in f:
+            if ligne.startswith("VmRSS:"):
+                return int(ligne.split()[1]) * 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+debut = time.perf_counter()
+from app import create_app
+app = create_app()
+duree_app = time.perf_counter() - debut
+rss_app = rss_octets()
+
+duree_ia = None
+if sys.argv[1] == "avec_ia":
+    from app.services.ia import charger_pile_ia
+    debut_ia = time.perf_counter()
+    charger_pile_ia()
+    duree_ia = time.perf_counter() - debut_ia
+
+print(json.dumps({
+    "duree_create_app": duree_app,
+    "rss_create_app": rss_app,
+    "duree_import_ia": duree_ia,
+    "rss_final": rss_octets(),
+    "torch_importe_par_create_app": sys.argv[1] == "sans_ia" and "torch" in sys.modules
+}))
+"""
+
+MO = 1024 * 1024
+
+
+def mesurer(mode):
+    dossier_backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    resultat = subprocess.run(
+        [sys.executable, "-c", SCRIPT_MESURE, mode],
+        cwd=dossier_backend,
+        capture_output=True,
+        text=True
+    )
+    if resultat.returncode != 0:
+        print(resultat.stderr, file=sys.stderr)
+        raise SystemExit(f"❌ Échec de la mesure '{mode}'")
+    return json.loads(resultat.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Durée de démarrage et mémoire de create_app()")
+    parser.add_argument("--repetitions", type=int, default=3)
+    parser.add_argument("--sans-ia-seulement", action="store_true",
+                        help="Ne pas mesurer l'import de la pile IA (torch absent du nœud)")
+    args = parser.parse_args()
+
+    modes = ["sans_ia"] if args.sans_ia_seulement else ["sans_ia", "avec_ia"]
+    mesures = {mode: [mesurer(mode) for _ in range(args.repetitions)] for mode in modes}
+
+    print("=" * 72)
+    print(f"{'Mode':<10} {'create_app()':>14} {'RSS app':>10} {'Import IA':>11} {'RSS final':>11}")
+    print("=" * 72)
+    for mode, series in mesures.items():
+        duree_app = statistics.median(m["duree_create_app"] for m in series)
+        rss_app = statistics.median(m["rss_create_app"] for m in series) / MO
+        rss_final = statistics.median(m["rss_final"] for m in series) / MO
+        durees_ia = [m["duree_import_ia"] for m in series if m["duree_import_ia"] is not None]
+        import_ia = f"{statistics.median(durees_ia):>10.2f}s" if durees_ia else f"{'-':>11}"
+        print(f"{mode:<10} {duree_app:>13.2f}s {rss_app:>8.0f}Mo {import_ia} {rss_final:>9.0f}Mo")
+
+    if any(m["torch_importe_par_create_app"] for m in mesures["sans_ia"]):
+        print("\n❌ create_app() importe torch : la pile IA n'est plus chargée à la demande")
+        sys.exit(1)
+    print("\n✅ create_app() n'importe pas la pile IA")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+"""
+Mesure le serveur de production (gunicorn.conf.py + wsgi.py) sur les endpoints d'examen :
+mémoire par worker (RSS et PSS, qui compte les pages partagées au prorata) et
+requêtes par seconde.
+
+Un serveur Gunicorn est démarré pour chaque configuration demandée, puis des
+clients concurrents interrogent les endpoints étudiant avec un token JWT forgé
+pour `--etudiant-id` (un utilisateur étudiant existant en base).
+
+Usage (depuis backend/, base de données configurée) :
+    python -m benchmarks.bench_serveur --etudiant-id 12 --qcm-id 3
+    python -m benchmarks.bench_serveur --etudiant-id 12 --workers 2 4 --precharger generation,similarite
+"""
+
+import argparse
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+from app import create_app
+
+
+MO = 1024 * 1024
+
+
+def endpoints_examen(qcm_id):
+    endpoints = ["/api/qcm/etudiant/qcms", "/api/qcm/etudiant/resultats", "/api/qcm/etudiant/profil"]
+    if qcm_id:
+        endpoints.append(f"/api/qcm/{qcm_id}/questions")
+    return endpoints
+
+
+def forger_token(etudiant_id):
+    from flask_jwt_extended import create_access_token
+    app = create_app()
+    with app.app_context():
+        return create_access_token(identity=str(etudiant_id))
+
+
+def port_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def attendre_serveur(port, delai=600):
+    fin = time.monotonic() + delai
+    while time.monotonic() < fin:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.5)
+    raise SystemExit("❌ Le serveur n'a pas démarré à temps")
+
+
+def lire_memoire(pid):
+    """(RSS, PSS) en octets d'un processus"""
+    rss = pss = 0
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for ligne in f:
+                if ligne.startswith("Rss:"):
+                    rss = int(ligne.split()[1]) * 1024
+                elif ligne.startswith("Pss:"):
+                    pss = int(ligne.split()[1]) * 1024
+    except OSError:
+        pass
+    return rss, pss
+
+
+def pids_workers(pid_master):
+    enfants = []
+    for nom in os.listdir("/proc"):
+        if not nom.isdigit():
+            continue
+        try:
+            with open(f"/proc/{nom}/stat") as f:
+                # Le nom du processus peut contenir des espaces : le ppid suit la dernière parenthèse
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        if ppid == pid_master:
+            enfants.append(int(nom))
+    return enfants
+
+
+def charger(port, token, endpoints, concurrence, duree):
+    """Interroge les endpoints en boucle pendant `duree` secondes ; retourne (latences, erreurs)"""
+    latences, erreurs = [], [0]
+    verrou = threading.Lock()
+    fin = time.monotonic() + duree
+
+    def client(rang):
+        session = requests.Session()
+        session.headers["Authorization"] = f"Bearer {token}"
+        i = rang
+        while time.monotonic() < fin:
+            url = f"http://127.0.0.1:{port}{endpoints[i % len(endpoints)]}"
+            i += 1
+            debut = time.perf_counter()
+            try:
+                ok = session.get(url, timeout=30).status_code < 500
+            except requests.RequestException:
+                ok = False
+            duree_ms = (time.perf_counter() - debut) * 1000
+            with verrou:
+                if ok:
+                    latences.append(duree_ms)
+                else:
+                    erreurs[0] += 1
+
+    clients = [threading.Thread(target=client, args=(rang,)) for rang in range(concurrence)]
+    for c in clients:
+        c.start()
+    for c in clients:
+        c.join()
+    return latences, erreurs[0]
+
+
+def mesurer_configuration(workers, precharger, token, endpoints, args):
+    port = port_libre()
+    env = dict(os.environ, PORT=str(port), GUNICORN_WORKERS=str(workers), PRECHARGER_MODELES=precharger)
+    serveur = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--access-logfile", "", "wsgi:app"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        attendre_serveur(port)
+        # Échauffement : chaque worker importe ce qui lui manque
+        charger(port, token, endpoints, args.concurrence, 2)
+
+        latences, erreurs = charger(port, token, endpoints, args.concurrence, args.duree)
+        memoires = [lire_memoire(pid) for pid in pids_workers(serveur.pid)]
+        rss_master, pss_master = lire_memoire(serveur.pid)
+    finally:
+        serveur.send_signal(signal.SIGTERM)
+        serveur.wait(timeout=60)
+
+    return {
+        "workers": workers,
+        "precharger": precharger or "-",
+        "rss_master": rss_master,
+        "rss_worker": statistics.mean(m[0] for m in memoires) if memoires else 0,
+        "pss_worker": statistics.mean(m[1] for m in memoires) if memoires else 0,
+        "pss_total": pss_master + sum(m[1] for m in memoires),
+        "rps": len(latences) / args.duree,
+        "p50": statistics.median(latences) if latences else 0,
+        "p95": statistics.quantiles(latences, n=20)[18] if len(latences) >= 20 else 0,
+        "erreurs": erreurs
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mémoire par worker et débit du serveur de production")
+    parser.add_argument("--etudiant-id", type=int, required=True, help="ID utilisateur d'un étudiant existant")
+    parser.add_argument("--qcm-id", type=int, help="QCM dont on interroge les questions")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--precharger", default="",
+                        help="Modèles préchargés dans le master (ex: generation,traduction,similarite)")
+    parser.add_argument("--concurrence", type=int, default=16)
+    parser.add_argument("--duree", type=float, default=15.0)
+    args = parser.parse_args()
+
+    token = forger_token(args.etudiant_id)
+    endpoints = endpoints_examen(args.qcm_id)
+    configurations = [(w, "") for w in args.workers]
+    if args.precharger:
+        configurations += [(w, args.precharger) for w in args.workers]
+
+    resultats = []
+    for workers, precharger in configurations:
+        print(f"⏱️  {workers} worker(s), préchargement: {precharger or 'aucun'}...")
+        resultats.append(mesurer_configuration(workers, precharger, token, endpoints, args))
+
+    print("\n" + "=" * 100)
+    print(f"{'Workers':>7} {'Préchargement':<28} {'RSS master':>10} {'RSS/worker':>10} {'PSS/worker':>10} "
+          f"{'PSS total':>10} {'req/s':>8} {'p50':>7} {'p95':>7} {'Err':>4}")
+    print("=" * 100)
+    for r in resultats:
+        print(f"{r['workers']:>7} {r['precharger']:<28} {r['rss_master'] / MO:>8.0f}Mo {r['rss_worker'] / MO:>8.0f}Mo "
+              f"{r['pss_worker'] / MO:>8.0f}Mo {r['pss_total'] / MO:>8.0f}Mo {r['rps']:>8.1f} "
+              f"{r['p50']:>5.0f}ms {r['p95']:>5.0f}ms {r['erreurs']:>4}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+"""
+Vérifie le nombre de requêtes SQL des routes les plus appelées : chacune a un budget
+fixe, qui ne doit pas grandir avec le nombre d'étudiants ou de QCM (pas de N+1).
+
+Les routes sont appelées avec le client de test Flask sur une base SQLite temporaire,
+peuplée de --etudiants étudiants et --qcms QCM, à l'intérieur de budget_requetes()
+(voir app/utils/instrumentation_sql.py). Les comptes ne dépendent pas du SGBD.
+
+Usage (depuis backend/) :
+    python -m benchmarks.verifier_budgets_requetes
+    python -m benchmarks.verifier_budgets_requetes --etudiants 200 --qcms 50
+
+Code de sortie 1 si une route dépasse son budget.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+# Base temporaire : à définir avant l'import de config
+_fichier_base = os.path.join(tempfile.mkdtemp(prefix="budgets_sql_"), "budgets.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_fichier_base}"
+os.environ.setdefault("SECRET_KEY", "verification-des-budgets-de-requetes-sql")
+os.environ.setdefault("JWT_SECRET_KEY", "verification-des-budgets-de-requetes-sql")
+
+from flask_jwt_extended import create_access_token  # noqa: E402
+
+from app import create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.models.matiere import Matiere, MatiereEnseignantNiveauParcours  # noqa: E402
+from app.models.niveau_parcours import Mention, Niveau, Parcours  # noqa: E402
+from app.models.qcm import QCM, Question  # noqa: E402
+from app.models.reponse_composee import ReponseComposee  # noqa: E402
+from app.models.resultat import Resultat  # noqa: E402
+from app.models.user import Enseignant, Etudiant, Utilisateur  # noqa: E402
+from app.services.classement_qcm import calculer_statistiques_qcm  # noqa: E402
+from app.utils.instrumentation_sql import BudgetRequetesDepasse, budget_requetes  # noqa: E402
+
+
+ANNEE = "2024-2025"
+QUESTIONS_PAR_QCM = 5
+MATIERES = 3
+
+# (méthode, route, jeton, budget de requêtes, budget de répétitions d'une même requête)
+ROUTES = [
+    ("GET", "/api/qcm/enseignant/qcms", None, 3, 1),
+    ("GET", "/api/qcm/etudiant/qcms", "etudiant", 4, 1),
+    ("GET", "/api/qcm/etudiant/resultats", "etudiant", 4, 1),
+    ("GET", "/api/qcm/etudiant/profil", "etudiant", 3, 1),
+    ("GET", "/api/admin/enseignant/etudiants", "enseignant", 4 + 3 * MATIERES, MATIERES),
+    ("GET", "/api/qcm/enseignant/qcm/{qcm_id}/etudiants-composes", "enseignant", 5, 1),
+    ("GET", "/api/qcm/enseignant/qcm/{qcm_id}/distribution", "enseignant", 4, 1),
+]
+
+
+def peupler(nombre_etudiants, nombre_qcms):
+    """Une promotion (niveau, parcours, mention), un enseignant et ses matières, des QCM corrigés"""
+    mention = Mention(nom="Budget mention", code="BM")
+    niveau = Niveau(nom="Budget niveau", code="BN")
+    parcours = Parcours(nom="Budget parcours", code="BP", mention=mention)
+    matieres = [Matiere(nom=f"Budget matière {i}", code=f"BM{i}") for i in range(MATIERES)]
+    db.session.add_all([mention, niveau, parcours, *matieres])
+
+    utilisateur_enseignant = Utilisateur(username="budget_ens", email="budget_ens@budget.test", password="x", role="enseignant")
+    enseignant = Enseignant(utilisateur=utilisateur_enseignant)
+    db.session.add(enseignant)
+    for matiere in matieres:
+        db.session.add(MatiereEnseignantNiveauParcours(
+            matiere=matiere, enseignant=enseignant, niveau=niveau, parcours=parcours, est_actif=True
+        ))
+
+    etudiants = []
+    for i in range(nombre_etudiants):
+        utilisateur = Utilisateur(username=f"budget_etu_{i}", email=f"budget_etu_{i}@budget.test", password="x", role="etudiant")
+        etudiants.append(Etudiant(
+            utilisateur=utilisateur, matriculeId=f"BUDGET{i}", est_actif=True, annee_universitaire=ANNEE,
+            niveau_obj=niveau, parcours_obj=parcours, mention_obj=mention
+        ))
+    db.session.add_all(etudiants)
+
+    qcms = [
+        QCM(titre=f"Budget QCM {i}", est_publie=True, matiere=matieres[i % MATIERES])
+        for i in range(nombre_qcms)
+    ]
+    db.session.add_all(qcms)
+    for qcm in qcms:
+        db.session.add_all([
+            Question(qcm=qcm, question=f"Question {k}", reponse1="a", reponse2="b", reponse3="c", reponse4="d", bonne_reponse=1)
+            for k in range(QUESTIONS_PAR_QCM)
+        ])
+    db.session.flush()
+
+    # Chaque étudiant a passé tous les QCM sauf le dernier, qu'il a soumis sans correction
+    for etudiant in etudiants:
+        for j, qcm in enumerate(qcms):
+            corrige = j < len(qcms) - 1
+            db.session.add(ReponseComposee(
+                contenu="{}", etudiant_id=etudiant.id, qcm_id=qcm.id, statut="corrigé" if corrige else "soumis"
+            ))
+            if corrige:
+                db.session.add(Resultat(note=(etudiant.id * 7 + qcm.id) % 21, etudiant_id=etudiant.id, qcm_id=qcm.id))
+    db.session.flush()
+    # Distributions calculées comme à la fin de corriger_qcm
+    for qcm in qcms[:-1]:
+        calculer_statistiques_qcm(qcm.id)
+    db.session.commit()
+
+    return {
+        "etudiant": create_access_token(identity=str(etudiants[0].utilisateur_id)),
+        "enseignant": create_access_token(identity=str(utilisateur_enseignant.id)),
+        "qcm_id": qcms[0].id,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Budgets de requêtes SQL des routes fréquentes")
+    parser.add_argument("--etudiants", type=int, default=100)
+    parser.add_argument("--qcms", type=int, default=20)
+    args = parser.parse_args()
+    if args.etudiants < 1 or args.qcms < 2:
+        parser.error("il faut au moins 1 étudiant et 2 QCM")
+
+    app = create_app()
+    echecs = 0
+    with app.app_context():
+        db.create_all()
+        print(f"🌱 Génération : {args.etudiants} étudiants, {args.qcms} QCM, "
+              f"{args.etudiants * (args.qcms - 1)} résultats...")
+        contexte = peupler(args.etudiants, args.qcms)
+        db.session.remove()
+
+    client = app.test_client()
+    print(f"\n{'Route':<58} {'Requêtes':>9} {'Budget':>7}  Verdict")
+    for methode, route, jeton, max_requetes, max_repetitions in ROUTES:
+        url = route.format(qcm_id=contexte["qcm_id"])
+        entetes = {"Authorization": f"Bearer {contexte[jeton]}"} if jeton else {}
+        suivi = None
+        try:
+            with budget_requetes(max_requetes, max_repetitions, nom=f"{methode} {route}") as suivi:
+                reponse = client.open(url, method=methode, headers=entetes)
+            if reponse.status_code >= 400:
+                raise BudgetRequetesDepasse(f"{methode} {route}: statut HTTP {reponse.status_code}")
+            verdict = "✅"
+        except BudgetRequetesDepasse as e:
+            echecs += 1
+            verdict = f"❌ {e}"
+        print(f"{methode + ' ' + route:<58} {suivi.nombre if suivi else '?':>9} {max_requetes:>7}  {verdict}")
+
+    os.remove(_fichier_base)
+    if echecs:
+        print(f"\n❌ {echecs} route(s) hors budget : requêtes exécutées par élément de la liste (N+1) ?")
+        sys.exit(1)
+    print("\n✅ Toutes les routes respectent leur budget de requêtes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+"""
+Vérifie le client de l'API Inference (app/services/inference_api_client.py) contre un
+serveur HTTP local qui imite l'API Hugging Face : aucun appel réseau, aucun jeton.
+
+Le serveur répond selon le nom du modèle appelé (/models/<nom>) :
+- 503 avec estimated_time (cold start), 429 (quota), 404 (modèle absent), 500 (erreur)
+- 200 avec generated_text, après une courte attente pour mesurer la concurrence
+
+Cas vérifiés :
+- 503 : modèle suivant utilisé, disjoncteur ouvert pour la durée estimated_time
+- 429 et 404 : disjoncteur ouvert (DUREE_429, DUREE_404), modèle plus rappelé ensuite
+- erreurs répétées : ouverture après ECHECS_AVANT_OUVERTURE, puis refermeture au premier succès
+- generer_lot : jamais plus de HF_API_MAX_CONCURRENCE requêtes simultanées
+
+Usage (depuis backend/) :
+    python -m benchmarks.verifier_client_api_inference
+    python -m benchmarks.verifier_client_api_inference --concurrence 3 --prompts 12
+
+Code de sortie 1 si un cas échoue.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Base temporaire : à définir avant l'import de config
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='client_api_'), 'client.db')}"
+os.environ.setdefault("SECRET_KEY", "verification-du-client-api-inference")
+os.environ.setdefault("JWT_SECRET_KEY", "verification-du-client-api-inference")
+
+from app import create_app  # noqa: E402
+from app.services import inference_api_client  # noqa: E402
+from app.services.inference_api_client import Disjoncteur, InferenceAPIClient, obtenir_disjoncteur  # noqa: E402
+
+
+ATTENTE_ESTIMEE = 20
+DELAI_REPONSE = 0.15
+PARAMETRES = {"max_new_tokens": 32}
+
+
+class ServeurFactice:
+    """API Inference factice : statut HTTP choisi par modèle, appels et concurrence comptés"""
+
+    def __init__(self):
+        self.statuts = {}
+        self.appels = {}
+        self.en_cours = 0
+        self.max_en_cours = 0
+        self._verrou = threading.Lock()
+        serveur = self
+
+        class Gestionnaire(BaseHTTPRequestHandler):
+            def do_POST(self):
+                nom = self.path.rsplit("/", 1)[-1]
+                longueur = int(self.headers.get("Content-Length", 0))
+                corps = json.loads(self.rfile.read(longueur) or b"{}")
+                with serveur._verrou:
+                    serveur.appels[nom] = serveur.appels.get(nom, 0) + 1
+                    serveur.en_cours += 1
+                    serveur.max_en_cours = max(serveur.max_en_cours, serveur.en_cours)
+                try:
+                    statut = serveur.statuts.get(nom, 200)
+                    if statut == 200:
+                        time.sleep(DELAI_REPONSE)
+                        reponse = [{"generated_text": f"{nom}: {corps.get('inputs', '')}"}]
+                    elif statut == 503:
+                        reponse = {"error": f"Model {nom} is currently loading", "estimated_time": ATTENTE_ESTIMEE}
+                    else:
+                        reponse = {"error": f"erreur {statut}"}
+                    contenu = json.dumps(reponse).encode("utf-8")
+                    self.send_response(statut)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(contenu)))
+                    self.end_headers()
+                    self.wfile.write(contenu)
+                finally:
+                    with serveur._verrou:
+                        serveur.en_cours -= 1
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Gestionnaire)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/models"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def arreter(self):
+        self.httpd.shutdown()
+
+
+def ouvert_pour(disjoncteur):
+    """Secondes restantes avant que le disjoncteur se referme"""
+    return disjoncteur.ouvert_jusqu_a - time.monotonic()
+
+
+def verifier_503(serveur):
+    serveur.statuts["froid"] = 503
+    client = InferenceAPIClient("jeton", ["froid", "chaud"])
+    premier = client.generer("Bonjour", PARAMETRES)
+    restant = ouvert_pour(obtenir_disjoncteur("froid"))
+    second = client.generer("Bonjour", PARAMETRES)
+    assert premier and premier[0] == 1, f"le modèle suivant aurait dû répondre : {premier}"
+    assert ATTENTE_ESTIMEE - 2 < restant <= ATTENTE_ESTIMEE, f"disjoncteur ouvert {restant:.1f} s au lieu de {ATTENTE_ESTIMEE} s"
+    assert second and second[0] == 1 and serveur.appels["froid"] == 1, "le modèle en cold start a été rappelé"
+    return f"ouvert {restant:.0f} s, modèle suivant utilisé, pas de second appel"
+
+
+def verifier_statut(serveur, nom, statut, duree):
+    serveur.statuts[nom] = statut
+    client = InferenceAPIClient("jeton", [nom])
+    premier = client.generer("Bonjour", PARAMETRES)
+    restant = ouvert_pour(obtenir_disjoncteur(nom))
+    second = client.generer("Bonjour", PARAMETRES)
+    assert premier is None and second is None, "aucun modèle n'aurait dû répondre"
+    assert duree - 2 < restant <= duree, f"disjoncteur ouvert {restant:.1f} s au lieu de {duree} s"
+    assert serveur.appels[nom] == 1, f"{serveur.appels[nom]} appels au lieu d'un seul"
+    return f"ouvert {restant:.0f} s, un seul appel"
+
+
+def verifier_ouverture_et_reinitialisation(serveur):
+    serveur.statuts["instable"] = 500
+    client = InferenceAPIClient("jeton", ["instable"])
+    disjoncteur = obtenir_disjoncteur("instable")
+
+    client.generer("Bonjour", PARAMETRES)
+    assert disjoncteur.disponible(), "ouvert dès la première erreur"
+    client.generer("Bonjour", PARAMETRES)
+    assert not disjoncteur.disponible(), f"fermé après {Disjoncteur.ECHECS_AVANT_OUVERTURE} erreurs"
+    client.generer("Bonjour", PARAMETRES)
+    assert serveur.appels["instable"] == Disjoncteur.ECHECS_AVANT_OUVERTURE, "modèle appelé malgré le disjoncteur ouvert"
+
+    # Fenêtre écoulée et modèle rétabli : le premier succès referme et remet les échecs à zéro
+    disjoncteur.ouvert_jusqu_a = time.monotonic() - 1
+    serveur.statuts["instable"] = 200
+    resultat = client.generer("Bonjour", PARAMETRES)
+    assert resultat and resultat[0] == 0, "le modèle rétabli n'a pas répondu"
+    assert disjoncteur.echecs_consecutifs == 0 and disjoncteur.disponible(), "disjoncteur non réinitialisé"
+    return f"ouvert après {Disjoncteur.ECHECS_AVANT_OUVERTURE} erreurs, refermé au premier succès"
+
+
+def verifier_concurrence(serveur, concurrence, nombre_prompts):
+    serveur.max_en_cours = 0
+    client = InferenceAPIClient("jeton", ["parallele"])
+    debut = time.perf_counter()
+    resultats = client.generer_lot([(f"Prompt {i}", 0, 0) for i in range(nombre_prompts)], PARAMETRES)
+    duree = time.perf_counter() - debut
+    assert all(r and r[1] == f"parallele: Prompt {i}" for i, r in enumerate(resultats)), "réponses manquantes ou mélangées"
+    assert serveur.max_en_cours <= concurrence, f"{serveur.max_en_cours} requêtes simultanées pour une limite de {concurrence}"
+    assert serveur.max_en_cours == min(concurrence, nombre_prompts), f"seulement {serveur.max_en_cours} requêtes simultanées"
+    return f"{serveur.max_en_cours} requêtes simultanées au plus, {nombre_prompts} prompts en {duree:.2f} s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Client de l'API Inference contre un serveur factice")
+    parser.add_argument("--concurrence", type=int, default=3, help="HF_API_MAX_CONCURRENCE")
+    parser.add_argument("--prompts", type=int, default=10)
+    args = parser.parse_args()
+    if args.concurrence < 1 or args.prompts < 1:
+        parser.error("--concurrence et --prompts doivent être positifs")
+
+    serveur = ServeurFactice()
+    app = create_app()
+    app.config.update(HF_INFERENCE_API_URL=serveur.url, HF_API_TIMEOUT=5, HF_API_MAX_CONCURRENCE=args.concurrence)
+
+    cas = [
+        ("503 + estimated_time", lambda: verifier_503(serveur)),
+        ("429", lambda: verifier_statut(serveur, "quota", 429, Disjoncteur.DUREE_429)),
+        ("404", lambda: verifier_statut(serveur, "absent", 404, Disjoncteur.DUREE_404)),
+        ("Ouverture / réinitialisation", lambda: verifier_ouverture_et_reinitialisation(serveur)),
+        ("Concurrence", lambda: verifier_concurrence(serveur, args.concurrence, args.prompts)),
+    ]
+
+    echecs = 0
+    with app.app_context():
+        # Disjoncteurs et session partagés par le processus : repartir d'un état vierge
+        inference_api_client._disjoncteurs.clear()
+        inference_api_client._session = None
+        for nom, verification in cas:
+            try:
+                print(f"✅ {nom:<30} {verification()}")
+            except AssertionError as e:
+                echecs += 1
+                print(f"❌ {nom:<30} {e}")
+
+    serveur.arreter()
+    if echecs:
+        print(f"\n❌ {echecs} cas en échec")
+        sys.exit(1)
+    print("\n✅ Client de l'API Inference conforme")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+#!/usr/bin/env python
+"""
+Vérifie les plans d'exécution PostgreSQL des recherches fréquentes : une fois la base
+peuplée à l'échelle, aucune ne doit parcourir séquentiellement (Seq Scan) une grosse table.
+
+Les données (étudiants, QCM, soumissions, résultats, assignations) sont générées par
+generate_series dans une transaction annulée à la fin : la base n'est pas modifiée.
+Chaque requête est passée à EXPLAIN (FORMAT JSON) après ANALYZE.
+
+Usage (depuis backend/, DATABASE_URL vers une base PostgreSQL à jour : flask db upgrade) :
+    python -m benchmarks.verifier_plans_requetes
+    python -m benchmarks.verifier_plans_requetes --etudiants 50000 --qcms 10000
+
+Code de sortie 1 si un plan contient un parcours séquentiel d'une table surveillée.
+"""
+
+import argparse
+import sys
+
+from sqlalchemy import and_, or_, select, text
+from sqlalchemy.dialects import postgresql
+
+from app import create_app
+from app.extensions import db
+from app.models.matiere import MatiereEnseignantNiveauParcours
+from app.models.qcm import QCM
+from app.models.reponse_composee import ReponseComposee
+from app.models.resultat import Resultat
+from app.models.resume_notes import ResumeNotes
+from app.models.user import Etudiant
+
+
+# QCM passés par étudiant (un résultat et une soumission chacun, la dernière reste à corriger)
+QCM_PAR_ETUDIANT = 10
+MATIERES_PAR_ENSEIGNANT = 5
+
+PEUPLEMENT = [
+    # Niveaux et parcours
+    """
+    INSERT INTO niveaux (nom, code, ordre, est_actif)
+    SELECT 'Plan niveau ' || s, 'PN' || s, s, true FROM generate_series(1, 5) s
+    """,
+    """
+    INSERT INTO parcours (nom, code, est_actif)
+    SELECT 'Plan parcours ' || s, 'PP' || s, true FROM generate_series(1, 10) s
+    """,
+    # Étudiants : 4 années universitaires, 90 % actifs
+    """
+    INSERT INTO utilisateur (username, email, password, role)
+    SELECT 'plan_etu_' || s, 'plan_etu_' || s || '@plan.test', 'x', 'etudiant'
+    FROM generate_series(1, :etudiants) s
+    """,
+    """
+    INSERT INTO etudiant (utilisateur_id, "matriculeId", est_actif, annee_universitaire, niveau_id, parcours_id)
+    SELECT u.id, 'PLAN' || u.id, u.id % 10 <> 0, (2021 + u.id % 4) || '-' || (2022 + u.id % 4),
+           (SELECT id FROM niveaux WHERE code = 'PN' || (u.id % 5 + 1)),
+           (SELECT id FROM parcours WHERE code = 'PP' || (u.id % 10 + 1))
+    FROM utilisateur u WHERE u.username LIKE 'plan_etu_%'
+    """,
+    # Enseignants et matières
+    """
+    INSERT INTO utilisateur (username, email, password, role)
+    SELECT 'plan_ens_' || s, 'plan_ens_' || s || '@plan.test', 'x', 'enseignant'
+    FROM generate_series(1, :enseignants) s
+    """,
+    """
+    INSERT INTO enseignant (utilisateur_id)
+    SELECT id FROM utilisateur WHERE username LIKE 'plan_ens_%'
+    """,
+    """
+    INSERT INTO matieres (nom, code, credits, est_actif)
+    SELECT 'Plan matière ' || s, 'PM' || s, 3, true FROM generate_series(1, :matieres) s
+    """,
+    """
+    CREATE TEMP TABLE plan_etudiants ON COMMIT DROP AS
+    SELECT e.id, row_number() OVER (ORDER BY e.id) AS n
+    FROM etudiant e WHERE e."matriculeId" LIKE 'PLAN%'
+    """,
+    """
+    CREATE TEMP TABLE plan_enseignants ON COMMIT DROP AS
+    SELECT e.id, row_number() OVER (ORDER BY e.id) AS n
+    FROM enseignant e JOIN utilisateur u ON u.id = e.utilisateur_id WHERE u.username LIKE 'plan_ens_%'
+    """,
+    """
+    CREATE TEMP TABLE plan_matieres ON COMMIT DROP AS
+    SELECT id, row_number() OVER (ORDER BY id) AS n FROM matieres WHERE code LIKE 'PM%'
+    """,
+    """
+    INSERT INTO matiere_enseignant_niveau_parcours (matiere_id, enseignant_id, est_actif)
+    SELECT m.id, e.id, k <> 0
+    FROM plan_enseignants e CROSS JOIN generate_series(0, :matieres_par_enseignant - 1) k
+    JOIN plan_matieres m ON m.n = (e.n + k) % :matieres + 1
+    """,
+    # QCM : 5 % publiés, dont la plupart ciblés par niveau / parcours
+    """
+    INSERT INTO qcms (titre, type_exercice, difficulte, est_publie, est_cible, niveau_id, parcours_id, matiere_id)
+    SELECT 'Plan QCM ' || s, 'QCM', 'MOYEN', s % 20 = 0, s % 3 <> 0,
+           (SELECT id FROM niveaux WHERE code = 'PN' || (s % 5 + 1)),
+           (SELECT id FROM parcours WHERE code = 'PP' || (s % 10 + 1)),
+           (SELECT id FROM plan_matieres WHERE n = s % :matieres + 1)
+    FROM generate_series(1, :qcms) s
+    """,
+    """
+    CREATE TEMP TABLE plan_qcms ON COMMIT DROP AS
+    SELECT id, row_number() OVER (ORDER BY id) AS n FROM qcms WHERE titre LIKE 'Plan QCM %'
+    """,
+    # Soumissions et résultats : les QCM d'un étudiant sont espacés de :qcms / QCM_PAR_ETUDIANT, donc distincts
+    """
+    CREATE TEMP TABLE plan_passages ON COMMIT DROP AS
+    SELECT e.id AS etudiant_id, q.id AS qcm_id, k
+    FROM plan_etudiants e CROSS JOIN generate_series(0, :qcm_par_etudiant - 1) k
+    JOIN plan_qcms q ON q.n = (e.n * 7 + k * (:qcms / :qcm_par_etudiant)) % :qcms + 1
+    """,
+    """
+    INSERT INTO reponses_composees (contenu, date_soumission, temps_execution, est_correcte, statut, etudiant_id, qcm_id)
+    SELECT '{}', now(), 600, false, CASE WHEN k = :qcm_par_etudiant - 1 THEN 'soumis' ELSE 'corrigé' END, etudiant_id, qcm_id
+    FROM plan_passages
+    """,
+    """
+    INSERT INTO resultats (note, date_correction, nombre_correctes, nombre_incorrectes, pourcentage, etudiant_id, qcm_id)
+    SELECT (etudiant_id * 13 + qcm_id) % 21, now(), 0, 0, 0, etudiant_id, qcm_id
+    FROM plan_passages WHERE k < :qcm_par_etudiant - 1
+    """,
+    """
+    INSERT INTO resumes_notes (etudiant_id, matiere_id, nombre, somme, moyenne, derniere_date, date_maj)
+    SELECT r.etudiant_id, q.matiere_id, COUNT(r.id), SUM(r.note), AVG(r.note), MAX(r.date_correction), now()
+    FROM resultats r JOIN qcms q ON q.id = r.qcm_id JOIN plan_etudiants e ON e.id = r.etudiant_id
+    GROUP BY r.etudiant_id, q.matiere_id
+    """
+]
+
+TABLES_ANALYSEES = [
+    "utilisateur", "etudiant", "enseignant", "matieres", "matiere_enseignant_niveau_parcours",
+    "qcms", "reponses_composees", "resultats", "resumes_notes"
+]
+
+# Tables qu'aucune recherche fréquente ne doit parcourir entièrement
+TABLES_SURVEILLEES = {
+    "etudiant", "matiere_enseignant_niveau_parcours", "qcms", "reponses_composees", "resultats", "resumes_notes"
+}
+
+
+def requetes_frequentes(exemple):
+    """Requêtes des routes les plus appelées, avec des valeurs tirées des données générées"""
+    return {
+        "Notes d'un QCM (distribution, statistiques)":
+            select(Resultat.note).where(Resultat.qcm_id == exemple.qcm_id),
+        "Résultat d'un étudiant sur un QCM (soumission, classement)":
+            select(Resultat.id).where(Resultat.etudiant_id == exemple.etudiant_id, Resultat.qcm_id == exemple.qcm_id),
+        "QCM déjà passés par un étudiant":
+            select(Resultat.qcm_id).where(Resultat.etudiant_id == exemple.etudiant_id),
+        "Soumissions à corriger d'un QCM":
+            select(ReponseComposee.id).where(ReponseComposee.qcm_id == exemple.qcm_id, ReponseComposee.statut == 'soumis'),
+        "Soumission existante d'un étudiant":
+            select(ReponseComposee.id).where(
+                ReponseComposee.etudiant_id == exemple.etudiant_id, ReponseComposee.qcm_id == exemple.qcm_id
+            ),
+        "Étudiants d'une promotion (niveau, parcours)":
+            select(Etudiant.id).where(
+                Etudiant.annee_universitaire == exemple.annee_universitaire,
+                Etudiant.est_actif == True,
+                Etudiant.niveau_id == exemple.niveau_id,
+                Etudiant.parcours_id == exemple.parcours_id
+            ),
+        "QCM disponibles pour un étudiant":
+            select(QCM.id).where(
+                QCM.est_publie == True,
+                or_(
+                    QCM.est_cible == False,
+                    and_(QCM.est_cible == True, QCM.niveau_id == exemple.niveau_id, QCM.parcours_id == exemple.parcours_id)
+                )
+            ),
+        "Assignations actives d'un enseignant":
+            select(MatiereEnseignantNiveauParcours.id).where(
+                MatiereEnseignantNiveauParcours.enseignant_id == exemple.enseignant_id,
+                MatiereEnseignantNiveauParcours.est_actif == True
+            ),
+        "Résumés des notes d'un étudiant":
+            select(ResumeNotes.moyenne).where(ResumeNotes.etudiant_id == exemple.etudiant_id),
+    }
+
+
+def parcours_sequentiels(noeud):
+    """Tables surveillées parcourues séquentiellement dans un nœud de plan (et ses enfants)"""
+    tables = []
+    if noeud.get("Node Type") == "Seq Scan" and noeud.get("Relation Name") in TABLES_SURVEILLEES:
+        tables.append(noeud["Relation Name"])
+    for enfant in noeud.get("Plans", []):
+        tables.extend(parcours_sequentiels(enfant))
+    return tables
+
+
+def expliquer(connexion, requete):
+    sql = requete.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    plan = connexion.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    return plan[0]["Plan"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plans d'exécution des requêtes fréquentes (PostgreSQL)")
+    parser.add_argument("--etudiants", type=int, default=20000)
+    parser.add_argument("--qcms", type=int, default=5000)
+    parser.add_argument("--enseignants", type=int, default=2000)
+    parser.add_argument("--matieres", type=int, default=200)
+    args = parser.parse_args()
+    if args.qcms < QCM_PAR_ETUDIANT:
+        parser.error(f"--qcms doit valoir au moins {QCM_PAR_ETUDIANT}")
+
+    app = create_app()
+    echecs = 0
+    with app.app_context():
+        if db.engine.dialect.name != "postgresql":
+            sys.exit(f"❌ DATABASE_URL doit désigner une base PostgreSQL (dialecte actuel : {db.engine.dialect.name})")
+
+        with db.engine.connect() as connexion:
+            transaction = connexion.begin()
+            try:
+                parametres = {
+                    "etudiants": args.etudiants,
+                    "qcms": args.qcms,
+                    "enseignants": args.enseignants,
+                    "matieres": args.matieres,
+                    "qcm_par_etudiant": QCM_PAR_ETUDIANT,
+                    "matieres_par_enseignant": MATIERES_PAR_ENSEIGNANT
+                }
+                print(f"🌱 Génération : {args.etudiants} étudiants, {args.qcms} QCM, "
+                      f"{args.etudiants * (QCM_PAR_ETUDIANT - 1)} résultats...")
+                for instruction in PEUPLEMENT:
+                    connexion.execute(text(instruction), parametres)
+                for table in TABLES_ANALYSEES:
+                    connexion.execute(text(f"ANALYZE {table}"))
+
+                exemple = connexion.execute(text("""
+                    SELECT p.etudiant_id, p.qcm_id, e.annee_universitaire, e.niveau_id, e.parcours_id,
+                           (SELECT id FROM plan_enseignants WHERE n = 1) AS enseignant_id
+                    FROM plan_passages p JOIN etudiant e ON e.id = p.etudiant_id
+                    WHERE e.est_actif ORDER BY p.etudiant_id, p.k LIMIT 1
+                """)).one()
+
+                print(f"\n{'Requête':<62} {'Plan':<28} Verdict")
+                for nom, requete in requetes_frequentes(exemple).items():
+                    plan = expliquer(connexion, requete)
+                    tables = parcours_sequentiels(plan)
+                    verdict = "✅" if not tables else f"❌ Seq Scan sur {', '.join(sorted(set(tables)))}"
+                    echecs += bool(tables)
+                    print(f"{nom:<62} {plan['Node Type']:<28} {verdict}")
+            finally:
+                transaction.rollback()
+
+    if echecs:
+        print(f"\n❌ {echecs} requête(s) parcourent une table entière : index manquant ou inutilisé")
+        sys.exit(1)
+    print("\n✅ Toutes les recherches fréquentes passent par un index")
+
+
+if __name__ == "__main__":
+    main()
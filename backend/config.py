@@ -30,4 +30,77 @@ class Config:
 
     #huggingface
     HF_API_TOKEN = os.getenv("HF_API_TOKEN")
+    HF_INFERENCE_API_URL = os.getenv("HF_INFERENCE_API_URL", "https://api-inference.huggingface.co/models")
+    HF_API_TIMEOUT = int(os.getenv("HF_API_TIMEOUT", 60))
+    # Nombre maximal de requêtes simultanées vers l'API Inference
+    HF_API_MAX_CONCURRENCE = int(os.getenv("HF_API_MAX_CONCURRENCE", 4))
 
+    # Backend des modèles locaux : "torch" (float32), "int8" (quantification dynamique, CPU) ou "onnx" (ONNX Runtime)
+    HF_INFERENCE_BACKEND = os.getenv("HF_INFERENCE_BACKEND", "torch")
+    ONNX_EXPORT_DIR = os.getenv("ONNX_EXPORT_DIR", os.path.join(os.path.dirname(__file__), "instance", "onnx"))
+    # Marge de mémoire laissée libre lors du choix du modèle de génération
+    HF_MARGE_MEMOIRE_GO = float(os.getenv("HF_MARGE_MEMOIRE_GO", 1.0))
+
+    # Profil de décodage par défaut : "rapide", "equilibre" ou "qualite" (fast / balanced / quality)
+    HF_PROFIL_DECODAGE = os.getenv("HF_PROFIL_DECODAGE", "qualite")
+
+    # Langue des questions générées ("fr" ou "en"), surchargée par la matière puis par la requête.
+    # MarianMT (anglais → français) ne tourne que si la question générée n'est pas déjà dans cette langue
+    HF_LANGUE_CIBLE = os.getenv("HF_LANGUE_CIBLE", "fr")
+
+    # Décodage contraint des QCM locaux : grammaire Q / A-D / Answer imposée pendant la génération
+    HF_DECODAGE_CONTRAINT = os.getenv("HF_DECODAGE_CONTRAINT", "True").lower() == "true"
+
+    # Décodage assisté : un petit modèle brouillon propose les tokens, le modèle de génération les valide
+    # (seulement pour les décodages gloutons, num_beams=1)
+    HF_DECODAGE_ASSISTE = os.getenv("HF_DECODAGE_ASSISTE", "False").lower() == "true"
+    HF_MODELE_BROUILLON = os.getenv("HF_MODELE_BROUILLON", "google/flan-t5-small")
+
+    # Modèles chargés par le master Gunicorn avant le fork (ex: "generation,traduction,similarite")
+    PRECHARGER_MODELES = [m.strip() for m in os.getenv("PRECHARGER_MODELES", "").split(",") if m.strip()]
+
+    # Sidecar d'inférence partagé (python -m app.services.inference_sidecar) : vide = modèles dans chaque worker
+    INFERENCE_SIDECAR_SOCKET = os.getenv("INFERENCE_SIDECAR_SOCKET", "")
+    INFERENCE_SIDECAR_TIMEOUT = int(os.getenv("INFERENCE_SIDECAR_TIMEOUT", 300))
+
+    # Micro-lots : requêtes concurrentes regroupées pendant au plus N ms, en lots d'au plus N éléments
+    INFERENCE_LOTS_ACTIF = os.getenv("INFERENCE_LOTS_ACTIF", "True").lower() == "true"
+    INFERENCE_LOT_TAILLE_MAX = int(os.getenv("INFERENCE_LOT_TAILLE_MAX", 8))
+    INFERENCE_LOT_ATTENTE_MS = float(os.getenv("INFERENCE_LOT_ATTENTE_MS", 10))
+    # Attente maximale du résultat d'un lot sans max_time (à garder sous GUNICORN_TIMEOUT)
+    INFERENCE_LOT_DELAI_MAX = float(os.getenv("INFERENCE_LOT_DELAI_MAX", 120))
+
+    # Index sémantique des documents (chunks + embeddings MiniLM stockés sur disque)
+    DOCUMENT_INDEX_DIR = os.getenv("DOCUMENT_INDEX_DIR", os.path.join(os.path.dirname(__file__), "instance", "index_documents"))
+    DOCUMENT_INDEX_TAILLE_CHUNK = int(os.getenv("DOCUMENT_INDEX_TAILLE_CHUNK", 600))
+    # Index des textes libres (sujets, contextes) : purgés après N secondes sans lecture, au plus N gardés
+    DOCUMENT_INDEX_TEXTES_TTL = int(os.getenv("DOCUMENT_INDEX_TEXTES_TTL", 7 * 24 * 3600))  # 7 jours
+    DOCUMENT_INDEX_TEXTES_MAX = int(os.getenv("DOCUMENT_INDEX_TEXTES_MAX", 500))
+
+    # Cache persistant des générations (SQLite local, clé = modèle + prompt + paramètres)
+    GENERATION_CACHE_ACTIF = os.getenv("GENERATION_CACHE_ACTIF", "True").lower() == "true"
+    GENERATION_CACHE_PATH = os.getenv("GENERATION_CACHE_PATH", os.path.join(os.path.dirname(__file__), "instance", "generation_cache.sqlite3"))
+    GENERATION_CACHE_TTL = int(os.getenv("GENERATION_CACHE_TTL", 7 * 24 * 3600))  # 7 jours
+    GENERATION_CACHE_MAX_ENTREES = int(os.getenv("GENERATION_CACHE_MAX_ENTREES", 20000))
+
+    # Instrumentation SQL par requête HTTP (nombre de requêtes, durée, formes répétées = N+1 probable)
+    SQL_INSTRUMENTATION_ACTIVE = os.getenv("SQL_INSTRUMENTATION_ACTIVE", "True").lower() == "true"
+    # En-têtes X-SQL-* sur les réponses : toujours en mode debug, sinon seulement si activés
+    SQL_INSTRUMENTATION_ENTETES = os.getenv("SQL_INSTRUMENTATION_ENTETES", "False").lower() == "true"
+    # Au-delà de N exécutions d'une même forme de requête, la requête HTTP est signalée (N+1 probable)
+    SQL_SEUIL_REPETITIONS = int(os.getenv("SQL_SEUIL_REPETITIONS", 10))
+
+    # Métriques au format Prometheus sur /metrics (latences HTTP et IA, pool de connexions, caches)
+    METRIQUES_ACTIVES = os.getenv("METRIQUES_ACTIVES", "True").lower() == "true"
+    # Jeton exigé par /metrics (Authorization: Bearer <jeton>) ; vide = endpoint ouvert (réseau interne)
+    METRIQUES_JETON = os.getenv("METRIQUES_JETON", "")
+    # Dossier partagé où chaque worker Gunicorn (et le sidecar) dépose ses métriques : /metrics les additionne.
+    # Vide = métriques du seul worker qui répond
+    METRIQUES_DOSSIER = os.getenv("METRIQUES_DOSSIER", "")
+    METRIQUES_EXPORT_SECONDES = float(os.getenv("METRIQUES_EXPORT_SECONDES", 5))
+
+    # Profilage à la demande (POST /api/admin/profilage) : piles échantillonnées et profils cProfile
+    PROFILAGE_ACTIF = os.getenv("PROFILAGE_ACTIF", "True").lower() == "true"
+    PROFILAGE_DOSSIER = os.getenv("PROFILAGE_DOSSIER", os.path.join(os.path.dirname(__file__), "instance", "profilage"))
+    # Délai maximal avant qu'un worker voie une session démarrée ou arrêtée
+    PROFILAGE_VERIFICATION_SECONDES = float(os.getenv("PROFILAGE_VERIFICATION_SECONDES", 1))
@@ -0,0 +1,447 @@
+#!/usr/bin/env python
+"""
+Génère un jeu de données synthétique volumineux et reproductible (benchmarks, plans de requêtes)
+
+Part des structures de seed_database.py (mentions, niveaux, parcours, matières, admin) puis
+ajoute, par insertions en masse :
+- des enseignants et leurs assignations matière / niveau / parcours
+- des promotions d'étudiants réparties sur les niveaux et parcours
+- des QCM ciblés par promotion, avec leurs questions
+- des soumissions (ReponseComposee) et des résultats corrigés
+
+Sous PostgreSQL (psycopg 3), les lignes sont écrites avec COPY ; ailleurs par lots
+(executemany). Les identifiants sont attribués par le script, les séquences sont recalées
+à la fin. Toutes les valeurs viennent d'un générateur initialisé par --graine : sur une
+base neuve (flask db upgrade), deux exécutions avec les mêmes paramètres produisent
+exactement les mêmes lignes.
+
+Usage (depuis backend/) :
+    python generer_donnees_synthetiques.py
+    python generer_donnees_synthetiques.py --etudiants 5000 --qcms 300 --graine 7
+"""
+
+import argparse
+import json
+import math
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, text
+
+from app import create_app
+from app.extensions import db, bcrypt
+from app.models.matiere import Matiere, MatiereEnseignantNiveauParcours
+from app.models.niveau_parcours import parcours_niveaux
+from app.models.qcm import QCM, Question, Difficulte, TypeExercice
+from app.models.reponse_composee import ReponseComposee
+from app.models.resultat import Resultat
+from app.models.user import Utilisateur, Enseignant, Etudiant
+from app.services.classement_qcm import calculer_statistiques_qcm
+from app.services.resume_notes import reconstruire_resumes_notes
+from seed_database import create_mentions, create_niveaux, create_parcours, create_matieres, create_admin
+
+PREFIXE = "synth_"
+DOMAINE = "synthetique.test"
+ANNEE_COURANTE = "2024-2025"
+ANNEES_PRECEDENTES = ["2023-2024", "2022-2023"]
+# Dates fixes (et non datetime.now) : les données ne dépendent que de la graine
+DEBUT_ANNEE = datetime(2024, 9, 2, 8, 0)
+JOURS_ANNEE = 270
+
+# Effectifs relatifs par niveau (les promotions rétrécissent de la L1 au M2)
+POIDS_NIVEAUX = {"L1": 30, "L2": 25, "L3": 20, "M1": 15, "M2": 10}
+# Décalage de difficulté (logit) : plus le QCM est difficile, plus la réussite baisse
+DIFFICULTES = [(Difficulte.FACILE, 30, -0.8), (Difficulte.MOYEN, 50, 0.0), (Difficulte.DIFFICILE, 20, 0.8)]
+DUREES_MINUTES = [10, 15, 20, 30, 45, 60]
+DEPARTEMENTS = ["Informatique", "Mathématiques", "Réseaux", "IA", "Gestion", "Économie", "Lettres"]
+
+
+# ============================================================================
+# ÉCRITURE EN MASSE
+# ============================================================================
+
+def _par_lots(lignes, taille):
+    lot = []
+    for ligne in lignes:
+        lot.append(ligne)
+        if len(lot) >= taille:
+            yield lot
+            lot = []
+    if lot:
+        yield lot
+
+
+def utilise_copy(connexion):
+    return connexion.dialect.name == "postgresql" and connexion.dialect.driver == "psycopg"
+
+
+def inserer(connexion, table, colonnes, lignes, taille_lot=10000):
+    """
+    Écrit des tuples (dans l'ordre de `colonnes`) dans `table` : COPY sous PostgreSQL,
+    INSERT par lots sinon. Retourne le nombre de lignes écrites.
+    """
+    nombre = 0
+    if utilise_copy(connexion):
+        preparateur = connexion.dialect.identifier_preparer
+        commande = (
+            f"COPY {preparateur.format_table(table)} "
+            f"({', '.join(preparateur.quote(c) for c in colonnes)}) FROM STDIN"
+        )
+        curseur = connexion.connection.driver_connection.cursor()
+        with curseur.copy(commande) as copie:
+            for ligne in lignes:
+                copie.write_row(ligne)
+                nombre += 1
+        return nombre
+
+    for lot in _par_lots(lignes, taille_lot):
+        connexion.execute(table.insert(), [dict(zip(colonnes, ligne)) for ligne in lot])
+        nombre += len(lot)
+    return nombre
+
+
+def prochain_id(connexion, table):
+    return (connexion.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+
+
+def recaler_sequences(connexion, tables):
+    """Après des identifiants explicites, les séquences PostgreSQL reprennent après le maximum"""
+    if connexion.dialect.name != "postgresql":
+        return
+    for table in tables:
+        connexion.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+            f"(SELECT COALESCE(MAX(id), 1) FROM {table.name}))"
+        ))
+
+
+# ============================================================================
+# GÉNÉRATION
+# ============================================================================
+
+class GenerateurSynthetique:
+    """Produit les lignes de chaque table à partir d'un unique random.Random(graine)"""
+
+    def __init__(self, connexion, args, niveaux, parcours, matieres):
+        """niveaux : {id: code}, parcours : {id: mention_id}, matieres : identifiants"""
+        self.connexion = connexion
+        self.args = args
+        self.rng = random.Random(args.graine)
+        self.niveaux = sorted(niveaux)
+        self.codes_niveaux = niveaux
+        self.parcours = sorted(parcours)
+        self.mention_du_parcours = parcours
+        self.matieres = sorted(matieres)
+        self.comptes = {}
+        # Un seul hachage bcrypt par rôle : hacher 100 000 mots de passe prendrait des heures
+        self.mot_de_passe_etudiant = bcrypt.generate_password_hash("etudiant123").decode("utf-8")
+        self.mot_de_passe_enseignant = bcrypt.generate_password_hash("enseignant123").decode("utf-8")
+        # Feedback de Resultat.definir_feedback, dont les seuils tombent sur les dizaines de pourcentage
+        self.feedbacks = []
+        for dizaine in range(11):
+            resultat = Resultat(pourcentage=dizaine * 10)
+            resultat.definir_feedback()
+            self.feedbacks.append(resultat.feedback)
+
+    def _ecrire(self, table, colonnes, lignes):
+        nombre = inserer(self.connexion, table, colonnes, lignes, self.args.lot)
+        self.comptes[table.name] = self.comptes.get(table.name, 0) + nombre
+
+    def _date(self, jours_max=JOURS_ANNEE):
+        return DEBUT_ANNEE + timedelta(seconds=self.rng.randrange(jours_max * 86400))
+
+    def promotions(self):
+        """Couples (niveau, parcours) : chaque parcours est ouvert à tous les niveaux"""
+        return [(niveau, parcours) for parcours in self.parcours for niveau in self.niveaux]
+
+    def creer_matieres(self):
+        """Complète les matières du seed jusqu'à --matieres"""
+        table = Matiere.__table__
+        manquantes = self.args.matieres - len(self.matieres)
+        if manquantes <= 0:
+            return
+        premier = prochain_id(self.connexion, table)
+        lignes = [
+            (premier + i, f"Matière synthétique {i + 1:04d}", f"SYN{i + 1:04d}", self.rng.choice([2, 3, 4, 5, 6]), True, DEBUT_ANNEE)
+            for i in range(manquantes)
+        ]
+        self._ecrire(table, ["id", "nom", "code", "credits", "est_actif", "date_creation"], lignes)
+        self.matieres = self.matieres + [ligne[0] for ligne in lignes]
+
+    def creer_parcours_niveaux(self):
+        existants = set(self.connexion.execute(select(parcours_niveaux.c.parcours_id, parcours_niveaux.c.niveau_id)).all())
+        lignes = [(p, n) for n, p in self.promotions() if (p, n) not in existants]
+        self._ecrire(parcours_niveaux, ["parcours_id", "niveau_id"], lignes)
+
+    def creer_enseignants(self):
+        utilisateurs = Utilisateur.__table__
+        premier_utilisateur = prochain_id(self.connexion, utilisateurs)
+        premier = prochain_id(self.connexion, Enseignant.__table__)
+        nombre = self.args.enseignants
+        self._ecrire(utilisateurs, ["id", "username", "email", "password", "role", "created_at"], (
+            (premier_utilisateur + i, f"{PREFIXE}ens_{i + 1:05d}", f"{PREFIXE}ens_{i + 1:05d}@{DOMAINE}",
+             self.mot_de_passe_enseignant, "enseignant", DEBUT_ANNEE)
+            for i in range(nombre)
+        ))
+        self._ecrire(Enseignant.__table__, ["id", "utilisateur_id", "departement", "est_actif"], (
+            (premier + i, premier_utilisateur + i, self.rng.choice(DEPARTEMENTS), True)
+            for i in range(nombre)
+        ))
+        self.enseignants = list(range(premier, premier + nombre))
+
+    def creer_assignations(self):
+        """--matieres-par-promotion matières par promotion, chacune confiée à un enseignant"""
+        table = MatiereEnseignantNiveauParcours.__table__
+        premier = prochain_id(self.connexion, table)
+        par_promotion = min(self.args.matieres_par_promotion, len(self.matieres))
+        self.assignations = []
+        lignes = []
+        for niveau, parcours in self.promotions():
+            for matiere in self.rng.sample(self.matieres, par_promotion):
+                enseignant = self.rng.choice(self.enseignants)
+                lignes.append((premier + len(lignes), matiere, enseignant, niveau, parcours, True, DEBUT_ANNEE))
+                self.assignations.append((matiere, niveau, parcours))
+        self._ecrire(table, ["id", "matiere_id", "enseignant_id", "niveau_id", "parcours_id", "est_actif", "date_creation"], lignes)
+
+    def creer_etudiants(self):
+        """
+        Étudiants répartis par promotion (POIDS_NIVEAUX, parcours au hasard). Ceux des années
+        précédentes ne composent pas ; leur niveau d'aptitude sert aux notes des autres.
+        """
+        utilisateurs = Utilisateur.__table__
+        premier_utilisateur = prochain_id(self.connexion, utilisateurs)
+        premier = prochain_id(self.connexion, Etudiant.__table__)
+        poids = [POIDS_NIVEAUX.get(self.codes_niveaux[n], 10) for n in self.niveaux]
+
+        self.etudiants = []
+        lignes_etudiants = []
+        for i in range(self.args.etudiants):
+            niveau = self.rng.choices(self.niveaux, weights=poids)[0]
+            parcours = self.rng.choice(self.parcours)
+            annee_courante = self.rng.random() < 0.9
+            annee = ANNEE_COURANTE if annee_courante else self.rng.choice(ANNEES_PRECEDENTES)
+            est_actif = annee_courante or self.rng.random() < 0.5
+            aptitude = self.rng.gauss(0, 1)
+            lignes_etudiants.append((
+                premier + i, premier_utilisateur + i, f"SYN{i + 1:07d}", est_actif, annee,
+                niveau, parcours, self.mention_du_parcours[parcours]
+            ))
+            if annee_courante:
+                self.etudiants.append((premier + i, niveau, parcours, aptitude))
+
+        self._ecrire(utilisateurs, ["id", "username", "email", "password", "role", "created_at"], (
+            (premier_utilisateur + i, f"{PREFIXE}etu_{i + 1:07d}", f"{PREFIXE}etu_{i + 1:07d}@{DOMAINE}",
+             self.mot_de_passe_etudiant, "etudiant", DEBUT_ANNEE)
+            for i in range(self.args.etudiants)
+        ))
+        self._ecrire(Etudiant.__table__, [
+            "id", "utilisateur_id", "matriculeId", "est_actif", "annee_universitaire",
+            "niveau_id", "parcours_id", "mention_id"
+        ], lignes_etudiants)
+
+    def creer_qcms(self):
+        """QCM répartis sur les assignations, avec leurs questions ; 85 % sont déjà corrigés"""
+        table = QCM.__table__
+        premier = prochain_id(self.connexion, table)
+        premiere_question = prochain_id(self.connexion, Question.__table__)
+        difficultes = [d for d, _, _ in DIFFICULTES]
+        poids_difficultes = [p for _, p, _ in DIFFICULTES]
+        decalages = {d: decalage for d, _, decalage in DIFFICULTES}
+        noms_matieres = dict(self.connexion.execute(select(Matiere.__table__.c.id, Matiere.__table__.c.nom)).all())
+
+        # {(niveau, parcours): [(qcm_id, decalage, questions, date_creation, duree, corrige)]}
+        self.qcms_par_promotion = {}
+        lignes_qcms = []
+        lignes_questions = []
+        for i in range(self.args.qcms):
+            qcm_id = premier + i
+            matiere, niveau, parcours = self.assignations[i % len(self.assignations)]
+            difficulte = self.rng.choices(difficultes, weights=poids_difficultes)[0]
+            duree = self.rng.choice(DUREES_MINUTES)
+            date_creation = self._date(JOURS_ANNEE - 30)
+            est_publie = self.rng.random() < 0.9
+            lignes_qcms.append((
+                qcm_id, f"{noms_matieres.get(matiere, 'QCM')} - Évaluation {i // len(self.assignations) + 1}",
+                TypeExercice.QCM.name, difficulte.name, duree, est_publie, date_creation,
+                niveau, parcours, True, matiere
+            ))
+            questions = []
+            for k in range(self.args.questions_par_qcm):
+                question_id = premiere_question + len(lignes_questions)
+                bonne_reponse = self.rng.randint(1, 4)
+                lignes_questions.append((
+                    question_id, f"Question {k + 1} du QCM {qcm_id} ?", qcm_id,
+                    f"Proposition A{k + 1}", f"Proposition B{k + 1}", f"Proposition C{k + 1}", f"Proposition D{k + 1}",
+                    bonne_reponse
+                ))
+                questions.append((question_id, bonne_reponse))
+            if est_publie:
+                self.qcms_par_promotion.setdefault((niveau, parcours), []).append(
+                    (qcm_id, decalages[difficulte], questions, date_creation, duree, self.rng.random() < 0.85)
+                )
+
+        self._ecrire(table, [
+            "id", "titre", "type_exercice", "difficulte", "duree_minutes", "est_publie", "date_creation",
+            "niveau_id", "parcours_id", "est_cible", "matiere_id"
+        ], lignes_qcms)
+        self._ecrire(Question.__table__, [
+            "id", "question", "qcm_id", "reponse1", "reponse2", "reponse3", "reponse4", "bonne_reponse"
+        ], lignes_questions)
+
+    def _composer(self, etudiant_id, aptitude, qcm):
+        """Une soumission (et son résultat si le QCM est corrigé) : chaque question est juste avec une probabilité logistique"""
+        qcm_id, decalage, questions, date_creation, duree, corrige = qcm
+        probabilite = 1 / (1 + math.exp(-(1.0 + aptitude - decalage)))
+        reponses = {}
+        score = 0
+        for question_id, bonne_reponse in questions:
+            if self.rng.random() < probabilite:
+                option = bonne_reponse
+                score += 1
+            else:
+                option = bonne_reponse % 4 + 1
+            reponses[str(question_id)] = f"{question_id}_{option}"
+        total = len(questions)
+        temps = int(duree * 60 * self.rng.uniform(0.3, 1.0))
+        date_soumission = date_creation + timedelta(seconds=self.rng.randrange(14 * 86400))
+        # QCM corrigé : 5 % de soumissions tardives restent en attente de correction
+        corrigee = corrige and self.rng.random() < 0.95
+
+        soumission = [
+            json.dumps(reponses), date_soumission, temps, corrigee and score == total,
+            "corrigé" if corrigee else "soumis", etudiant_id, qcm_id
+        ]
+        if not corrigee:
+            return soumission, None
+        pourcentage = round(score / total * 100, 2) if total else 0
+        resultat = [
+            round(pourcentage / 100 * 20, 2), self.feedbacks[min(int(pourcentage // 10), 10)],
+            date_soumission + timedelta(seconds=self.rng.randrange(86400, 7 * 86400)), temps,
+            score, total - score, pourcentage, etudiant_id, qcm_id
+        ]
+        return soumission, resultat
+
+    def creer_soumissions(self):
+        """
+        Chaque étudiant de l'année compose en moyenne --qcms-par-etudiant QCM publiés de sa promotion.
+        Écrit par tranches de --lot étudiants pour borner la mémoire.
+        """
+        table_soumissions = ReponseComposee.__table__
+        table_resultats = Resultat.__table__
+        id_soumission = prochain_id(self.connexion, table_soumissions)
+        id_resultat = prochain_id(self.connexion, table_resultats)
+        moyenne = self.args.qcms_par_etudiant
+        colonnes_soumissions = ["id", "contenu", "date_soumission", "temps_execution", "est_correcte", "statut", "etudiant_id", "qcm_id"]
+        colonnes_resultats = [
+            "id", "note", "feedback", "date_correction", "temps_total", "nombre_correctes",
+            "nombre_incorrectes", "pourcentage", "etudiant_id", "qcm_id"
+        ]
+        self.qcms_corriges = set()
+
+        for tranche in _par_lots(self.etudiants, self.args.lot):
+            soumissions, resultats = [], []
+            for etudiant_id, niveau, parcours, aptitude in tranche:
+                disponibles = self.qcms_par_promotion.get((niveau, parcours), [])
+                nombre = min(len(disponibles), max(0, round(self.rng.gauss(moyenne, moyenne / 4))))
+                for qcm in self.rng.sample(disponibles, nombre):
+                    soumission, resultat = self._composer(etudiant_id, aptitude, qcm)
+                    soumissions.append([id_soumission] + soumission)
+                    id_soumission += 1
+                    if resultat is not None:
+                        resultats.append([id_resultat] + resultat)
+                        id_resultat += 1
+                        self.qcms_corriges.add(qcm[0])
+            self._ecrire(table_soumissions, colonnes_soumissions, soumissions)
+            self._ecrire(table_resultats, colonnes_resultats, resultats)
+            print(f"  … {self.comptes.get(table_soumissions.name, 0)} soumissions, "
+                  f"{self.comptes.get(table_resultats.name, 0)} résultats")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Jeu de données synthétique volumineux et reproductible")
+    parser.add_argument("--graine", type=int, default=42, help="Graine du générateur (même graine, mêmes données)")
+    parser.add_argument("--etudiants", type=int, default=100000)
+    parser.add_argument("--enseignants", type=int, default=400)
+    parser.add_argument("--matieres", type=int, default=60, help="Matières au total, seed compris")
+    parser.add_argument("--matieres-par-promotion", type=int, default=8)
+    parser.add_argument("--qcms", type=int, default=5000)
+    parser.add_argument("--questions-par-qcm", type=int, default=10)
+    parser.add_argument("--qcms-par-etudiant", type=int, default=20, help="QCM composés par étudiant, en moyenne")
+    parser.add_argument("--lot", type=int, default=10000, help="Taille des lots d'insertion et des tranches d'étudiants")
+    args = parser.parse_args()
+    if min(args.etudiants, args.enseignants, args.qcms, args.questions_par_qcm, args.matieres_par_promotion, args.lot) < 1:
+        parser.error("les effectifs et la taille des lots doivent être positifs")
+
+    app = create_app()
+    with app.app_context():
+        print("=" * 60)
+        print(f"🌱 Génération synthétique (graine {args.graine})")
+        print("=" * 60)
+
+        if Utilisateur.query.filter(Utilisateur.username.like(f"{PREFIXE}%")).first():
+            print(f"❌ La base contient déjà des utilisateurs {PREFIXE}* : repartez d'une base neuve "
+                  "(flask db downgrade base && flask db upgrade) pour des données reproductibles")
+            sys.exit(1)
+
+        # Structures de base du seed (idempotent)
+        mentions = create_mentions()
+        niveaux = create_niveaux()
+        parcours = create_parcours(mentions)
+        matieres = create_matieres()
+        create_admin()
+        db.session.commit()
+        niveaux = {n.id: n.code for n in niveaux}
+        parcours = {p.id: p.mention_id for p in parcours}
+        matieres = [m.id for m in matieres]
+
+        debut = time.perf_counter()
+        with db.engine.begin() as connexion:
+            print(f"\n🚚 Insertions en masse ({'COPY' if utilise_copy(connexion) else 'INSERT par lots'})...")
+            generateur = GenerateurSynthetique(connexion, args, niveaux, parcours, matieres)
+
+            generateur.creer_matieres()
+            generateur.creer_parcours_niveaux()
+            generateur.creer_enseignants()
+            generateur.creer_assignations()
+            generateur.creer_etudiants()
+            generateur.creer_qcms()
+            generateur.creer_soumissions()
+            recaler_sequences(connexion, [
+                Matiere.__table__, Utilisateur.__table__, Enseignant.__table__, Etudiant.__table__,
+                MatiereEnseignantNiveauParcours.__table__, QCM.__table__, Question.__table__,
+                ReponseComposee.__table__, Resultat.__table__
+            ])
+        print(f"  ✅ Lignes écrites en {time.perf_counter() - debut:.1f} s")
+
+        # Tables dérivées : les insertions en masse ne passent pas par les événements de session
+        print("\n📊 Tables dérivées...")
+        print(f"  ✅ {reconstruire_resumes_notes()} résumés de notes")
+        db.session.commit()
+        for i, qcm_id in enumerate(sorted(generateur.qcms_corriges), start=1):
+            calculer_statistiques_qcm(qcm_id)
+            if i % 500 == 0:
+                db.session.commit()
+        db.session.commit()
+        print(f"  ✅ {len(generateur.qcms_corriges)} distributions de notes")
+
+        if db.engine.dialect.name == "postgresql":
+            with db.engine.connect() as connexion:
+                connexion.execute(text("ANALYZE"))
+                connexion.commit()
+            print("  ✅ Statistiques du planificateur à jour (ANALYZE)")
+
+        print("\n" + "=" * 60)
+        print(f"✅ Génération terminée en {time.perf_counter() - debut:.1f} s")
+        print("=" * 60)
+        print("\n📋 Résumé:")
+        for table, nombre in generateur.comptes.items():
+            print(f"  - {table}: {nombre}")
+        print("\n🔑 Identifiants de connexion:")
+        print(f"  Enseignants: {PREFIXE}ens_00001, ... / enseignant123")
+        print(f"  Étudiants: {PREFIXE}etu_0000001, ... / etudiant123")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Configuration Gunicorn de production.
+
+Usage (depuis backend/) : gunicorn -c gunicorn.conf.py wsgi:app
+
+Variables d'environnement :
+- PORT                      : port d'écoute (défaut 5000)
+- GUNICORN_WORKERS          : nombre de workers (défaut : nombre de cœurs, entre 2 et 8)
+- GUNICORN_THREADS          : threads par worker pour les requêtes (défaut 4)
+- GUNICORN_TIMEOUT          : délai maximal d'une requête, génération IA comprise (défaut 300 s)
+- TORCH_THREADS_PAR_WORKER  : threads de calcul torch par worker (défaut : cœurs / workers)
+- PRECHARGER_MODELES        : modèles chargés dans le master avant le fork (voir wsgi.py)
+"""
+
+import gc
+import os
+import sys
+
+
+def _nombre_cpu() -> int:
+    try:
+        # Cœurs réellement attribués au processus (conteneur, taskset)
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+CPU = _nombre_cpu()
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv("GUNICORN_WORKERS", max(2, min(CPU, 8))))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 300))
+graceful_timeout = 30
+keepalive = 5
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = 100
+accesslog = "-"
+errorlog = "-"
+
+# Le master importe l'application (et les modèles préchargés) une seule fois :
+# les workers forkés partagent ces pages mémoire en copy-on-write
+preload_app = True
+
+# Les workers se partagent les cœurs : chaque worker n'utilise que sa part pour torch
+TORCH_THREADS = int(os.getenv("TORCH_THREADS_PAR_WORKER", max(1, CPU // workers)))
+
+# Fixés avant tout import de torch, dans le master comme dans les workers
+os.environ.setdefault("OMP_NUM_THREADS", str(TORCH_THREADS))
+os.environ.setdefault("MKL_NUM_THREADS", str(TORCH_THREADS))
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+
+def when_ready(server):
+    # Sortir les objets de l'application du ramasse-miettes : sinon le GC des workers
+    # réécrit leurs en-têtes et casse le partage copy-on-write des pages
+    gc.freeze()
+    server.log.info(
+        f"🚀 {workers} workers x {threads} threads, {TORCH_THREADS} thread(s) torch par worker ({CPU} cœurs)"
+    )
+
+
+def post_fork(server, worker):
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(TORCH_THREADS)
@@ -24,6 +24,6 @@ flask db upgrade
 
 echo "Base de données initialisée avec succès!"
 
-# Démarrer l'application Flask
-exec python run.py
+# Démarrer l'application avec le serveur de production
+exec gunicorn -c gunicorn.conf.py wsgi:app
 
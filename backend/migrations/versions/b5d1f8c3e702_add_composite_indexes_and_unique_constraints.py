@@ -0,0 +1,88 @@
+"""add composite indexes and unique constraints on hot lookups
+
+Revision ID: b5d1f8c3e702
+Revises: a7c4e9b2d6f1
+Create Date: 2026-10-19 16:02:38.115204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5d1f8c3e702'
+down_revision = 'a7c4e9b2d6f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Doublons étudiant / QCM : leurs distributions seront recalculées à la prochaine lecture
+    op.execute("""
+        DELETE FROM statistiques_qcm WHERE qcm_id IN (
+            SELECT qcm_id FROM resultats GROUP BY etudiant_id, qcm_id HAVING COUNT(*) > 1
+        )
+    """)
+
+    # Un seul résultat par étudiant et par QCM : le plus récent est conservé
+    op.execute("""
+        DELETE FROM resultats WHERE id IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (
+                    PARTITION BY etudiant_id, qcm_id ORDER BY date_correction DESC, id DESC
+                ) AS rang
+                FROM resultats
+            ) doublons WHERE rang > 1
+        )
+    """)
+
+    # Une seule soumission par étudiant et par QCM : la soumission corrigée, sinon la plus récente
+    op.execute("""
+        DELETE FROM reponses_composees WHERE id IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (
+                    PARTITION BY etudiant_id, qcm_id
+                    ORDER BY CASE WHEN statut = 'corrigé' THEN 0 ELSE 1 END, id DESC
+                ) AS rang
+                FROM reponses_composees
+            ) doublons WHERE rang > 1
+        )
+    """)
+
+    # Résumés des notes reconstruits après le dédoublonnage des résultats
+    op.execute("DELETE FROM resumes_notes")
+    op.execute("""
+        INSERT INTO resumes_notes (etudiant_id, matiere_id, nombre, somme, moyenne, derniere_date, date_maj)
+        SELECT r.etudiant_id, q.matiere_id, COUNT(r.id), SUM(r.note), AVG(r.note), MAX(r.date_correction), CURRENT_TIMESTAMP
+        FROM resultats r JOIN qcms q ON q.id = r.qcm_id
+        WHERE q.matiere_id IS NOT NULL
+        GROUP BY r.etudiant_id, q.matiere_id
+    """)
+
+    with op.batch_alter_table('resultats', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_resultats_etudiant_qcm', ['etudiant_id', 'qcm_id'])
+
+    with op.batch_alter_table('reponses_composees', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_reponses_composees_etudiant_qcm', ['etudiant_id', 'qcm_id'])
+
+    # Index sur les filtres fréquents
+    op.create_index('ix_resultats_qcm_id', 'resultats', ['qcm_id'])
+    op.create_index('ix_reponses_composees_qcm_id_statut', 'reponses_composees', ['qcm_id', 'statut'])
+    op.create_index('ix_etudiant_annee_actif_niveau_parcours', 'etudiant', ['annee_universitaire', 'est_actif', 'niveau_id', 'parcours_id'])
+    op.create_index('ix_qcms_publie_cible_niveau_parcours', 'qcms', ['est_publie', 'est_cible', 'niveau_id', 'parcours_id'])
+    op.create_index('ix_matiere_enseignant_niveau_parcours_enseignant_actif', 'matiere_enseignant_niveau_parcours', ['enseignant_id', 'est_actif'])
+
+
+def downgrade():
+    # Supprimer les index
+    op.drop_index('ix_matiere_enseignant_niveau_parcours_enseignant_actif', table_name='matiere_enseignant_niveau_parcours')
+    op.drop_index('ix_qcms_publie_cible_niveau_parcours', table_name='qcms')
+    op.drop_index('ix_etudiant_annee_actif_niveau_parcours', table_name='etudiant')
+    op.drop_index('ix_reponses_composees_qcm_id_statut', table_name='reponses_composees')
+    op.drop_index('ix_resultats_qcm_id', table_name='resultats')
+
+    with op.batch_alter_table('reponses_composees', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_reponses_composees_etudiant_qcm', type_='unique')
+
+    with op.batch_alter_table('resultats', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_resultats_etudiant_qcm', type_='unique')
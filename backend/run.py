@@ -5,7 +5,7 @@ app = create_app()
 
 if __name__ == "__main__":
     # Mode développement : activer debug et reload automatique
-    # En production, ces options doivent être désactivées
+    # En production, utiliser Gunicorn : gunicorn -c gunicorn.conf.py wsgi:app
     debug_mode = os.getenv("FLASK_DEBUG", "True").lower() == "true"
     app.run(
         host="0.0.0.0",
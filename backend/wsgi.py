@@ -0,0 +1,16 @@
+"""
+Point d'entrée WSGI de production.
+
+Usage (depuis backend/) : gunicorn -c gunicorn.conf.py wsgi:app
+Le serveur de développement reste disponible avec `python run.py`.
+"""
+
+from app import create_app
+from app.services.ia import precharger_modeles
+
+app = create_app()
+
+# Avec preload_app, ce module est importé dans le master : les modèles chargés ici
+# sont partagés en copy-on-write par tous les workers
+if app.config.get("PRECHARGER_MODELES"):
+    precharger_modeles(app, app.config["PRECHARGER_MODELES"])